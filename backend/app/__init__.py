@@ -1,29 +1,40 @@
 # app/__init__.py
 
-import logging
 from flask import Flask
 from app.routes import quiz_bp
 from app.auth import auth_bp
 from app.models import Database
+from app.services import vocabulary_index, distractors
+from app import logging_setup, json_provider, compression
 from flask_cors import CORS
 
 def create_app():
     app = Flask(__name__)
     
-    # Configure logging
-    logging.basicConfig(level=logging.INFO)
-    logger = logging.getLogger(__name__)
+    # Configure logging: JSON lines through a background queue, one line per request
+    logging_setup.init_app(app)
+    # orjson serialisation when installed; gzip/brotli compression of large responses
+    json_provider.init_app(app)
+    compression.init_app(app)
     CORS(app)
     
-    # Initialize database
+    # Create the tables and run the migrations once per process (once in total
+    # with gunicorn's preload), not per request
     Database.init_db()
     
+    # Build the read-only vocabulary index now, so a preloading gunicorn master
+    # builds it once and its workers share it copy-on-write
+    vocabulary_index.load()
+    # Likewise load the distractor matrix (and numpy, which importing the app avoids)
+    distractors.get_index()
+    
     # Register Blueprints
     app.register_blueprint(quiz_bp)
     app.register_blueprint(auth_bp)
     
     # Import and register initialization function
-    from app.routes import init_vocabulary
+    from app.routes import init_vocabulary, release_vocabulary
     app.before_request(init_vocabulary)
+    app.teardown_request(release_vocabulary)
     
     return app
@@ -1,12 +1,23 @@
 # app/auth.py
 
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, request, jsonify, session, current_app, make_response, Response, stream_with_context
 from functools import wraps
 from app.models import User, Session, Database
+import os
 import re
+import csv
+import io
+import secrets
+import zlib
 
 auth_bp = Blueprint('auth', __name__)
 
+# Codes anyone may generate per request; larger batches need the admin token
+PUBLIC_CODE_LIMIT = 100
+MAX_GENERATED_CODES = 200_000
+# Codes written per chunk of the streamed CSV export
+CSV_EXPORT_BATCH = 1000
+
 def validate_email(email):
     """Validate email format"""
     pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
@@ -45,6 +56,73 @@ def login_required(f):
     
     return decorated_function
 
+def user_etag(f):
+    """
+    Decorator for GET routes returning the logged-in user's data, used after
+    login_required. The ETag comes from the user's data_version, which every
+    write to their progress or library bumps, so a matching If-None-Match is
+    answered with 304 before the route runs its queries. A route whose body
+    can still change without a write (e.g. translations the job workers have
+    yet to store) marks its response no-store and gets no ETag.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        user = request.current_user
+        query = zlib.crc32(request.query_string)
+        etag = f"{request.endpoint}-{user['user_id']}-{user['data_version']}-{query:x}"
+        
+        if request.if_none_match.contains_weak(etag):
+            response = current_app.response_class(status=304)
+        else:
+            response = make_response(f(*args, **kwargs))
+            if response.status_code != 200 or response.cache_control.no_store:
+                return response
+        
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    
+    return decorated_function
+
+def admin_required(f):
+    """
+    Decorator for admin-only routes: the X-Admin-Token header must match the
+    ADMIN_TOKEN environment variable. Admin routes are disabled when it is unset.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        error = admin_error()
+        if error:
+            return error
+        
+        return f(*args, **kwargs)
+    
+    return decorated_function
+
+def admin_error():
+    """The 403 response for a request without the admin token, or None if it has it"""
+    admin_token = os.environ.get('ADMIN_TOKEN')
+    if not admin_token:
+        return jsonify({'error': 'Admin access is not configured'}), 403
+    
+    provided = request.headers.get('X-Admin-Token', '')
+    if not secrets.compare_digest(provided.encode(), admin_token.encode()):
+        return jsonify({'error': 'Admin access required'}), 403
+    
+    return None
+
+def get_optional_user():
+    """
+    Return the session data for the request's Bearer token, or None when the
+    request is anonymous or the session is invalid. For routes that work both
+    with and without login.
+    """
+    session_token = request.headers.get('Authorization')
+    if not session_token or not session_token.startswith('Bearer '):
+        return None
+    
+    return Session.validate_session(session_token[7:])
+
 @auth_bp.route('/api/auth/check-activation-code', methods=['POST'])
 def check_activation_code():
     """Check if activation code is valid"""
@@ -173,15 +251,44 @@ def get_available_codes():
 
 @auth_bp.route('/api/auth/generate-codes', methods=['POST'])
 def generate_activation_codes():
-    """Generate new activation codes"""
+    """
+    Generate new activation codes. Up to PUBLIC_CODE_LIMIT per request for
+    anyone, up to MAX_GENERATED_CODES with the admin token.
+    """
     data = request.get_json()
     count = data.get('count', 10) if data else 10
     
-    if count < 1 or count > 100:
-        return jsonify({'error': 'Count must be between 1 and 100'}), 400
+    if not isinstance(count, int) or count < 1 or count > MAX_GENERATED_CODES:
+        return jsonify({'error': f'Count must be between 1 and {MAX_GENERATED_CODES}'}), 400
+    if count > PUBLIC_CODE_LIMIT:
+        error = admin_error()
+        if error:
+            return error
     
     codes = User.create_activation_codes(count)
     return jsonify({
         'message': f'Generated {len(codes)} activation codes',
         'codes': codes
     })
+
+@auth_bp.route('/api/auth/available-codes.csv', methods=['GET'])
+@admin_required
+def export_available_codes():
+    """Stream every unused activation code as CSV: activation_code,created_at"""
+    def rows():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(['activation_code', 'created_at'])
+        for i, row in enumerate(User.iter_available_activation_codes(CSV_EXPORT_BATCH), 1):
+            writer.writerow(row)
+            if i % CSV_EXPORT_BATCH == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+    
+    return Response(
+        stream_with_context(rows()),
+        mimetype='text/csv',
+        headers={'Content-Disposition': 'attachment; filename=activation_codes.csv'}
+    )
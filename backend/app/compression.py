@@ -0,0 +1,69 @@
+# app/compression.py
+
+import gzip
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # Optional: without it only gzip is offered
+    brotli = None
+
+# Responses smaller than this are sent as is; compressing them saves too little
+MIN_SIZE = 1024
+GZIP_LEVEL = 6
+# Brotli's higher qualities are meant for static assets, far too slow per request
+BROTLI_QUALITY = 5
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/javascript',
+    'image/svg+xml',
+}
+
+def _compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+def choose_encoding(accept_encodings):
+    """The best encoding both sides support, by the client's q-values, brotli winning ties"""
+    offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return accept_encodings.best_match(offered)
+
+def compress_response(response, accept_encodings):
+    """
+    Compress a buffered response body in place when it is worth it and the
+    client accepts gzip or brotli. Files sent with send_file, streams,
+    bodies that already carry an encoding and responses with a strong ETag
+    (which must change with the encoding) are left alone.
+    """
+    mimetype = response.mimetype or ''
+    if (
+        response.status_code not in (200, 201)
+        or response.direct_passthrough
+        or response.is_streamed
+        or 'Content-Encoding' in response.headers
+        or (mimetype not in COMPRESSIBLE_MIMETYPES and not mimetype.startswith('text/'))
+    ):
+        return response
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < MIN_SIZE:
+        return response
+    encoding = choose_encoding(accept_encodings)
+    if encoding is None:
+        return response
+    
+    response.set_data(_compress(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+def init_app(app):
+    """Compress JSON and text responses negotiated from Accept-Encoding"""
+    @app.after_request
+    def compress(response):
+        return compress_response(response, request.accept_encodings)
@@ -3,22 +3,18 @@
 
 import os
 import sys
-import random
-import string
+import csv
+import time
 import sqlite3
-from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models import Database, User
 
 # Constants
 DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database.db')
-ACTIVATION_CODE_LENGTH = 8  # Length of generated activation codes
 DEFAULT_NEW_CODES = 5  # Default number of new codes to generate if needed
 
-def generate_random_code(length=ACTIVATION_CODE_LENGTH):
-    """Generate a random alphanumeric activation code"""
-    # Use only uppercase letters and numbers for codes (avoid ambiguous characters)
-    chars = 'ABCDEFGHJKLMNPQRSTUVWXYZ23456789'  # No I, O, 0, 1
-    return ''.join(random.choice(chars) for _ in range(length))
-
 def get_db_connection():
     """Create a database connection with row factory"""
     conn = sqlite3.connect(DB_PATH)
@@ -35,8 +31,8 @@ def list_activation_codes():
         cursor.execute("""
             SELECT 
                 COUNT(*) as total,
-                SUM(CASE WHEN is_active = 1 THEN 1 ELSE 0 END) as used,
-                SUM(CASE WHEN is_active != 1 OR is_active IS NULL THEN 1 ELSE 0 END) as unused
+                SUM(CASE WHEN username IS NULL AND email IS NULL THEN 0 ELSE 1 END) as used,
+                SUM(CASE WHEN username IS NULL AND email IS NULL THEN 1 ELSE 0 END) as unused
             FROM users
         """)
         
@@ -53,7 +49,7 @@ def list_activation_codes():
             cursor.execute("""
                 SELECT activation_code, created_at
                 FROM users
-                WHERE is_active != 1 OR is_active IS NULL
+                WHERE username IS NULL AND email IS NULL
                 LIMIT 10
             """)
             
@@ -80,64 +76,75 @@ def get_unused_activation_code(num_codes_to_generate=DEFAULT_NEW_CODES):
         # Check for unused codes
         cursor.execute("""
             SELECT activation_code FROM users
-            WHERE is_active != 1 OR is_active IS NULL
-            ORDER BY created_at DESC
+            WHERE username IS NULL AND email IS NULL
             LIMIT 1
         """)
         
         result = cursor.fetchone()
+        conn.close()
         
         # If unused code exists, return it
         if result:
             return result['activation_code']
         
         # Generate new codes
-        print(f"\nGenerating {num_codes_to_generate} new activation codes...")
-        
-        # Create codes that don't exist in the database
-        new_codes = []
-        for _ in range(num_codes_to_generate):
-            while True:
-                code = generate_random_code()
-                cursor.execute("SELECT COUNT(*) FROM users WHERE activation_code = ?", (code,))
-                if cursor.fetchone()[0] == 0:
-                    new_codes.append(code)
-                    break
-        
-        # Insert the new codes
-        current_time = datetime.now().isoformat()
-        for code in new_codes:
-            cursor.execute("""
-                INSERT INTO users (activation_code, created_at, is_active)
-                VALUES (?, ?, 0)
-            """, (code, current_time))
-        
-        conn.commit()
-        
-        # Return one of the new codes
-        return new_codes[0]
+        return generate_codes(num_codes_to_generate)[0]
         
     except sqlite3.Error as e:
         print(f"Database error: {e}")
         return None
-        
-    finally:
-        if conn:
-            conn.close()
+
+def generate_codes(count):
+    """Generate count new activation codes in bulk and return them"""
+    print(f"\nGenerating {count:,} new activation codes...")
+    start = time.perf_counter()
+    codes = User.create_activation_codes(count)
+    print(f"Generated {len(codes):,} codes in {time.perf_counter() - start:.2f}s")
+    return codes
+
+def export_activation_codes(path):
+    """Write every unused activation code to a CSV file, streaming from the database"""
+    exported = 0
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['activation_code', 'created_at'])
+        for row in User.iter_available_activation_codes():
+            writer.writerow(row)
+            exported += 1
+    print(f"Exported {exported:,} unused activation codes to {path}")
 
 if __name__ == "__main__":
-    # Parse command line arguments
+    # Parse command line arguments:
+    #   N                 codes to generate when none is unused (default 5)
+    #   --list            show code statistics and a few unused codes
+    #   --generate        always generate N new codes, e.g. --generate 100000
+    #   --export PATH     write every unused code to a CSV file (after generating, if asked)
     num_codes = DEFAULT_NEW_CODES
     list_only = False
+    generate = False
+    export_path = None
     
-    for arg in sys.argv[1:]:
+    args = sys.argv[1:]
+    for i, arg in enumerate(args):
         if arg.lower() == '--list':
             list_only = True
+        elif arg.lower() == '--generate':
+            generate = True
+        elif arg.lower() == '--export' and i + 1 < len(args):
+            export_path = args[i + 1]
         elif arg.isdigit():
             num_codes = int(arg)
     
+    # Make sure the users table and its unused-codes index exist
+    Database.init_db()
+    
     if list_only:
         list_activation_codes()
+    elif generate or export_path:
+        if generate:
+            generate_codes(num_codes)
+        if export_path:
+            export_activation_codes(export_path)
     else:
         # Get and print an activation code
         code = get_unused_activation_code(num_codes)
@@ -0,0 +1,49 @@
+# app/json_provider.py
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Optional: without it the standard library json is used
+    orjson = None
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    JSON provider backed by orjson, which serialises straight to UTF-8 bytes
+    several times faster than the json module. Output is UTF-8 rather than
+    ASCII-escaped and keys keep their insertion order. Dates still go
+    through Flask's default so they keep the HTTP date format. Calls that
+    pass json.dumps options explicitly fall back to the standard library.
+    """
+    
+    ensure_ascii = False
+    sort_keys = False
+    
+    def options(self, indent=False):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+    
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self.options()).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=self.default, option=self.options(indent))
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
+
+def init_app(app):
+    """Use orjson for jsonify and request.get_json when it is installed"""
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
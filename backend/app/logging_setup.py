@@ -0,0 +1,165 @@
+# app/logging_setup.py
+
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+from flask import g, has_request_context, request
+
+# LOG_LEVEL sets the root level; LOG_LEVELS overrides it per module,
+# e.g. "app.routes=DEBUG,app.services.jobs=WARNING"
+DEFAULT_LEVEL = 'INFO'
+# Share (0-1) of debug payload dumps that are actually logged; see log_payload
+PAYLOAD_SAMPLE_RATE = float(os.environ.get('LOG_PAYLOAD_SAMPLE_RATE', '0'))
+# Longest payload dump written, in characters
+MAX_PAYLOAD_CHARS = 10000
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'request_id', 'user_id'}
+
+logger = logging.getLogger(__name__)
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request context and extra fields"""
+    
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key in ('request_id', 'user_id'):
+            if getattr(record, key, None) is not None:
+                entry[key] = getattr(record, key)
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class RequestContextFilter(logging.Filter):
+    """Stamp records with the current request's id and user, before they are queued"""
+    
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = getattr(g, 'request_id', None)
+            user = getattr(request, 'current_user', None)
+            record.user_id = user.get('user_id') if user else None
+        return True
+
+class ProcessQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler whose listener thread writes the records out, so callers
+    never block on log I/O. The listener is started lazily in each process:
+    a gunicorn worker forked from a preloading master does not inherit the
+    master's thread.
+    """
+    
+    def __init__(self, handlers):
+        super().__init__(queue.SimpleQueue())
+        self.handlers = handlers
+        self.listener = None
+        self.listener_pid = None
+        self.start_lock = threading.Lock()
+    
+    def prepare(self, record):
+        # Keep exc_info for the JSON formatter; QueueHandler would flatten it to text
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        return record
+    
+    def enqueue(self, record):
+        if self.listener_pid != os.getpid():
+            with self.start_lock:
+                if self.listener_pid != os.getpid():
+                    self.queue = queue.SimpleQueue()
+                    self.listener = logging.handlers.QueueListener(
+                        self.queue, *self.handlers, respect_handler_level=True
+                    )
+                    self.listener.start()
+                    self.listener_pid = os.getpid()
+        self.queue.put_nowait(record)
+    
+    def close(self):
+        if self.listener and self.listener_pid == os.getpid():
+            self.listener.stop()
+            self.listener = None
+        super().close()
+
+def parse_levels(spec):
+    """Parse "module=LEVEL,module=LEVEL" into a dict, ignoring malformed entries"""
+    levels = {}
+    for item in (spec or '').split(','):
+        name, _, level = item.partition('=')
+        if name.strip() and isinstance(logging.getLevelName(level.strip().upper()), int):
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+def configure_logging():
+    """
+    Route all logging through a queue to a JSON-lines stream on stderr.
+    Safe to call more than once; later calls only re-apply the levels.
+    """
+    root = logging.getLogger()
+    root.setLevel(os.environ.get('LOG_LEVEL', DEFAULT_LEVEL).upper())
+    for name, level in parse_levels(os.environ.get('LOG_LEVELS')).items():
+        logging.getLogger(name).setLevel(level)
+    
+    if any(isinstance(handler, ProcessQueueHandler) for handler in root.handlers):
+        return
+    
+    stream = logging.StreamHandler(sys.stderr)
+    stream.setFormatter(JsonFormatter())
+    queue_handler = ProcessQueueHandler([stream])
+    queue_handler.addFilter(RequestContextFilter())
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+
+def init_app(app):
+    """Configure logging and log one line per request with its id, user and latency"""
+    configure_logging()
+    
+    @app.before_request
+    def start_request_log():
+        g.request_id = request.headers.get(REQUEST_ID_HEADER, '')[:64] or uuid.uuid4().hex
+        g.request_started = time.perf_counter()
+    
+    @app.after_request
+    def finish_request_log(response):
+        started = getattr(g, 'request_started', None)
+        if started is not None:
+            logger.info('request', extra={
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'latency_ms': round((time.perf_counter() - started) * 1000, 2),
+                'bytes': response.calculate_content_length(),
+            })
+        response.headers[REQUEST_ID_HEADER] = g.get('request_id', '')
+        return response
+
+def log_payload(target_logger, message, payload):
+    """
+    Log a payload dump at DEBUG for a sample of calls (LOG_PAYLOAD_SAMPLE_RATE),
+    so dumps can be switched on in production without logging every response.
+    """
+    if not target_logger.isEnabledFor(logging.DEBUG) or random.random() >= PAYLOAD_SAMPLE_RATE:
+        return
+    dump = json.dumps(payload, ensure_ascii=False, default=str)
+    target_logger.debug(message, extra={'payload': dump[:MAX_PAYLOAD_CHARS]})
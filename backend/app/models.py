@@ -1,17 +1,32 @@
 # app/models.py
 
 import sqlite3
-import hashlib
-import uuid
 import secrets
 import bcrypt
+import time
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Callable
 import os
+import sys
+import logging
+import json
+import random
+import re
+from array import array
 from collections import defaultdict
 
 DATABASE_PATH = os.path.join(os.path.dirname(__file__), 'database.db')
 
+# Leading and trailing non-word characters, stripped from vocabulary entries by Lexicon.canonical
+NON_WORD_EDGES = re.compile(r'^[^\w]+|[^\w]+$')
+
+# Random bytes per activation code, shown as twice as many hex characters
+ACTIVATION_CODE_BYTES = 8
+# Activation codes inserted per transaction by User.create_activation_codes
+ACTIVATION_CODE_CHUNK_SIZE = 5000
+
+logger = logging.getLogger(__name__)
+
 class Database:
     @staticmethod
     def get_connection():
@@ -37,7 +52,40 @@ class Database:
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 activated_at TIMESTAMP,
                 is_active BOOLEAN DEFAULT FALSE,
-                last_login TIMESTAMP
+                last_login TIMESTAMP,
+                data_version INTEGER NOT NULL DEFAULT 0,
+                library_version INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        
+        # Partial index of the unused activation codes, so finding one doesn't scan the registered users
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_users_unused_codes ON users (activation_code, created_at)
+            WHERE username IS NULL AND email IS NULL
+        ''')
+        
+        # data_version counts changes to a user's progress and library; it backs the ETags.
+        # library_version only counts changes to the library's words and translations.
+        user_columns = Database.get_columns(cursor, 'users')
+        if 'data_version' not in user_columns:
+            cursor.execute('ALTER TABLE users ADD COLUMN data_version INTEGER NOT NULL DEFAULT 0')
+        if 'library_version' not in user_columns:
+            cursor.execute('ALTER TABLE users ADD COLUMN library_version INTEGER NOT NULL DEFAULT 0')
+        
+        # Create words and levels tables: every word and level string is interned
+        # once and referenced by integer id from the other tables
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS words (
+                id INTEGER PRIMARY KEY,
+                word TEXT UNIQUE NOT NULL,
+                translation TEXT
+            )
+        ''')
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS levels (
+                id INTEGER PRIMARY KEY,
+                name TEXT UNIQUE NOT NULL
             )
         ''')
         
@@ -46,13 +94,15 @@ class Database:
             CREATE TABLE IF NOT EXISTS user_progress (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 user_id INTEGER NOT NULL,
-                level TEXT NOT NULL,
-                word TEXT NOT NULL,
+                level_id INTEGER NOT NULL,
+                word_id INTEGER NOT NULL,
                 correct_count INTEGER DEFAULT 0,
                 incorrect_count INTEGER DEFAULT 0,
                 last_practiced TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (user_id) REFERENCES users (id),
-                UNIQUE(user_id, level, word)
+                FOREIGN KEY (level_id) REFERENCES levels (id),
+                FOREIGN KEY (word_id) REFERENCES words (id),
+                UNIQUE(user_id, level_id, word_id)
             )
         ''')
         
@@ -69,18 +119,25 @@ class Database:
             )
         ''')
         
-        # Create vocabulary_library table for users' custom vocabulary lists
+        # Create vocabulary_library table for users' custom vocabulary lists.
+        # Unlike user_progress it stays keyed on the word text: every row has its own
+        # translation, level and notes, the delta-sync change log and its triggers
+        # record words by text, and a user's library is read whole, by user_id.
+        # word_id is a join key to the interned words (system vocabulary search,
+        # import resolution, quiz sessions), not a replacement for word.
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS vocabulary_library (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 user_id INTEGER NOT NULL,
                 word TEXT NOT NULL,
+                word_id INTEGER REFERENCES words (id),
                 translation TEXT,
                 level TEXT,
                 notes TEXT,
                 added_from TEXT,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 last_reviewed TIMESTAMP,
+                updated_at TIMESTAMP,
                 FOREIGN KEY (user_id) REFERENCES users (id),
                 UNIQUE(user_id, word)
             )
@@ -92,65 +149,684 @@ class Database:
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 word TEXT NOT NULL,
                 level TEXT NOT NULL,
+                word_id INTEGER REFERENCES words (id),
+                level_id INTEGER REFERENCES levels (id),
+                canonical_id INTEGER REFERENCES words (id),
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 UNIQUE(word, level)
             )
         ''')
         
+        # Bring databases created before word/level interning up to date
+        Database.migrate_to_interned_ids(cursor)
+        Database.add_canonical_ids(cursor)
+        
+        cursor.execute(
+            'CREATE INDEX IF NOT EXISTS idx_system_vocabulary_level_id ON system_vocabulary (level_id, word_id)'
+        )
+        cursor.execute(
+            'CREATE INDEX IF NOT EXISTS idx_system_vocabulary_word_id ON system_vocabulary (word_id)'
+        )
+        # Canonical word -> its levels, and the join from a level to its canonical words
+        cursor.execute(
+            'CREATE INDEX IF NOT EXISTS idx_system_vocabulary_canonical ON system_vocabulary (canonical_id, level_id)'
+        )
+        # Level -> rowid range index: the first and last row of a level are index seeks
+        # for RandomRows, and rows are checked for their level without touching the table
+        cursor.execute(
+            'CREATE INDEX IF NOT EXISTS idx_system_vocabulary_level_rowid ON system_vocabulary (level_id, id)'
+        )
+        cursor.execute(
+            'CREATE INDEX IF NOT EXISTS idx_vocabulary_library_word_id ON vocabulary_library (user_id, word_id)'
+        )
+        
+        # Track changes to vocabulary_library for delta sync
+        Database.create_library_change_log(cursor)
+        
+        # Create vocabulary_imports table: one row per bulk import, polled by the client.
+        # status is 'translating' while words are still waiting for a translation
+        # and 'done' once none are left. Timestamps are Unix epoch seconds.
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS vocabulary_imports (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                total_rows INTEGER NOT NULL,
+                pending_translations INTEGER NOT NULL DEFAULT 0,
+                translated_count INTEGER NOT NULL DEFAULT 0,
+                failed_count INTEGER NOT NULL DEFAULT 0,
+                created_at INTEGER NOT NULL,
+                finished_at INTEGER,
+                FOREIGN KEY (user_id) REFERENCES users (id)
+            )
+        ''')
+        
+        # Create vocabulary_import_pending table: words of an import still waiting for a translation
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS vocabulary_import_pending (
+                import_id INTEGER NOT NULL,
+                word_id INTEGER NOT NULL,
+                PRIMARY KEY (import_id, word_id)
+            ) WITHOUT ROWID
+        ''')
+        
+        # Create app_meta table for small key/value bookkeeping (job watermarks etc.)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS app_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        ''')
+        
+        # Create answer_events table: compact append-only log of every graded answer.
+        # progress_id points at the user_progress row (user, level, word) and
+        # answered_at is a Unix epoch timestamp in seconds.
+        # AUTOINCREMENT keeps ids growing even after pruning empties the table,
+        # which the rollup's id watermark relies on.
+        # client_event_id is the client's id for an uploaded answer; it makes retried
+        # batch uploads idempotent for as long as the raw events are kept
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS answer_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                progress_id INTEGER NOT NULL,
+                is_correct INTEGER NOT NULL,
+                answered_at INTEGER NOT NULL,
+                client_event_id TEXT
+            )
+        ''')
+        if 'client_event_id' not in Database.get_columns(cursor, 'answer_events'):
+            cursor.execute('ALTER TABLE answer_events ADD COLUMN client_event_id TEXT')
+        Database.migrate_answer_events_autoincrement(cursor)
+        cursor.execute(
+            'CREATE INDEX IF NOT EXISTS idx_answer_events_answered_at ON answer_events (answered_at)'
+        )
+        cursor.execute('''
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_answer_events_client_event
+            ON answer_events (user_id, client_event_id) WHERE client_event_id IS NOT NULL
+        ''')
+        
+        # Create answer_daily_stats table: per-user daily rollups of answer_events.
+        # day is the number of days since the Unix epoch (UTC).
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS answer_daily_stats (
+                user_id INTEGER NOT NULL,
+                day INTEGER NOT NULL,
+                correct_count INTEGER NOT NULL DEFAULT 0,
+                incorrect_count INTEGER NOT NULL DEFAULT 0,
+                words_practiced INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, day)
+            ) WITHOUT ROWID
+        ''')
+        
+        # Create review_schedule table: SM-2 spaced-repetition state per user/level/word.
+        # due_at is a Unix epoch timestamp; the (user_id, level_id, due_at) index is the
+        # due queue questions are drawn from.
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS review_schedule (
+                user_id INTEGER NOT NULL,
+                level_id INTEGER NOT NULL,
+                word_id INTEGER NOT NULL,
+                ease REAL NOT NULL DEFAULT 2.5,
+                interval_days REAL NOT NULL DEFAULT 0,
+                repetitions INTEGER NOT NULL DEFAULT 0,
+                due_at INTEGER NOT NULL,
+                PRIMARY KEY (user_id, level_id, word_id)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute(
+            'CREATE INDEX IF NOT EXISTS idx_review_schedule_due ON review_schedule (user_id, level_id, due_at)'
+        )
+        
+        # Create jobs table: durable queue of background work run by job_worker.py.
+        # A claimed job is 'running' until locked_until; a worker that misses its
+        # lease loses the job to the next claim. Timestamps are Unix epoch seconds.
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_type TEXT NOT NULL,
+                payload TEXT NOT NULL DEFAULT '{}',
+                priority INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL DEFAULT 5,
+                unique_key TEXT,
+                run_at INTEGER NOT NULL,
+                locked_by TEXT,
+                locked_until INTEGER,
+                last_error TEXT,
+                created_at INTEGER NOT NULL,
+                finished_at INTEGER
+            )
+        ''')
+        cursor.execute(
+            'CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs (status, priority DESC, run_at)'
+        )
+        # At most one queued or running job per unique_key
+        cursor.execute('''
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_unique_key ON jobs (unique_key)
+            WHERE unique_key IS NOT NULL AND status IN ('queued', 'running')
+        ''')
+        
+        # Create quiz_sessions table: a quiz's word order is fixed when it starts and
+        # stored as packed 32-bit word ids, so a session is one small row. source is
+        # 'level' (level_id set) or 'library' (the user's vocabulary library).
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS quiz_sessions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                source TEXT NOT NULL,
+                level_id INTEGER,
+                word_ids BLOB NOT NULL,
+                position INTEGER NOT NULL DEFAULT 0,
+                correct_count INTEGER NOT NULL DEFAULT 0,
+                created_at INTEGER NOT NULL,
+                updated_at INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute(
+            'CREATE INDEX IF NOT EXISTS idx_quiz_sessions_updated ON quiz_sessions (updated_at)'
+        )
+        
+        # Create worker_heartbeats table: the vocabulary version each web worker
+        # serves, refreshed periodically so admins can spot workers lagging behind
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS worker_heartbeats (
+                worker_id TEXT PRIMARY KEY,
+                vocabulary_version INTEGER NOT NULL,
+                loaded_at INTEGER NOT NULL,
+                seen_at INTEGER NOT NULL
+            )
+        ''')
+        
         conn.commit()
         conn.close()
+    
+    @staticmethod
+    def get_meta(cursor, key: str, default: str = None) -> Optional[str]:
+        """Read a value from app_meta using an open cursor"""
+        cursor.execute('SELECT value FROM app_meta WHERE key = ?', (key,))
+        row = cursor.fetchone()
+        return row['value'] if row else default
+    
+    @staticmethod
+    def set_meta(cursor, key: str, value) -> None:
+        """Write a value to app_meta using an open cursor (the caller commits)"""
+        cursor.execute(
+            'INSERT INTO app_meta (key, value) VALUES (?, ?) '
+            'ON CONFLICT(key) DO UPDATE SET value = excluded.value',
+            (key, str(value))
+        )
+    
+    @staticmethod
+    def create_library_change_log(cursor):
+        """
+        Create vocabulary_library_changes: the latest change of every (user, word)
+        in a user's library, deletions included as tombstones. seq is an
+        AUTOINCREMENT key, so it only grows and serves as the sync cursor;
+        triggers on vocabulary_library move a word to a new seq on every change.
+        """
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'vocabulary_library_changes'"
+        )
+        is_new = cursor.fetchone() is None
+        
+        if 'updated_at' not in Database.get_columns(cursor, 'vocabulary_library'):
+            cursor.execute('ALTER TABLE vocabulary_library ADD COLUMN updated_at TIMESTAMP')
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS vocabulary_library_changes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                word TEXT NOT NULL,
+                deleted INTEGER NOT NULL DEFAULT 0,
+                changed_at INTEGER NOT NULL,
+                UNIQUE(user_id, word)
+            )
+        ''')
+        cursor.execute(
+            'CREATE INDEX IF NOT EXISTS idx_vocabulary_library_changes_seq ON vocabulary_library_changes (user_id, seq)'
+        )
+        
+        # The triggers only touch updated_at, which is not in the UPDATE OF
+        # column list, so they don't set each other off
+        for event, row, deleted in (
+            ('INSERT', 'NEW', 0),
+            ('UPDATE OF translation, level, notes, added_from, last_reviewed', 'NEW', 0),
+            ('DELETE', 'OLD', 1),
+        ):
+            name = 'vocabulary_library_' + event.split()[0].lower() + '_change'
+            touch = '' if deleted else (
+                f"UPDATE vocabulary_library SET updated_at = CURRENT_TIMESTAMP WHERE id = {row}.id;"
+            )
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {name}
+                AFTER {event} ON vocabulary_library
+                BEGIN
+                    {touch}
+                    DELETE FROM vocabulary_library_changes WHERE user_id = {row}.user_id AND word = {row}.word;
+                    INSERT INTO vocabulary_library_changes (user_id, word, deleted, changed_at)
+                    VALUES ({row}.user_id, {row}.word, {deleted}, CAST(strftime('%s', 'now') AS INTEGER));
+                END
+            ''')
+        
+        if is_new:
+            cursor.execute('''
+                INSERT INTO vocabulary_library_changes (user_id, word, deleted, changed_at)
+                SELECT user_id, word, 0, CAST(strftime('%s', COALESCE(created_at, 'now')) AS INTEGER)
+                FROM vocabulary_library
+                ORDER BY id
+            ''')
+    
+    @staticmethod
+    def get_columns(cursor, table: str) -> List[str]:
+        """Get the column names of a table"""
+        cursor.execute(f'PRAGMA table_info({table})')
+        return [row['name'] for row in cursor.fetchall()]
+    
+    @staticmethod
+    def migrate_answer_events_autoincrement(cursor):
+        """
+        Rebuild an answer_events table created without AUTOINCREMENT, whose ids
+        SQLite reuses once the table is empty. The id sequence starts past both
+        the largest id and the rollup watermark, so no new event is ever taken
+        for one that was already rolled up. The indexes are recreated by init_db.
+        """
+        cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'answer_events'")
+        if 'AUTOINCREMENT' in cursor.fetchone()['sql'].upper():
+            return
+        cursor.execute('ALTER TABLE answer_events RENAME TO answer_events_rowid')
+        cursor.execute('''
+            CREATE TABLE answer_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                progress_id INTEGER NOT NULL,
+                is_correct INTEGER NOT NULL,
+                answered_at INTEGER NOT NULL,
+                client_event_id TEXT
+            )
+        ''')
+        cursor.execute('''
+            INSERT INTO answer_events (id, user_id, progress_id, is_correct, answered_at, client_event_id)
+            SELECT id, user_id, progress_id, is_correct, answered_at, client_event_id FROM answer_events_rowid
+        ''')
+        cursor.execute('DROP TABLE answer_events_rowid')
+        
+        cursor.execute('SELECT COALESCE(MAX(id), 0) FROM answer_events')
+        next_after = max(cursor.fetchone()[0], int(Database.get_meta(cursor, AnswerHistory.ROLLUP_WATERMARK_KEY, 0)))
+        cursor.execute("DELETE FROM sqlite_sequence WHERE name = 'answer_events'")
+        cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('answer_events', ?)", (next_after,))
+    
+    @staticmethod
+    def add_canonical_ids(cursor):
+        """
+        Add system_vocabulary.canonical_id, the words row of each entry's
+        canonical form (see Lexicon.canonical), and fill it in for existing rows.
+        Every writer sets it from then on, so this only runs once.
+        """
+        if 'canonical_id' in Database.get_columns(cursor, 'system_vocabulary'):
+            return
+        cursor.execute('ALTER TABLE system_vocabulary ADD COLUMN canonical_id INTEGER REFERENCES words (id)')
+        cursor.execute('SELECT id, word FROM system_vocabulary')
+        rows = [(row['id'], Lexicon.canonical(row['word'])) for row in cursor.fetchall()]
+        canonical_ids = Lexicon.intern_words(cursor, [canonical for _, canonical in rows if canonical])
+        cursor.executemany(
+            'UPDATE system_vocabulary SET canonical_id = ? WHERE id = ?',
+            [(canonical_ids[canonical], row_id) for row_id, canonical in rows if canonical]
+        )
+    
+    @staticmethod
+    def migrate_to_interned_ids(cursor):
+        """
+        Migrate a database that still stores word/level strings in user_progress
+        onto the integer ids in the words and levels tables. Row ids of
+        user_progress are preserved so answer_events keeps pointing at them.
+        """
+        if 'translation' not in Database.get_columns(cursor, 'words'):
+            cursor.execute('ALTER TABLE words ADD COLUMN translation TEXT')
+        
+        system_columns = Database.get_columns(cursor, 'system_vocabulary')
+        if 'word_id' not in system_columns:
+            cursor.execute('ALTER TABLE system_vocabulary ADD COLUMN word_id INTEGER REFERENCES words (id)')
+            cursor.execute('ALTER TABLE system_vocabulary ADD COLUMN level_id INTEGER REFERENCES levels (id)')
+        
+        if 'word_id' not in Database.get_columns(cursor, 'vocabulary_library'):
+            cursor.execute('ALTER TABLE vocabulary_library ADD COLUMN word_id INTEGER REFERENCES words (id)')
+        
+        progress_columns = Database.get_columns(cursor, 'user_progress')
+        legacy_progress = 'word' in progress_columns
+        
+        # Intern every string that is still missing an id
+        cursor.execute('''
+            INSERT OR IGNORE INTO words (word)
+            SELECT word FROM system_vocabulary WHERE word_id IS NULL
+            UNION SELECT word FROM vocabulary_library WHERE word_id IS NULL
+        ''')
+        cursor.execute('''
+            INSERT OR IGNORE INTO levels (name)
+            SELECT level FROM system_vocabulary WHERE level_id IS NULL
+        ''')
+        cursor.execute('''
+            UPDATE system_vocabulary SET
+                word_id = (SELECT id FROM words WHERE words.word = system_vocabulary.word),
+                level_id = (SELECT id FROM levels WHERE levels.name = system_vocabulary.level)
+            WHERE word_id IS NULL OR level_id IS NULL
+        ''')
+        cursor.execute('''
+            UPDATE vocabulary_library
+            SET word_id = (SELECT id FROM words WHERE words.word = vocabulary_library.word)
+            WHERE word_id IS NULL
+        ''')
+        
+        if not legacy_progress:
+            return
+        
+        logger.info("Migrating user_progress onto integer word and level ids...")
+        cursor.execute('INSERT OR IGNORE INTO words (word) SELECT DISTINCT word FROM user_progress')
+        cursor.execute('INSERT OR IGNORE INTO levels (name) SELECT DISTINCT level FROM user_progress')
+        cursor.execute('''
+            CREATE TABLE user_progress_interned (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                level_id INTEGER NOT NULL,
+                word_id INTEGER NOT NULL,
+                correct_count INTEGER DEFAULT 0,
+                incorrect_count INTEGER DEFAULT 0,
+                last_practiced TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users (id),
+                FOREIGN KEY (level_id) REFERENCES levels (id),
+                FOREIGN KEY (word_id) REFERENCES words (id),
+                UNIQUE(user_id, level_id, word_id)
+            )
+        ''')
+        cursor.execute('''
+            INSERT INTO user_progress_interned
+                (id, user_id, level_id, word_id, correct_count, incorrect_count, last_practiced)
+            SELECT up.id, up.user_id, l.id, w.id, up.correct_count, up.incorrect_count, up.last_practiced
+            FROM user_progress up
+            JOIN levels l ON l.name = up.level
+            JOIN words w ON w.word = up.word
+        ''')
+        cursor.execute('DROP TABLE user_progress')
+        cursor.execute('ALTER TABLE user_progress_interned RENAME TO user_progress')
 
-class User:
+class Lexicon:
     @staticmethod
-    def generate_activation_code():
-        """Generate a unique activation code using hash function"""
-        # Create a unique identifier
-        unique_id = str(uuid.uuid4()) + str(datetime.now().timestamp())
+    def canonical(word: str) -> str:
+        """
+        The canonical form of a vocabulary entry: stripped of leading and trailing
+        non-word characters. Questions, answers, progress and translations all key
+        on it, and its words row is shared by every level the entry appears in.
+        """
+        return NON_WORD_EDGES.sub('', word)
+    
+    @staticmethod
+    def intern_word(cursor, word: str) -> int:
+        """Get the integer id of a word, adding it to the words table if needed"""
+        cursor.execute('INSERT OR IGNORE INTO words (word) VALUES (?)', (word,))
+        cursor.execute('SELECT id FROM words WHERE word = ?', (word,))
+        return cursor.fetchone()['id']
+    
+    @staticmethod
+    def intern_level(cursor, level: str) -> int:
+        """Get the integer id of a level, adding it to the levels table if needed"""
+        cursor.execute('INSERT OR IGNORE INTO levels (name) VALUES (?)', (level,))
+        cursor.execute('SELECT id FROM levels WHERE name = ?', (level,))
+        return cursor.fetchone()['id']
+    
+    @staticmethod
+    def intern_words(cursor, words: List[str]) -> Dict[str, int]:
+        """Intern many words at once and return a word -> id mapping"""
+        unique_words = list(dict.fromkeys(words))
+        cursor.executemany('INSERT OR IGNORE INTO words (word) VALUES (?)', [(w,) for w in unique_words])
+        
+        ids = {}
+        chunk_size = 500  # Stay well below SQLite's bound-parameter limit
+        for start in range(0, len(unique_words), chunk_size):
+            chunk = unique_words[start:start + chunk_size]
+            placeholders = ','.join('?' * len(chunk))
+            cursor.execute(f'SELECT id, word FROM words WHERE word IN ({placeholders})', chunk)
+            ids.update((row['word'], row['id']) for row in cursor.fetchall())
+        return ids
+    
+    @staticmethod
+    def lookup_translations(cursor, words: List[str]) -> Dict[str, str]:
+        """Get the stored translations of many words as a word -> translation mapping"""
+        unique_words = list(dict.fromkeys(words))
+        translations = {}
+        chunk_size = 500
+        for start in range(0, len(unique_words), chunk_size):
+            chunk = unique_words[start:start + chunk_size]
+            placeholders = ','.join('?' * len(chunk))
+            cursor.execute(
+                f'SELECT word, translation FROM words WHERE word IN ({placeholders}) AND translation IS NOT NULL',
+                chunk
+            )
+            translations.update((row['word'], row['translation']) for row in cursor.fetchall())
+        return translations
+    
+    @staticmethod
+    def get_translation(word: str) -> Optional[str]:
+        """Get the stored translation of a word, if any"""
+        conn = Database.get_connection()
+        cursor = conn.cursor()
         
-        # Generate hash
-        hash_object = hashlib.sha256(unique_id.encode())
-        activation_code = hash_object.hexdigest()[:16].upper()  # Use first 16 chars, uppercase
+        cursor.execute('SELECT translation FROM words WHERE word = ?', (word,))
+        row = cursor.fetchone()
         
-        return activation_code
+        conn.close()
+        return row['translation'] if row else None
     
     @staticmethod
-    def create_activation_codes(count: int = 50):
-        """Create multiple activation codes in advance"""
+    def set_translation(word: str, translation: str):
+        """Store the translation of a word"""
         conn = Database.get_connection()
         cursor = conn.cursor()
         
-        created_codes = []
-        for _ in range(count):
-            while True:
-                try:
-                    activation_code = User.generate_activation_code()
-                    cursor.execute(
-                        'INSERT INTO users (activation_code) VALUES (?)',
-                        (activation_code,)
-                    )
-                    created_codes.append(activation_code)
-                    break
-                except sqlite3.IntegrityError:
-                    # Code already exists, generate a new one
-                    continue
+        cursor.execute(
+            'INSERT INTO words (word, translation) VALUES (?, ?) '
+            'ON CONFLICT(word) DO UPDATE SET translation = excluded.translation',
+            (word, translation)
+        )
         
         conn.commit()
         conn.close()
-        return created_codes
     
     @staticmethod
-    def get_available_activation_codes():
-        """Get all unused activation codes"""
+    def set_translations(translations: Dict[str, str]):
+        """Store many translations in one transaction"""
         conn = Database.get_connection()
         cursor = conn.cursor()
         
-        cursor.execute(
-            'SELECT activation_code FROM users WHERE username IS NULL AND email IS NULL'
+        cursor.executemany(
+            'INSERT INTO words (word, translation) VALUES (?, ?) '
+            'ON CONFLICT(word) DO UPDATE SET translation = excluded.translation',
+            list(translations.items())
         )
-        codes = [row['activation_code'] for row in cursor.fetchall()]
+        
+        conn.commit()
+        conn.close()
+    
+    @staticmethod
+    def get_translations() -> Dict[str, str]:
+        """Get every stored translation as a word -> translation mapping"""
+        conn = Database.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT word, translation FROM words WHERE translation IS NOT NULL')
+        translations = {row['word']: row['translation'] for row in cursor.fetchall()}
         
         conn.close()
-        return codes
+        return translations
+
+class RandomRows:
+    """
+    Uniform random sampling of table rows without ORDER BY RANDOM(), which
+    sorts every candidate row. Random rowids are drawn from the table's (or a
+    level's) rowid range and looked up directly; rowids that hit a gap or a
+    row of another level are rejected and redrawn.
+    """
+    MAX_ROUNDS = 6
+    # Most rowids looked up per round, well below SQLite's bound-parameter limit
+    MAX_CANDIDATES = 512
+    # Below this share of hits, rejection gives way to an exact draw over the level's rowids
+    MIN_HIT_RATE = 1 / 64
+    
+    @staticmethod
+    def sample(cursor, table: str, columns: str, count: int, level_id: int = None, rng=random,
+               exclude=()) -> List[sqlite3.Row]:
+        """
+        Return up to count distinct random rows of table (all of them if it has
+        fewer), selecting columns. With level_id, only rows of that level are
+        drawn; the table then needs an index on (level_id, id). Rows whose id
+        is in exclude are never returned. table and columns are trusted
+        identifiers, never user input.
+        """
+        level_filter = ' AND level_id = ?' if level_id is not None else ''
+        level_params = [level_id] if level_id is not None else []
+        
+        # Two index seeks; MIN() and MAX() in one query would scan the whole range
+        bounds = []
+        for direction in ('ASC', 'DESC'):
+            cursor.execute(
+                f'SELECT id FROM {table} WHERE 1{level_filter} ORDER BY id {direction} LIMIT 1', level_params
+            )
+            row = cursor.fetchone()
+            if count <= 0 or row is None:
+                return []
+            bounds.append(row['id'])
+        low, high = bounds
+        
+        picked = {}
+        exclude = set(exclude)
+        oversample = 2
+        for _ in range(RandomRows.MAX_ROUNDS):
+            needed = count - len(picked)
+            untried = high - low + 1 - len(picked) - len(exclude)
+            if needed <= 0 or untried <= 0:
+                break
+            
+            draws = min(needed * oversample, RandomRows.MAX_CANDIDATES, untried)
+            candidates = set()
+            for _ in range(draws * 2):
+                rowid = rng.randint(low, high)
+                if rowid not in picked and rowid not in exclude:
+                    candidates.add(rowid)
+                    if len(candidates) == draws:
+                        break
+            if not candidates:
+                continue
+            
+            cursor.execute(f'''
+                SELECT id, {columns} FROM {table}
+                WHERE id IN ({','.join('?' * len(candidates))}){level_filter}
+            ''', list(candidates) + level_params)
+            rows = cursor.fetchall()
+            # Set order is not random, so shuffle before keeping the first `needed`
+            rng.shuffle(rows)
+            for row in rows[:needed]:
+                picked[row['id']] = row
+            
+            # Draw more per round when most rowids were rejected. A level this
+            # sparse in its range has few rows, so the exact draw below is cheaper.
+            hit_rate = len(rows) / len(candidates)
+            if hit_rate < RandomRows.MIN_HIT_RATE and len(candidates) >= RandomRows.MAX_CANDIDATES // 2:
+                break
+            oversample = min(int(oversample / max(hit_rate, RandomRows.MIN_HIT_RATE)) + 1, RandomRows.MAX_CANDIDATES)
+        
+        if len(picked) < count:
+            # Sparse or tiny ranges: finish with an exact draw over the remaining rowids
+            cursor.execute(f'SELECT id FROM {table} WHERE 1{level_filter}', level_params)
+            remaining = [row['id'] for row in cursor.fetchall() if row['id'] not in picked and row['id'] not in exclude]
+            extra = rng.sample(remaining, min(count - len(picked), len(remaining)))
+            if extra:
+                cursor.execute(
+                    f'SELECT id, {columns} FROM {table} WHERE id IN ({",".join("?" * len(extra))})', extra
+                )
+                picked.update((row['id'], row) for row in cursor.fetchall())
+        
+        rows = list(picked.values())
+        rng.shuffle(rows)
+        return rows
+
+
+class User:
+    @staticmethod
+    def generate_activation_code():
+        """Generate a random activation code: 16 uppercase hex characters (64 bits from secrets)"""
+        return secrets.token_hex(ACTIVATION_CODE_BYTES).upper()
+    
+    @staticmethod
+    def create_activation_codes(count: int = 50, chunk_size: int = ACTIVATION_CODE_CHUNK_SIZE):
+        """
+        Create count activation codes in advance and return them. Codes are
+        de-duplicated in memory and inserted chunk_size at a time, one
+        transaction per chunk. A chunk that collides with a code already in
+        the database is rolled back and inserted again without the taken codes.
+        """
+        conn = Database.get_connection()
+        cursor = conn.cursor()
+        
+        created_codes = []
+        seen = set()
+        try:
+            while len(created_codes) < count:
+                chunk = []
+                while len(chunk) < min(chunk_size, count - len(created_codes)):
+                    activation_code = User.generate_activation_code()
+                    if activation_code not in seen:
+                        seen.add(activation_code)
+                        chunk.append(activation_code)
+                
+                cursor.executemany(
+                    'INSERT OR IGNORE INTO users (activation_code) VALUES (?)', [(code,) for code in chunk]
+                )
+                if cursor.rowcount != len(chunk):
+                    conn.rollback()
+                    taken = set()
+                    for start in range(0, len(chunk), 500):  # Stay well below SQLite's bound-parameter limit
+                        part = chunk[start:start + 500]
+                        cursor.execute(
+                            f"SELECT activation_code FROM users WHERE activation_code IN ({','.join('?' * len(part))})",
+                            part
+                        )
+                        taken.update(row['activation_code'] for row in cursor.fetchall())
+                    chunk = [code for code in chunk if code not in taken]
+                    cursor.executemany('INSERT INTO users (activation_code) VALUES (?)', [(code,) for code in chunk])
+                
+                conn.commit()
+                created_codes.extend(chunk)
+        finally:
+            conn.close()
+        return created_codes
+    
+    @staticmethod
+    def get_available_activation_codes():
+        """Get all unused activation codes"""
+        return [code for code, _ in User.iter_available_activation_codes()]
+    
+    @staticmethod
+    def iter_available_activation_codes(batch_size: int = 1000):
+        """
+        Yield the unused activation codes as (activation_code, created_at),
+        reading batch_size rows at a time from the unused-codes index, so
+        exports never hold every code in memory
+        """
+        conn = Database.get_connection()
+        try:
+            # Without the hint SQLite walks the NULLs of the email index and reads every row from the table
+            cursor = conn.execute('''
+                SELECT activation_code, created_at FROM users INDEXED BY idx_users_unused_codes
+                WHERE username IS NULL AND email IS NULL
+            ''')
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield row['activation_code'], row['created_at']
+        finally:
+            conn.close()
     
     @staticmethod
     def validate_activation_code(activation_code: str) -> bool:
@@ -240,6 +916,20 @@ class User:
         conn.close()
         return None
     
+    @staticmethod
+    def bump_data_version(cursor, user_id: int, library: bool = False):
+        """
+        Mark the user's progress or library as changed, using an open cursor
+        (the caller commits). Pass library=True when library words or
+        translations changed.
+        """
+        cursor.execute('''
+            UPDATE users
+            SET data_version = data_version + 1,
+                library_version = library_version + ?
+            WHERE id = ?
+        ''', (1 if library else 0, user_id))
+    
     @staticmethod
     def get_user_by_id(user_id: int) -> Optional[Dict]:
         """Get user by ID"""
@@ -283,7 +973,7 @@ class Session:
         cursor = conn.cursor()
         
         cursor.execute('''
-            SELECT s.user_id, u.username, u.email, s.expires_at
+            SELECT s.user_id, u.username, u.email, s.expires_at, u.data_version, u.library_version
             FROM sessions s
             JOIN users u ON s.user_id = u.id
             WHERE s.session_token = ? AND s.is_active = TRUE AND s.expires_at > CURRENT_TIMESTAMP
@@ -310,30 +1000,171 @@ class Session:
 
 class UserProgress:
     @staticmethod
-    def record_answer(user_id: int, level: str, word: str, is_correct: bool):
-        """Record user's answer for a word"""
+    def record_answer(user_id: int, level: str, word: str, is_correct: bool) -> Dict:
+        """Record user's answer for a word and return its updated counters"""
         conn = Database.get_connection()
         cursor = conn.cursor()
         
+        level_id = Lexicon.intern_level(cursor, level)
+        word_id = Lexicon.intern_word(cursor, word)
+        
         if is_correct:
             cursor.execute('''
-                INSERT INTO user_progress (user_id, level, word, correct_count, last_practiced)
+                INSERT INTO user_progress (user_id, level_id, word_id, correct_count, last_practiced)
                 VALUES (?, ?, ?, 1, CURRENT_TIMESTAMP)
-                ON CONFLICT(user_id, level, word) DO UPDATE SET
+                ON CONFLICT(user_id, level_id, word_id) DO UPDATE SET
                     correct_count = correct_count + 1,
                     last_practiced = CURRENT_TIMESTAMP
-            ''', (user_id, level, word))
+                RETURNING id, correct_count, incorrect_count
+            ''', (user_id, level_id, word_id))
         else:
             cursor.execute('''
-                INSERT INTO user_progress (user_id, level, word, incorrect_count, last_practiced)
+                INSERT INTO user_progress (user_id, level_id, word_id, incorrect_count, last_practiced)
                 VALUES (?, ?, ?, 1, CURRENT_TIMESTAMP)
-                ON CONFLICT(user_id, level, word) DO UPDATE SET
+                ON CONFLICT(user_id, level_id, word_id) DO UPDATE SET
                     incorrect_count = incorrect_count + 1,
                     last_practiced = CURRENT_TIMESTAMP
-            ''', (user_id, level, word))
+                RETURNING id, correct_count, incorrect_count
+            ''', (user_id, level_id, word_id))
+        progress = dict(cursor.fetchone())
+        progress_id = progress['id']
+        now = int(time.time())
+        
+        # Append to the answer history log (compacted later by AnswerHistory.rollup)
+        cursor.execute(
+            'INSERT INTO answer_events (user_id, progress_id, is_correct, answered_at) VALUES (?, ?, ?, ?)',
+            (user_id, progress_id, 1 if is_correct else 0, now)
+        )
+        
+        # Reschedule the word in the spaced-repetition queue
+        ReviewSchedule.record_review(cursor, user_id, level_id, word_id, is_correct, now)
+        User.bump_data_version(cursor, user_id)
         
         conn.commit()
         conn.close()
+        return progress
+    
+    @staticmethod
+    def record_answers_batch(user_id: int, answers: List[Dict]) -> Dict:
+        """
+        Record many graded answers in one transaction. answers are dicts with
+        event_id, level, word and is_correct, in the order they were given.
+        Answers whose event_id was already recorded for the user are skipped.
+        Returns {'recorded': [event ids], 'duplicates': {event id: is_correct},
+        'progress': {(level, word): counters after the batch}}.
+        """
+        conn = Database.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            duplicates = {}
+            event_ids = [answer['event_id'] for answer in answers]
+            chunk_size = 500  # Stay well below SQLite's bound-parameter limit
+            pair_chunk_size = 400  # Two parameters per pair plus the user id: keep under SQLite's classic 999
+            for start in range(0, len(event_ids), chunk_size):
+                chunk = event_ids[start:start + chunk_size]
+                cursor.execute(f'''
+                    SELECT client_event_id, is_correct FROM answer_events
+                    WHERE user_id = ? AND client_event_id IN ({','.join('?' * len(chunk))})
+                ''', [user_id] + chunk)
+                duplicates.update((row['client_event_id'], bool(row['is_correct'])) for row in cursor.fetchall())
+            
+            # Also skip repeats of an event id within the batch
+            seen = set(duplicates)
+            new_answers = []
+            for answer in answers:
+                if answer['event_id'] not in seen:
+                    seen.add(answer['event_id'])
+                    new_answers.append(answer)
+            if not new_answers:
+                return {'recorded': [], 'duplicates': duplicates, 'progress': {}}
+            
+            level_ids = {level: Lexicon.intern_level(cursor, level) for level in {a['level'] for a in new_answers}}
+            word_ids = Lexicon.intern_words(cursor, [a['word'] for a in new_answers])
+            now = int(time.time())
+            
+            def key_of(answer):
+                return (level_ids[answer['level']], word_ids[answer['word']])
+            
+            # Make sure every (level, word) has a progress row for the events to point at
+            keys = list(dict.fromkeys(map(key_of, new_answers)))
+            cursor.executemany(
+                'INSERT INTO user_progress (user_id, level_id, word_id) VALUES (?, ?, ?) '
+                'ON CONFLICT(user_id, level_id, word_id) DO NOTHING',
+                [(user_id, level_id, word_id) for level_id, word_id in keys]
+            )
+            progress_ids = {}
+            for start in range(0, len(keys), pair_chunk_size):
+                chunk = keys[start:start + pair_chunk_size]
+                cursor.execute(f'''
+                    SELECT id, level_id, word_id FROM user_progress
+                    WHERE user_id = ? AND (level_id, word_id) IN ({','.join(['(?, ?)'] * len(chunk))})
+                ''', [user_id] + [value for key in chunk for value in key])
+                progress_ids.update(((row['level_id'], row['word_id']), row['id']) for row in cursor.fetchall())
+            
+            # The unique index on (user_id, client_event_id) is the final word on
+            # duplicates: a concurrent upload of the same events may have got past
+            # the check above, and its events are skipped here
+            recorded = []
+            for answer in new_answers:
+                cursor.execute('''
+                    INSERT INTO answer_events (user_id, progress_id, is_correct, answered_at, client_event_id)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(user_id, client_event_id) WHERE client_event_id IS NOT NULL DO NOTHING
+                ''', (user_id, progress_ids[key_of(answer)], 1 if answer['is_correct'] else 0, now, answer['event_id']))
+                if cursor.rowcount:
+                    recorded.append(answer)
+                else:
+                    cursor.execute(
+                        'SELECT is_correct FROM answer_events WHERE user_id = ? AND client_event_id = ?',
+                        (user_id, answer['event_id'])
+                    )
+                    duplicates[answer['event_id']] = bool(cursor.fetchone()['is_correct'])
+            skipped = len(new_answers) - len(recorded)
+            if skipped:
+                logger.info("Skipped %s answer events recorded by a concurrent upload", skipped)
+            new_answers = recorded
+            if not new_answers:
+                conn.commit()
+                return {'recorded': [], 'duplicates': duplicates, 'progress': {}}
+            
+            # Apply each (level, word)'s answers to its counters with one update
+            deltas = defaultdict(lambda: [0, 0])
+            for answer in new_answers:
+                deltas[key_of(answer)][0 if answer['is_correct'] else 1] += 1
+            cursor.executemany('''
+                UPDATE user_progress SET
+                    correct_count = correct_count + ?,
+                    incorrect_count = incorrect_count + ?,
+                    last_practiced = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', [(correct, incorrect, progress_ids[key]) for key, (correct, incorrect) in deltas.items()])
+            
+            progress = {}
+            names = {key_of(a): (a['level'], a['word']) for a in new_answers}
+            ids = [progress_ids[key] for key in deltas]
+            for start in range(0, len(ids), chunk_size):
+                chunk = ids[start:start + chunk_size]
+                cursor.execute(f'''
+                    SELECT level_id, word_id, correct_count, incorrect_count FROM user_progress
+                    WHERE id IN ({','.join('?' * len(chunk))})
+                ''', chunk)
+                for row in cursor.fetchall():
+                    progress[names[(row['level_id'], row['word_id'])]] = {
+                        'correct_count': row['correct_count'], 'incorrect_count': row['incorrect_count']
+                    }
+            
+            # The schedule depends on the order of a word's answers, so replay them in turn
+            for answer in new_answers:
+                ReviewSchedule.record_review(
+                    cursor, user_id, level_ids[answer['level']], word_ids[answer['word']], answer['is_correct'], now
+                )
+            User.bump_data_version(cursor, user_id)
+            
+            conn.commit()
+            return {'recorded': [a['event_id'] for a in new_answers], 'duplicates': duplicates, 'progress': progress}
+        finally:
+            conn.close()
     
     @staticmethod
     def get_user_stats(user_id: int) -> Dict:
@@ -341,16 +1172,21 @@ class UserProgress:
         conn = Database.get_connection()
         cursor = conn.cursor()
         
+        # Aggregate first and name the few levels afterwards, instead of joining every progress row
         cursor.execute('''
-            SELECT 
-                level,
-                COUNT(*) as words_practiced,
-                SUM(correct_count) as total_correct,
-                SUM(incorrect_count) as total_incorrect,
-                AVG(CAST(correct_count AS FLOAT) / (correct_count + incorrect_count + 1)) as accuracy
-            FROM user_progress 
-            WHERE user_id = ?
-            GROUP BY level
+            SELECT l.name as level, s.words_practiced, s.total_correct, s.total_incorrect, s.accuracy
+            FROM (
+                SELECT
+                    level_id,
+                    COUNT(*) as words_practiced,
+                    SUM(correct_count) as total_correct,
+                    SUM(incorrect_count) as total_incorrect,
+                    AVG(CAST(correct_count AS FLOAT) / (correct_count + incorrect_count + 1)) as accuracy
+                FROM user_progress
+                WHERE user_id = ?
+                GROUP BY level_id
+            ) s
+            JOIN levels l ON l.id = s.level_id
         ''', (user_id,))
         
         stats = [dict(row) for row in cursor.fetchall()]
@@ -359,48 +1195,323 @@ class UserProgress:
         return {'level_stats': stats}
         
     @staticmethod
-    def get_user_mistakes(user_id: int, level: str = None) -> Dict:
-        """Get user's mistake records"""
+    def get_mistake_weights(user_id: int, level: str = None) -> List[Dict]:
+        """Get the answer counters of every word the user has missed, without translations"""
         conn = Database.get_connection()
         cursor = conn.cursor()
         
         query = '''
-            SELECT 
-                word,
-                level,
-                incorrect_count as miss_count,
-                correct_count,
-                last_practiced
-            FROM user_progress 
-            WHERE user_id = ? AND incorrect_count > 0
+            SELECT w.word, l.name as level, up.correct_count, up.incorrect_count
+            FROM user_progress up
+            JOIN words w ON w.id = up.word_id
+            JOIN levels l ON l.id = up.level_id
+            WHERE up.user_id = ? AND up.incorrect_count > 0
+        '''
+        params = [user_id]
+        
+        if level and level != 'all':
+            query += ' AND l.name = ?'
+            params.append(level)
+        
+        cursor.execute(query, params)
+        rows = [dict(row) for row in cursor.fetchall()]
+        conn.close()
+        
+        return rows
+    
+    @staticmethod
+    def get_user_mistakes(user_id: int, level: str = None) -> Dict:
+        """
+        Get user's mistake records, with each word's stored translation, or
+        None if it has not been translated yet
+        """
+        conn = Database.get_connection()
+        cursor = conn.cursor()
+        
+        query = '''
+            SELECT 
+                w.word,
+                l.name as level,
+                up.incorrect_count as miss_count,
+                up.correct_count,
+                up.last_practiced
+            FROM user_progress up
+            JOIN words w ON w.id = up.word_id
+            JOIN levels l ON l.id = up.level_id
+            WHERE up.user_id = ? AND up.incorrect_count > 0
         '''
         
         params = [user_id]
         
         if level and level != 'all':
-            query += ' AND level = ?'
+            query += ' AND l.name = ?'
             params.append(level)
-            
-        query += ' ORDER BY incorrect_count DESC, last_practiced DESC'
+        
+        query += ' ORDER BY up.incorrect_count DESC, up.last_practiced DESC'
         
         cursor.execute(query, params)
         
         mistakes = [dict(row) for row in cursor.fetchall()]
         
-        # For each word, get its translation
-        from app.services.translation import translate_text
+        # Only stored translations; words without one get None and the caller queues a translate_words job
+        translations = Lexicon.lookup_translations(cursor, [mistake['word'] for mistake in mistakes])
         for mistake in mistakes:
-            try:
-                mistake['translation'] = translate_text(mistake['word'])
-            except Exception:
-                mistake['translation'] = '翻譯失敗'
+            mistake['translation'] = translations.get(mistake['word'])
         
         conn.close()
         
         return {'mistakes': mistakes}
 
 
+class ReviewSchedule:
+    SECONDS_PER_DAY = 86400
+    INITIAL_EASE = 2.5
+    MIN_EASE = 1.3
+    RELEARN_DELAY = 10 * 60  # Missed words come back after 10 minutes
+    NEW_WORD_ATTEMPTS = 5  # Random draws tried when looking for an unseen word
+    
+    @staticmethod
+    def sm2_step(ease: float, interval_days: float, repetitions: int, is_correct: bool):
+        """
+        Apply one SM-2 update. A correct answer is graded as quality 4 and a wrong
+        one as quality 1. Returns (ease, interval_days, repetitions).
+        """
+        quality = 4 if is_correct else 1
+        ease = max(
+            ReviewSchedule.MIN_EASE,
+            ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02)
+        )
+        
+        if not is_correct:
+            return ease, 0, 0
+        
+        repetitions += 1
+        if repetitions == 1:
+            interval_days = 1
+        elif repetitions == 2:
+            interval_days = 6
+        else:
+            interval_days = round(interval_days * ease, 2)
+        
+        return ease, interval_days, repetitions
+    
+    @staticmethod
+    def record_review(cursor, user_id: int, level_id: int, word_id: int, is_correct: bool, now: int):
+        """Update the schedule of a word after an answer (the caller commits)"""
+        cursor.execute('''
+            SELECT ease, interval_days, repetitions
+            FROM review_schedule
+            WHERE user_id = ? AND level_id = ? AND word_id = ?
+        ''', (user_id, level_id, word_id))
+        row = cursor.fetchone()
+        
+        if row:
+            state = (row['ease'], row['interval_days'], row['repetitions'])
+        else:
+            state = (ReviewSchedule.INITIAL_EASE, 0, 0)
+        
+        ease, interval_days, repetitions = ReviewSchedule.sm2_step(*state, is_correct)
+        if is_correct:
+            due_at = now + int(interval_days * ReviewSchedule.SECONDS_PER_DAY)
+        else:
+            due_at = now + ReviewSchedule.RELEARN_DELAY
+        
+        cursor.execute('''
+            INSERT OR REPLACE INTO review_schedule
+                (user_id, level_id, word_id, ease, interval_days, repetitions, due_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (user_id, level_id, word_id, ease, interval_days, repetitions, due_at))
+    
+    @staticmethod
+    def get_due_words(user_id: int, level: str, limit: int) -> List[str]:
+        """The user's due words of a level, most overdue first"""
+        conn = Database.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT w.word
+            FROM review_schedule rs
+            JOIN levels l ON l.id = rs.level_id
+            JOIN words w ON w.id = rs.word_id
+            WHERE rs.user_id = ? AND l.name = ? AND rs.due_at <= ?
+            ORDER BY rs.due_at
+            LIMIT ?
+        ''', (user_id, level, int(time.time()), limit))
+        words = [row['word'] for row in cursor.fetchall()]
+        
+        conn.close()
+        return words
+    
+    @staticmethod
+    def pick_word(user_id: int, level: str, draw_new_word: Callable[[], str]) -> Optional[str]:
+        """
+        Choose the next word to quiz from the user's due queue for a level.
+        The most overdue word wins; when nothing is due, an unseen word from
+        draw_new_word() is introduced, and failing that the word due soonest
+        is reviewed early. Every lookup is an index seek.
+        """
+        conn = Database.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute('SELECT id FROM levels WHERE name = ?', (level,))
+            level_row = cursor.fetchone()
+            if not level_row:
+                return None
+            level_id = level_row['id']
+            
+            due_query = '''
+                SELECT w.word
+                FROM review_schedule rs
+                JOIN words w ON w.id = rs.word_id
+                WHERE rs.user_id = ? AND rs.level_id = ? AND rs.due_at <= ?
+                ORDER BY rs.due_at
+                LIMIT 1
+            '''
+            cursor.execute(due_query, (user_id, level_id, int(time.time())))
+            row = cursor.fetchone()
+            if row:
+                return row['word']
+            
+            for _ in range(ReviewSchedule.NEW_WORD_ATTEMPTS):
+                candidate = draw_new_word()
+                cursor.execute('''
+                    SELECT 1
+                    FROM words w
+                    JOIN review_schedule rs ON rs.word_id = w.id
+                    WHERE w.word = ? AND rs.user_id = ? AND rs.level_id = ?
+                ''', (candidate, user_id, level_id))
+                if not cursor.fetchone():
+                    return candidate
+            
+            # Every draw was already scheduled: review the next due word early
+            cursor.execute(due_query, (user_id, level_id, sys.maxsize))
+            row = cursor.fetchone()
+            return row['word'] if row else None
+        finally:
+            conn.close()
+
+
+class AnswerHistory:
+    SECONDS_PER_DAY = 86400
+    RETENTION_DAYS = 90  # Raw answer_events older than this are pruned once rolled up
+    ROLLUP_WATERMARK_KEY = 'answer_events_rollup_id'
+    
+    @staticmethod
+    def rollup(retention_days: int = RETENTION_DAYS) -> Dict:
+        """
+        Compact answer_events into answer_daily_stats and prune old raw events.
+        Every day that received events since the last run is recomputed from the
+        raw log, so the job can safely run repeatedly (including mid-day).
+        """
+        conn = Database.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            last_id = int(Database.get_meta(cursor, AnswerHistory.ROLLUP_WATERMARK_KEY, 0))
+            
+            cursor.execute(
+                'SELECT MIN(answered_at) AS first_at, MAX(id) AS max_id FROM answer_events WHERE id > ?',
+                (last_id,)
+            )
+            row = cursor.fetchone()
+            rows_rolled_up = 0
+            
+            if row['max_id'] is not None:
+                max_id = row['max_id']
+                first_day = row['first_at'] // AnswerHistory.SECONDS_PER_DAY
+                
+                cursor.execute('''
+                    INSERT OR REPLACE INTO answer_daily_stats
+                        (user_id, day, correct_count, incorrect_count, words_practiced)
+                    SELECT
+                        user_id,
+                        answered_at / ? AS day,
+                        SUM(is_correct),
+                        SUM(1 - is_correct),
+                        COUNT(DISTINCT progress_id)
+                    FROM answer_events
+                    WHERE answered_at >= ? AND id <= ?
+                    GROUP BY user_id, day
+                ''', (AnswerHistory.SECONDS_PER_DAY, first_day * AnswerHistory.SECONDS_PER_DAY, max_id))
+                rows_rolled_up = cursor.rowcount
+                
+                Database.set_meta(cursor, AnswerHistory.ROLLUP_WATERMARK_KEY, max_id)
+                last_id = max_id
+            
+            # Only prune whole days that have already been rolled up
+            cutoff_day = int(time.time()) // AnswerHistory.SECONDS_PER_DAY - retention_days
+            cursor.execute(
+                'DELETE FROM answer_events WHERE answered_at < ? AND id <= ?',
+                (cutoff_day * AnswerHistory.SECONDS_PER_DAY, last_id)
+            )
+            events_pruned = cursor.rowcount
+            
+            conn.commit()
+            return {'rows_rolled_up': rows_rolled_up, 'events_pruned': events_pruned}
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def get_daily_history(user_id: int, from_day: int, to_day: int) -> List[Dict]:
+        """
+        Get the per-day answer counts for epoch day numbers in [from_day, to_day].
+        Days without activity are filled with zeros.
+        """
+        conn = Database.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT day, correct_count, incorrect_count, words_practiced
+            FROM answer_daily_stats
+            WHERE user_id = ? AND day BETWEEN ? AND ?
+        ''', (user_id, from_day, to_day))
+        
+        rows = {row['day']: row for row in cursor.fetchall()}
+        conn.close()
+        
+        history = []
+        for day in range(from_day, to_day + 1):
+            row = rows.get(day)
+            history.append({
+                'date': AnswerHistory.day_to_date(day),
+                'correct': row['correct_count'] if row else 0,
+                'incorrect': row['incorrect_count'] if row else 0,
+                'words_practiced': row['words_practiced'] if row else 0
+            })
+        
+        return history
+    
+    @staticmethod
+    def date_to_day(date_str: str) -> int:
+        """Convert a YYYY-MM-DD string to an epoch day number (UTC)"""
+        date = datetime.strptime(date_str, '%Y-%m-%d').date()
+        return (date - datetime(1970, 1, 1).date()).days
+    
+    @staticmethod
+    def day_to_date(day: int) -> str:
+        """Convert an epoch day number back to a YYYY-MM-DD string"""
+        return (datetime(1970, 1, 1) + timedelta(days=day)).strftime('%Y-%m-%d')
+
+
 class SystemVocabulary:
+    # app_meta key counting changes to the system vocabulary; web workers
+    # compare it with the version of their in-memory vocabulary index
+    VERSION_KEY = 'system_vocabulary_version'
+    
+    @staticmethod
+    def get_version(cursor) -> int:
+        return int(Database.get_meta(cursor, SystemVocabulary.VERSION_KEY, 0))
+    
+    @staticmethod
+    def bump_version(cursor) -> None:
+        """Mark the system vocabulary as changed (the caller commits)"""
+        cursor.execute(
+            "INSERT INTO app_meta (key, value) VALUES (?, '1') "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1",
+            (SystemVocabulary.VERSION_KEY,)
+        )
+    
     @staticmethod
     def add_word(word: str, level: str) -> bool:
         """Add a word to the system vocabulary"""
@@ -408,16 +1519,22 @@ class SystemVocabulary:
         cursor = conn.cursor()
         
         try:
+            canonical = Lexicon.canonical(word)
             cursor.execute(
-                'INSERT OR REPLACE INTO system_vocabulary (word, level) VALUES (?, ?)',
-                (word, level)
+                'INSERT OR REPLACE INTO system_vocabulary (word, level, word_id, level_id, canonical_id) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (
+                    word, level, Lexicon.intern_word(cursor, word), Lexicon.intern_level(cursor, level),
+                    Lexicon.intern_word(cursor, canonical) if canonical else None
+                )
             )
+            SystemVocabulary.bump_version(cursor)
             
             conn.commit()
             return True
             
         except Exception as e:
-            print(f"Error adding word to system vocabulary: {e}")
+            logger.exception("Error adding word to system vocabulary")
             return False
         finally:
             conn.close()
@@ -429,30 +1546,117 @@ class SystemVocabulary:
         cursor = conn.cursor()
         
         try:
+            words = [word for word, _ in word_level_pairs]
+            canonical = {word: Lexicon.canonical(word) for word in words}
+            word_ids = Lexicon.intern_words(cursor, words + [form for form in canonical.values() if form])
+            level_ids = {level: Lexicon.intern_level(cursor, level) for level in {level for _, level in word_level_pairs}}
+            
             cursor.executemany(
-                'INSERT OR REPLACE INTO system_vocabulary (word, level) VALUES (?, ?)',
-                word_level_pairs
+                'INSERT OR REPLACE INTO system_vocabulary (word, level, word_id, level_id, canonical_id) '
+                'VALUES (?, ?, ?, ?, ?)',
+                [
+                    (word, level, word_ids[word], level_ids[level], word_ids.get(canonical[word]))
+                    for word, level in word_level_pairs
+                ]
             )
+            SystemVocabulary.bump_version(cursor)
             
             conn.commit()
             return True
             
         except Exception as e:
-            print(f"Error adding words to system vocabulary: {e}")
+            logger.exception("Error adding words to system vocabulary")
             return False
         finally:
             conn.close()
     
     @staticmethod
-    def get_words_by_level(level: str) -> List[str]:
-        """Get all vocabulary words for a specific level"""
+    def apply_diff(word_level_pairs: List[tuple]) -> Optional[Dict]:
+        """
+        Make the system vocabulary match word_level_pairs exactly, touching only
+        the rows that differ. A word that only changed level is moved in place,
+        keeping its row id and created_at. Everything runs in one transaction.
+        Returns counts of inserted, deleted and moved rows, or None on error.
+        """
         conn = Database.get_connection()
         cursor = conn.cursor()
         
-        cursor.execute(
-            'SELECT word FROM system_vocabulary WHERE level = ? ORDER BY word',
-            (level,)
-        )
+        try:
+            desired = set(word_level_pairs)
+            cursor.execute('SELECT id, word, level FROM system_vocabulary')
+            existing = {(row['word'], row['level']): row['id'] for row in cursor.fetchall()}
+            
+            to_insert = [pair for pair in dict.fromkeys(word_level_pairs) if pair not in existing]
+            to_delete = [pair for pair in existing if pair not in desired]
+            
+            # Pair up a deleted and an inserted row of the same word as a level move
+            deleted_by_word = defaultdict(list)
+            for pair in to_delete:
+                deleted_by_word[pair[0]].append(pair)
+            moves = []
+            inserts = []
+            for word, level in to_insert:
+                if deleted_by_word.get(word):
+                    old_pair = deleted_by_word[word].pop()
+                    moves.append((existing[old_pair], level))
+                else:
+                    inserts.append((word, level))
+            deletes = [existing[pair] for pairs in deleted_by_word.values() for pair in pairs]
+            
+            canonical = {word: Lexicon.canonical(word) for word, _ in inserts}
+            word_ids = Lexicon.intern_words(
+                cursor, [word for word, _ in inserts] + [form for form in canonical.values() if form]
+            )
+            level_ids = {level: Lexicon.intern_level(cursor, level) for level in {level for _, level in desired}}
+            
+            cursor.executemany('DELETE FROM system_vocabulary WHERE id = ?', [(row_id,) for row_id in deletes])
+            cursor.executemany(
+                'UPDATE system_vocabulary SET level = ?, level_id = ? WHERE id = ?',
+                [(level, level_ids[level], row_id) for row_id, level in moves]
+            )
+            cursor.executemany(
+                'INSERT INTO system_vocabulary (word, level, word_id, level_id, canonical_id) VALUES (?, ?, ?, ?, ?)',
+                [(word, level, word_ids[word], level_ids[level], word_ids.get(canonical[word])) for word, level in inserts]
+            )
+            if inserts or deletes or moves:
+                SystemVocabulary.bump_version(cursor)
+            
+            conn.commit()
+            return {'inserted': len(inserts), 'deleted': len(deletes), 'moved': len(moves)}
+        
+        except Exception as e:
+            conn.rollback()
+            logger.exception("Error applying system vocabulary diff")
+            return None
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def get_words_by_level(level: str, canonical: bool = False) -> List[str]:
+        """
+        Get all vocabulary words for a specific level: the entries as ingested,
+        or with canonical set their distinct canonical forms
+        """
+        conn = Database.get_connection()
+        cursor = conn.cursor()
+        
+        if canonical:
+            cursor.execute('''
+                SELECT DISTINCT w.word
+                FROM system_vocabulary sv
+                JOIN levels l ON l.id = sv.level_id
+                JOIN words w ON w.id = sv.canonical_id
+                WHERE l.name = ?
+                ORDER BY w.word
+            ''', (level,))
+        else:
+            cursor.execute('''
+                SELECT sv.word
+                FROM system_vocabulary sv
+                JOIN levels l ON l.id = sv.level_id
+                WHERE l.name = ?
+                ORDER BY sv.word
+            ''', (level,))
         
         words = [row['word'] for row in cursor.fetchall()]
         conn.close()
@@ -460,12 +1664,23 @@ class SystemVocabulary:
         return words
     
     @staticmethod
-    def get_all_words() -> Dict[str, List[str]]:
-        """Get all vocabulary words grouped by level"""
+    def get_all_words(canonical: bool = False) -> Dict[str, List[str]]:
+        """
+        Get all vocabulary words grouped by level: the entries as ingested,
+        or with canonical set their distinct canonical forms
+        """
         conn = Database.get_connection()
         cursor = conn.cursor()
         
-        cursor.execute('SELECT word, level FROM system_vocabulary ORDER BY level, word')
+        if canonical:
+            cursor.execute('''
+                SELECT DISTINCT w.word, sv.level
+                FROM system_vocabulary sv
+                JOIN words w ON w.id = sv.canonical_id
+                ORDER BY sv.level, w.word
+            ''')
+        else:
+            cursor.execute('SELECT word, level FROM system_vocabulary ORDER BY level, word')
         
         result = defaultdict(list)
         for row in cursor.fetchall():
@@ -476,55 +1691,181 @@ class SystemVocabulary:
     
     @staticmethod
     def get_random_words(level: str, count: int = 4) -> List[str]:
-        """Get random words from a specific level"""
+        """
+        Get up to count random canonical words from a specific level (none if
+        the level is unknown). Entries sharing a canonical form count once, so
+        rows are drawn until count distinct words are found or the level runs out.
+        """
         conn = Database.get_connection()
         cursor = conn.cursor()
         
-        cursor.execute(
-            'SELECT word FROM system_vocabulary WHERE level = ? ORDER BY RANDOM() LIMIT ?',
-            (level, count)
-        )
-        
-        words = [row['word'] for row in cursor.fetchall()]
+        cursor.execute('SELECT id FROM levels WHERE name = ?', (level,))
+        level_row = cursor.fetchone()
+        words = []
+        if level_row:
+            drawn = set()
+            canonical_ids = []
+            while len(canonical_ids) < count:
+                wanted = count - len(canonical_ids)
+                rows = RandomRows.sample(
+                    cursor, 'system_vocabulary', 'canonical_id', wanted, level_id=level_row['id'], exclude=drawn
+                )
+                drawn.update(row['id'] for row in rows)
+                for row in rows:
+                    if row['canonical_id'] and row['canonical_id'] not in canonical_ids:
+                        canonical_ids.append(row['canonical_id'])
+                if len(rows) < wanted:
+                    break  # Every row of the level has been drawn
+            canonical_ids = canonical_ids[:count]
+            if canonical_ids:
+                cursor.execute(
+                    f"SELECT id, word FROM words WHERE id IN ({','.join('?' * len(canonical_ids))})", canonical_ids
+                )
+                word_of = {row['id']: row['word'] for row in cursor.fetchall()}
+                words = [word_of[canonical_id] for canonical_id in canonical_ids]
         conn.close()
         
         return words
 
 class VocabularyLibrary:
+    # app_meta key: highest seq of any pruned tombstone
+    TOMBSTONE_HORIZON_KEY = 'vocabulary_tombstone_horizon'
+    
     @staticmethod
     def add_word(user_id: int, word: str, translation: str = None, level: str = None, notes: str = None, added_from: str = 'manual') -> bool:
-        """Add a word to user's vocabulary library"""
+        """
+        Add a word to user's vocabulary library. Without a translation the
+        stored one is used if there is one; otherwise the word is saved
+        untranslated and the caller queues a translate_words job.
+        """
         conn = Database.get_connection()
         cursor = conn.cursor()
         
         try:
-            # If translation is not provided, try to translate the word
             if not translation:
-                from app.services.translation import translate_text
-                try:
-                    translation = translate_text(word)
-                except Exception:
-                    translation = '翻譯失敗'
+                translation = Lexicon.lookup_translations(cursor, [word]).get(word)
+            
+            word_id = Lexicon.intern_word(cursor, word)
             
             cursor.execute('''
-                INSERT INTO vocabulary_library (user_id, word, translation, level, notes, added_from, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                INSERT INTO vocabulary_library (user_id, word, word_id, translation, level, notes, added_from, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
                 ON CONFLICT(user_id, word) DO UPDATE SET
                     translation = COALESCE(?, translation),
                     level = COALESCE(?, level),
                     notes = COALESCE(?, notes),
                     added_from = COALESCE(?, added_from)
-            ''', (user_id, word, translation, level, notes, added_from, translation, level, notes, added_from))
+            ''', (user_id, word, word_id, translation, level, notes, added_from, translation, level, notes, added_from))
+            User.bump_data_version(cursor, user_id, library=True)
             
             conn.commit()
             return True
             
         except Exception as e:
-            print(f"Error adding word to vocabulary library: {e}")
+            logger.exception("Error adding word to vocabulary library")
             return False
         finally:
             conn.close()
     
+    @staticmethod
+    def add_words_batch(user_id: int, rows: List[Dict], added_from: str = 'import') -> Optional[Dict]:
+        """
+        Upsert many words into a user's vocabulary library in one transaction.
+        Each row is a dict with 'word' and optional 'translation', 'level' and 'notes'.
+        Words without a translation take the stored one if there is one; the rest
+        are saved untranslated and recorded as pending on a new vocabulary_imports row.
+        Returns the import id and counts, or None on failure.
+        """
+        conn = Database.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            word_ids = Lexicon.intern_words(cursor, [row['word'] for row in rows])
+            known = Lexicon.lookup_translations(
+                cursor, [row['word'] for row in rows if not row.get('translation')]
+            )
+            
+            values = []
+            pending = []
+            for row in rows:
+                word = row['word']
+                translation = row.get('translation') or known.get(word)
+                if not translation:
+                    pending.append(word_ids[word])
+                values.append((
+                    user_id, word, word_ids[word], translation,
+                    row.get('level'), row.get('notes'), added_from
+                ))
+            
+            cursor.executemany('''
+                INSERT INTO vocabulary_library (user_id, word, word_id, translation, level, notes, added_from, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(user_id, word) DO UPDATE SET
+                    translation = COALESCE(excluded.translation, translation),
+                    level = COALESCE(excluded.level, level),
+                    notes = COALESCE(excluded.notes, notes),
+                    added_from = COALESCE(excluded.added_from, added_from)
+            ''', values)
+            
+            # Words that already had a translation in the library don't need one
+            pending = list(dict.fromkeys(pending))
+            still_pending = []
+            chunk_size = 500
+            for start in range(0, len(pending), chunk_size):
+                chunk = pending[start:start + chunk_size]
+                placeholders = ','.join('?' * len(chunk))
+                cursor.execute(f'''
+                    SELECT word_id FROM vocabulary_library
+                    WHERE user_id = ? AND word_id IN ({placeholders}) AND translation IS NULL
+                ''', [user_id] + chunk)
+                still_pending.extend(row['word_id'] for row in cursor.fetchall())
+            pending = still_pending
+            
+            now = int(time.time())
+            cursor.execute('''
+                INSERT INTO vocabulary_imports
+                    (user_id, status, total_rows, pending_translations, created_at, finished_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (
+                user_id, 'translating' if pending else 'done', len(rows), len(pending),
+                now, None if pending else now
+            ))
+            import_id = cursor.lastrowid
+            cursor.executemany(
+                'INSERT INTO vocabulary_import_pending (import_id, word_id) VALUES (?, ?)',
+                [(import_id, word_id) for word_id in pending]
+            )
+            User.bump_data_version(cursor, user_id, library=True)
+            
+            conn.commit()
+            return {'import_id': import_id, 'imported': len(rows), 'pending_translations': len(pending)}
+        
+        except Exception as e:
+            conn.rollback()
+            logger.exception("Error importing words to vocabulary library")
+            return None
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def fill_translations(user_id: int, translations: Dict[str, str]) -> int:
+        """Set the translation of library words that don't have one yet"""
+        conn = Database.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.executemany('''
+            UPDATE vocabulary_library
+            SET translation = ?
+            WHERE user_id = ? AND word = ? AND translation IS NULL
+        ''', [(translation, user_id, word) for word, translation in translations.items()])
+        updated = cursor.rowcount
+        if updated:
+            User.bump_data_version(cursor, user_id, library=True)
+        
+        conn.commit()
+        conn.close()
+        return updated
+    
     @staticmethod
     def remove_word(user_id: int, word: str) -> bool:
         """Remove a word from user's vocabulary library"""
@@ -536,11 +1877,14 @@ class VocabularyLibrary:
                 DELETE FROM vocabulary_library 
                 WHERE user_id = ? AND word = ?
             ''', (user_id, word))
+            changed = cursor.rowcount > 0
+            if changed:
+                User.bump_data_version(cursor, user_id, library=True)
             
             conn.commit()
-            return cursor.rowcount > 0
+            return changed
         except Exception as e:
-            print(f"Error removing word from vocabulary library: {e}")
+            logger.exception("Error removing word from vocabulary library")
             return False
         finally:
             conn.close()
@@ -560,7 +1904,8 @@ class VocabularyLibrary:
                 notes,
                 added_from,
                 created_at,
-                last_reviewed
+                last_reviewed,
+                updated_at
             FROM vocabulary_library 
             WHERE user_id = ?
         '''
@@ -585,6 +1930,93 @@ class VocabularyLibrary:
         
         return {'vocabulary': vocabulary}
     
+    @staticmethod
+    def get_quiz_words(user_id: int) -> List[Dict]:
+        """Word and translation of every translated word in the user's library"""
+        conn = Database.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute(
+            'SELECT word, translation FROM vocabulary_library WHERE user_id = ? AND translation IS NOT NULL',
+            (user_id,)
+        )
+        words = [dict(row) for row in cursor.fetchall()]
+        
+        conn.close()
+        return words
+    
+    @staticmethod
+    def get_changes(user_id: int, since: int = 0, limit: int = 500) -> Dict:
+        """
+        Get the library rows changed after the cursor `since`, oldest first.
+        Deleted words come back as {'seq', 'word', 'deleted': True}.
+        'cursor' is the cursor to pass next time and 'has_more' tells whether
+        to fetch again straight away. 'reset' is set when tombstones the client
+        needs have been pruned; it should then drop its copy and sync from 0.
+        """
+        conn = Database.get_connection()
+        cursor = conn.cursor()
+        
+        horizon = int(Database.get_meta(cursor, VocabularyLibrary.TOMBSTONE_HORIZON_KEY, 0))
+        if 0 < since < horizon:
+            conn.close()
+            return {'changes': [], 'cursor': since, 'has_more': False, 'reset': True}
+        
+        cursor.execute('''
+            SELECT c.seq, c.word, c.deleted,
+                   vl.id, vl.translation, vl.level, vl.notes, vl.added_from,
+                   vl.created_at, vl.last_reviewed, vl.updated_at
+            FROM vocabulary_library_changes c
+            LEFT JOIN vocabulary_library vl ON vl.user_id = c.user_id AND vl.word = c.word
+            WHERE c.user_id = ? AND c.seq > ?
+            ORDER BY c.seq
+            LIMIT ?
+        ''', (user_id, since, limit + 1))
+        rows = cursor.fetchall()
+        conn.close()
+        
+        changes = []
+        for row in rows[:limit]:
+            if row['deleted'] or row['id'] is None:
+                changes.append({'seq': row['seq'], 'word': row['word'], 'deleted': True})
+            else:
+                change = dict(row)
+                change['deleted'] = False
+                changes.append(change)
+        
+        return {
+            'changes': changes,
+            'cursor': changes[-1]['seq'] if changes else since,
+            'has_more': len(rows) > limit,
+            'reset': False,
+        }
+    
+    @staticmethod
+    def prune_tombstones(retention_days: int = 90) -> int:
+        """
+        Delete tombstones older than retention_days. Clients whose cursor is
+        older than the newest pruned tombstone are told to resync from scratch.
+        """
+        conn = Database.get_connection()
+        cursor = conn.cursor()
+        
+        cutoff = int(time.time()) - retention_days * 86400
+        cursor.execute(
+            'SELECT MAX(seq) AS seq, COUNT(*) AS count FROM vocabulary_library_changes WHERE deleted = 1 AND changed_at < ?',
+            (cutoff,)
+        )
+        row = cursor.fetchone()
+        if row['count']:
+            cursor.execute(
+                'DELETE FROM vocabulary_library_changes WHERE deleted = 1 AND changed_at < ?', (cutoff,)
+            )
+            horizon = int(Database.get_meta(cursor, VocabularyLibrary.TOMBSTONE_HORIZON_KEY, 0))
+            Database.set_meta(cursor, VocabularyLibrary.TOMBSTONE_HORIZON_KEY, max(horizon, row['seq']))
+        
+        conn.commit()
+        conn.close()
+        return row['count']
+    
     @staticmethod
     def update_word_notes(user_id: int, word: str, notes: str) -> bool:
         """Update notes for a word in user's vocabulary library"""
@@ -597,11 +2029,14 @@ class VocabularyLibrary:
                 SET notes = ?
                 WHERE user_id = ? AND word = ?
             ''', (notes, user_id, word))
+            changed = cursor.rowcount > 0
+            if changed:
+                User.bump_data_version(cursor, user_id)
             
             conn.commit()
-            return cursor.rowcount > 0
+            return changed
         except Exception as e:
-            print(f"Error updating word notes in vocabulary library: {e}")
+            logger.exception("Error updating word notes in vocabulary library")
             return False
         finally:
             conn.close()
@@ -618,11 +2053,466 @@ class VocabularyLibrary:
                 SET last_reviewed = CURRENT_TIMESTAMP
                 WHERE user_id = ? AND word = ?
             ''', (user_id, word))
+            changed = cursor.rowcount > 0
+            if changed:
+                User.bump_data_version(cursor, user_id)
             
             conn.commit()
-            return cursor.rowcount > 0
+            return changed
         except Exception as e:
-            print(f"Error recording word review in vocabulary library: {e}")
+            logger.exception("Error recording word review in vocabulary library")
             return False
         finally:
             conn.close()
+
+class VocabularyImport:
+    @staticmethod
+    def get_status(user_id: int, import_id: int) -> Optional[Dict]:
+        """Get the progress of one of the user's bulk imports"""
+        conn = Database.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT id, status, total_rows, pending_translations, translated_count,
+                   failed_count, created_at, finished_at
+            FROM vocabulary_imports
+            WHERE id = ? AND user_id = ?
+        ''', (import_id, user_id))
+        row = cursor.fetchone()
+        
+        conn.close()
+        return dict(row) if row else None
+    
+    @staticmethod
+    def get_pending_words(import_id: int) -> List[str]:
+        """Get the words of an import that are still waiting for a translation"""
+        conn = Database.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT w.word
+            FROM vocabulary_import_pending p
+            JOIN words w ON w.id = p.word_id
+            WHERE p.import_id = ?
+        ''', (import_id,))
+        words = [row['word'] for row in cursor.fetchall()]
+        
+        conn.close()
+        return words
+    
+    @staticmethod
+    def resolve(import_id: int, translations: Dict[str, str], failed: List[str]) -> bool:
+        """
+        Fill in translations for words of an import and take them, along with
+        the words that could not be translated, off its pending list.
+        The import is marked done once nothing is pending.
+        """
+        conn = Database.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute('SELECT user_id FROM vocabulary_imports WHERE id = ?', (import_id,))
+            row = cursor.fetchone()
+            if not row:
+                return False
+            user_id = row['user_id']
+            
+            word_ids = Lexicon.intern_words(cursor, list(translations) + list(failed))
+            cursor.executemany('''
+                UPDATE vocabulary_library
+                SET translation = ?
+                WHERE user_id = ? AND word_id = ? AND translation IS NULL
+            ''', [(translation, user_id, word_ids[word]) for word, translation in translations.items()])
+            cursor.executemany(
+                'DELETE FROM vocabulary_import_pending WHERE import_id = ? AND word_id = ?',
+                [(import_id, word_ids[word]) for word in list(translations) + list(failed)]
+            )
+            
+            cursor.execute(
+                'SELECT COUNT(*) AS pending FROM vocabulary_import_pending WHERE import_id = ?',
+                (import_id,)
+            )
+            pending = cursor.fetchone()['pending']
+            cursor.execute('''
+                UPDATE vocabulary_imports
+                SET pending_translations = ?,
+                    translated_count = translated_count + ?,
+                    failed_count = failed_count + ?,
+                    status = CASE WHEN ? = 0 THEN 'done' ELSE status END,
+                    finished_at = CASE WHEN ? = 0 THEN ? ELSE finished_at END
+                WHERE id = ?
+            ''', (pending, len(translations), len(failed), pending, pending, int(time.time()), import_id))
+            User.bump_data_version(cursor, user_id, library=True)
+            
+            conn.commit()
+            return True
+        
+        except Exception as e:
+            conn.rollback()
+            logger.exception("Error resolving vocabulary import %s", import_id)
+            return False
+        finally:
+            conn.close()
+
+class QuizSession:
+    MAX_LENGTH = 200
+    # Sessions untouched this long are deleted by purge_stale
+    STALE_AFTER = 7 * 24 * 3600
+    
+    @staticmethod
+    def create(user_id: int, source: str, level: Optional[str], words: List[str]) -> int:
+        """Store a new quiz session over words, in order, and return its id"""
+        conn = Database.get_connection()
+        cursor = conn.cursor()
+        
+        level_id = Lexicon.intern_level(cursor, level) if level else None
+        word_ids = Lexicon.intern_words(cursor, words)
+        packed = array('I', (word_ids[word] for word in words)).tobytes()
+        now = int(time.time())
+        cursor.execute('''
+            INSERT INTO quiz_sessions (user_id, source, level_id, word_ids, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (user_id, source, level_id, packed, now, now))
+        session_id = cursor.lastrowid
+        
+        conn.commit()
+        conn.close()
+        return session_id
+    
+    @staticmethod
+    def get(user_id: int, session_id: int) -> Optional[Dict]:
+        """
+        Get one of the user's quiz sessions with its progress, the word to answer
+        now ('word', None when finished) and the one after it ('next_word').
+        Library sessions also carry the current word's library translation.
+        """
+        conn = Database.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute('''
+                SELECT qs.id, qs.source, l.name AS level, qs.word_ids, qs.position, qs.correct_count
+                FROM quiz_sessions qs
+                LEFT JOIN levels l ON l.id = qs.level_id
+                WHERE qs.id = ? AND qs.user_id = ?
+            ''', (session_id, user_id))
+            row = cursor.fetchone()
+            if not row:
+                return None
+            
+            session = dict(row)
+            word_ids = array('I')
+            word_ids.frombytes(session.pop('word_ids'))
+            position = session['position']
+            session['length'] = len(word_ids)
+            session['finished'] = position >= len(word_ids)
+            
+            upcoming = word_ids[position:position + 2].tolist()
+            words = {}
+            if upcoming:
+                cursor.execute(
+                    f'SELECT id, word FROM words WHERE id IN ({",".join("?" * len(upcoming))})', upcoming
+                )
+                words = {row['id']: row['word'] for row in cursor.fetchall()}
+            session['word'] = words.get(upcoming[0]) if upcoming else None
+            session['next_word'] = words.get(upcoming[1]) if len(upcoming) > 1 else None
+            
+            session['translation'] = None
+            if session['source'] == 'library' and upcoming:
+                cursor.execute(
+                    'SELECT translation FROM vocabulary_library WHERE user_id = ? AND word_id = ?',
+                    (user_id, upcoming[0])
+                )
+                library_row = cursor.fetchone()
+                session['translation'] = library_row['translation'] if library_row else None
+            return session
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def advance(session_id: int, position: int, is_correct: bool) -> bool:
+        """
+        Move a session past the word at position. Returns False if the session
+        has already moved on, so an answer submitted twice is only counted once.
+        """
+        conn = Database.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            UPDATE quiz_sessions
+            SET position = position + 1,
+                correct_count = correct_count + ?,
+                updated_at = ?
+            WHERE id = ? AND position = ?
+        ''', (1 if is_correct else 0, int(time.time()), session_id, position))
+        advanced = cursor.rowcount > 0
+        
+        conn.commit()
+        conn.close()
+        return advanced
+    
+    @staticmethod
+    def purge_stale(older_than_seconds: int = STALE_AFTER) -> int:
+        """Delete sessions untouched for older_than_seconds. Returns the number deleted"""
+        conn = Database.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute(
+            'DELETE FROM quiz_sessions WHERE updated_at < ?', (int(time.time()) - older_than_seconds,)
+        )
+        deleted = cursor.rowcount
+        
+        conn.commit()
+        conn.close()
+        return deleted
+
+
+class JobQueue:
+    # Retry backoff: RETRY_BASE_DELAY * 2^(attempt - 1) seconds, capped, with jitter
+    RETRY_BASE_DELAY = 10
+    RETRY_MAX_DELAY = 3600
+    DEFAULT_LEASE = 60
+    
+    @staticmethod
+    def enqueue(job_type: str, payload: Dict = None, priority: int = 0, max_attempts: int = 5,
+                delay: int = 0, unique_key: str = None) -> int:
+        """
+        Add a job to the queue and return its id. Higher priorities run first.
+        If unique_key is given and a job with that key is already queued or
+        running, no new job is added and the existing job's id is returned.
+        """
+        conn = Database.get_connection()
+        cursor = conn.cursor()
+        
+        now = int(time.time())
+        cursor.execute('''
+            INSERT OR IGNORE INTO jobs (job_type, payload, priority, max_attempts, unique_key, run_at, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (job_type, json.dumps(payload or {}), priority, max_attempts, unique_key, now + delay, now))
+        
+        if cursor.rowcount:
+            job_id = cursor.lastrowid
+        else:
+            cursor.execute(
+                "SELECT id FROM jobs WHERE unique_key = ? AND status IN ('queued', 'running')",
+                (unique_key,)
+            )
+            job_id = cursor.fetchone()['id']
+        
+        conn.commit()
+        conn.close()
+        return job_id
+    
+    @staticmethod
+    def claim(worker_id: str, lease_seconds: int = DEFAULT_LEASE) -> Optional[Dict]:
+        """
+        Lease the next runnable job to a worker: the highest priority queued job
+        whose run_at has passed. Jobs whose lease expired are put back first
+        (or failed, if out of attempts). Returns the job, or None if there is none.
+        """
+        conn = Database.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            now = int(time.time())
+            cursor.execute('''
+                UPDATE jobs
+                SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END,
+                    finished_at = CASE WHEN attempts >= max_attempts THEN ? ELSE NULL END,
+                    last_error = 'lease expired',
+                    locked_by = NULL,
+                    locked_until = NULL
+                WHERE status = 'running' AND locked_until < ?
+            ''', (now, now))
+            
+            cursor.execute('''
+                UPDATE jobs
+                SET status = 'running',
+                    attempts = attempts + 1,
+                    locked_by = ?,
+                    locked_until = ?
+                WHERE id = (
+                    SELECT id FROM jobs
+                    WHERE status = 'queued' AND run_at <= ?
+                    ORDER BY priority DESC, run_at, id
+                    LIMIT 1
+                )
+                RETURNING id, job_type, payload, priority, attempts, max_attempts
+            ''', (worker_id, now + lease_seconds, now))
+            row = cursor.fetchone()
+            
+            conn.commit()
+            if not row:
+                return None
+            job = dict(row)
+            job['payload'] = json.loads(job['payload'])
+            return job
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def extend_lease(job_id: int, worker_id: str, lease_seconds: int = DEFAULT_LEASE) -> bool:
+        """Push back the lease of a running job; False if the worker no longer holds it"""
+        conn = Database.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            UPDATE jobs SET locked_until = ?
+            WHERE id = ? AND locked_by = ? AND status = 'running'
+        ''', (int(time.time()) + lease_seconds, job_id, worker_id))
+        held = cursor.rowcount > 0
+        
+        conn.commit()
+        conn.close()
+        return held
+    
+    @staticmethod
+    def complete(job_id: int, worker_id: str) -> bool:
+        """Mark a job the worker holds as succeeded"""
+        conn = Database.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            UPDATE jobs
+            SET status = 'succeeded', finished_at = ?, locked_by = NULL, locked_until = NULL, last_error = NULL
+            WHERE id = ? AND locked_by = ? AND status = 'running'
+        ''', (int(time.time()), job_id, worker_id))
+        held = cursor.rowcount > 0
+        
+        conn.commit()
+        conn.close()
+        return held
+    
+    @staticmethod
+    def retry_delay(attempts: int) -> int:
+        """Seconds to wait before retrying a job that has failed `attempts` times"""
+        delay = min(JobQueue.RETRY_BASE_DELAY * 2 ** (attempts - 1), JobQueue.RETRY_MAX_DELAY)
+        return int(delay * random.uniform(1.0, 1.2))
+    
+    @staticmethod
+    def fail(job_id: int, worker_id: str, error: str) -> Optional[str]:
+        """
+        Record a failed run of a job the worker holds. The job is queued again
+        after a backoff delay, or marked failed once it is out of attempts.
+        Returns the job's new status, or None if the worker no longer held it.
+        """
+        conn = Database.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND locked_by = ? AND status = 'running'",
+                (job_id, worker_id)
+            )
+            row = cursor.fetchone()
+            if not row:
+                return None
+            
+            now = int(time.time())
+            if row['attempts'] >= row['max_attempts']:
+                status, run_at, finished_at = 'failed', None, now
+            else:
+                status, run_at, finished_at = 'queued', now + JobQueue.retry_delay(row['attempts']), None
+            
+            cursor.execute('''
+                UPDATE jobs
+                SET status = ?, run_at = COALESCE(?, run_at), finished_at = ?,
+                    last_error = ?, locked_by = NULL, locked_until = NULL
+                WHERE id = ?
+            ''', (status, run_at, finished_at, error[:2000], job_id))
+            
+            conn.commit()
+            return status
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def list_jobs(status: str = None, job_type: str = None, limit: int = 50) -> Dict:
+        """List the most recent jobs, optionally filtered, with job counts per status"""
+        conn = Database.get_connection()
+        cursor = conn.cursor()
+        
+        query = '''
+            SELECT id, job_type, payload, priority, status, attempts, max_attempts, unique_key,
+                   run_at, locked_by, locked_until, last_error, created_at, finished_at
+            FROM jobs
+            WHERE 1 = 1
+        '''
+        params = []
+        if status:
+            query += ' AND status = ?'
+            params.append(status)
+        if job_type:
+            query += ' AND job_type = ?'
+            params.append(job_type)
+        query += ' ORDER BY id DESC LIMIT ?'
+        params.append(limit)
+        
+        cursor.execute(query, params)
+        jobs = []
+        for row in cursor.fetchall():
+            job = dict(row)
+            job['payload'] = json.loads(job['payload'])
+            jobs.append(job)
+        
+        cursor.execute('SELECT status, COUNT(*) AS count FROM jobs GROUP BY status')
+        counts = {row['status']: row['count'] for row in cursor.fetchall()}
+        
+        conn.close()
+        return {'jobs': jobs, 'counts': counts}
+    
+    @staticmethod
+    def purge_finished(older_than_seconds: int) -> int:
+        """Delete succeeded jobs that finished more than older_than_seconds ago"""
+        conn = Database.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute(
+            "DELETE FROM jobs WHERE status = 'succeeded' AND finished_at < ?",
+            (int(time.time()) - older_than_seconds,)
+        )
+        deleted = cursor.rowcount
+        
+        conn.commit()
+        conn.close()
+        return deleted
+
+class WorkerHeartbeat:
+    # Workers not heard from for this long are left out of listings and eventually deleted
+    STALE_AFTER = 180
+    PURGE_AFTER = 24 * 3600
+    
+    @staticmethod
+    def record(worker_id: str, vocabulary_version: int, loaded_at: float) -> None:
+        """Record the vocabulary version a web worker is serving, and when it loaded it"""
+        conn = Database.get_connection()
+        cursor = conn.cursor()
+        now = int(time.time())
+        
+        cursor.execute('''
+            INSERT INTO worker_heartbeats (worker_id, vocabulary_version, loaded_at, seen_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(worker_id) DO UPDATE SET
+                vocabulary_version = excluded.vocabulary_version,
+                loaded_at = excluded.loaded_at,
+                seen_at = excluded.seen_at
+        ''', (worker_id, vocabulary_version, int(loaded_at), now))
+        cursor.execute('DELETE FROM worker_heartbeats WHERE seen_at < ?', (now - WorkerHeartbeat.PURGE_AFTER,))
+        
+        conn.commit()
+        conn.close()
+    
+    @staticmethod
+    def list_active(max_age: int = STALE_AFTER) -> List[Dict]:
+        """Workers seen in the last max_age seconds, most recently seen first"""
+        conn = Database.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute(
+            'SELECT * FROM worker_heartbeats WHERE seen_at >= ? ORDER BY seen_at DESC',
+            (int(time.time()) - max_age,)
+        )
+        workers = [dict(row) for row in cursor.fetchall()]
+        
+        conn.close()
+        return workers
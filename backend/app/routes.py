@@ -1,117 +1,216 @@
 # app/routes.py
 
 import random
-from flask import Blueprint, request, jsonify
-from app.services.vocabulary import load_all_vocs, download_vocs
-from app.models import SystemVocabulary, Database
-from app.services.translation import translate_text
-from app.auth import login_required
-from app.models import UserProgress, VocabularyLibrary
 import re
+import gzip
+import logging
+from datetime import datetime
+from flask import Blueprint, request, jsonify, send_file, Response
+from app.services.vocabulary import remove_symbols
+from app.models import SystemVocabulary, Database, Lexicon
+from app.services.translation import translations_cache, get_translation, stored_translation, TranslationPending
+from app.services import mistake_sampler, library_sampler, distractors, vocabulary_import, jobs, texToSpeech, bundles
+from app.services import vocabulary_index
+from app.auth import login_required, admin_required, get_optional_user, user_etag
+from app.logging_setup import log_payload
+from app.models import UserProgress, VocabularyLibrary, VocabularyImport, AnswerHistory, ReviewSchedule, JobQueue, QuizSession
+from app.models import WorkerHeartbeat
 
 
 quiz_bp = Blueprint('quiz_bp', __name__)
 
-# A simple in-memory cache for translations & dictionary
-translations_cache = {}
-dictionary = {}
+logger = logging.getLogger(__name__)
 
-def remove_symbols(s):
-    return re.sub(r'^[^\w]+|[^\w]+$', '', s)
+# Longest date range served by /api/user/stats/history
+MAX_HISTORY_DAYS = 366
+
+# Words /api/audio will render, and how long clients may cache the audio (30 days)
+AUDIO_WORD_PATTERN = re.compile(r"^[A-Za-z][A-Za-z .'/-]{0,63}$")
+AUDIO_MAX_AGE = 30 * 24 * 3600
+
+# Bundles are addressed by content hash, so clients may keep them forever
+BUNDLE_MAX_AGE = 365 * 24 * 3600
+
+QUIZ_SESSION_SOURCES = ('level', 'library')
+DEFAULT_QUIZ_SESSION_LENGTH = 20
+
+# Most answers accepted by one /api/answers/batch upload, and the longest client event id
+MAX_BATCH_ANSWERS = 500
+MAX_EVENT_ID_LENGTH = 64
+
+# Random words of a level drawn per question, as new-word candidates and fallback wrong answers
+LEVEL_SAMPLE_SIZE = 8
+
+def sample_level_words(level, count=LEVEL_SAMPLE_SIZE):
+    """
+    Draw up to count distinct random words of a level, in random order, from
+    the in-memory vocabulary index, falling back to the database (see
+    SystemVocabulary.get_random_words) for a level the index doesn't have
+    yet. Both return count words unless the level has fewer. Returns None if
+    the level is unknown.
+    """
+    words = vocabulary_index.current().sample(level, count)
+    if words:
+        return words
+    return SystemVocabulary.get_random_words(level, count) or None
+
+def build_question_options(word, words_in_level):
+    """
+    Look up the stored translations of the word and 3 plausible wrong answers
+    and return the 4 translations shuffled. Wrong answers come from the
+    distractor index's most similar words, falling back to words_in_level
+    (a random sample of the level, see sample_level_words); words without a
+    stored translation are skipped. Raises ValueError if words_in_level
+    holds fewer than 3 words besides word, and TranslationPending if the
+    word or too many of the others are still waiting for the translator,
+    rather than returning fewer than 4 options.
+    """
+    correct_translation = get_translation(word)
+    
+    wrong_translations = distractors.pick_distractors(word, correct_translation)
+    if wrong_translations is None:
+        # Prepare 3 random wrong translations
+        wrong_words = list(dict.fromkeys(w for w in words_in_level if w != word))
+        if len(wrong_words) < 3:
+            raise ValueError('Not enough words in this level to generate options.')
+        random.shuffle(wrong_words)
+        # Look them all up, so every miss gets queued for translation
+        wrong_translations = [t for t in map(stored_translation, wrong_words) if t][:3]
+        if len(wrong_translations) < 3:
+            raise TranslationPending('Too few words of this level have been translated yet.')
+    
+    # Combine correct + wrong, then shuffle
+    options = wrong_translations + [correct_translation]
+    random.shuffle(options)
+    return options
+
+def translation_pending_response():
+    """The response for a question or answer whose translations the job workers haven't stored yet"""
+    return jsonify({'error': 'Translations are still being prepared, please try again shortly.'}), 503
+
+def build_library_question_options(word, correct_translation, library):
+    """
+    Return 4 shuffled translations for a library word: the correct one and 3
+    wrong ones drawn from the user's cached library words (a LibraryWords),
+    topped up from the system vocabulary when the library is short. Raises
+    ValueError if there are not 3 distinct wrong translations to be had.
+    """
+    options = library.wrong_translations(word, correct_translation) + [correct_translation]
+    random.shuffle(options)
+    return options
+
+def current_library():
+    """The cached word list of the logged-in user's vocabulary library"""
+    user = request.current_user
+    return library_sampler.get_library(user['user_id'], user['library_version'])
 
 def init_vocabulary():
     """
-    Called once when the Flask app is first started up.
-    Ensures vocabulary data is ready in the database.
+    Called before every request. Pins the vocabulary index to the request, so
+    it sees one vocabulary version throughout even if a background reload
+    swaps in a newer one meanwhile. The tables are set up once, by create_app.
     """
-    global dictionary
     try:
-        # Initialize the database tables if needed
-        Database.init_db()
-        
-        # Load vocabulary data from the database
-        dictionary = load_all_vocs()
+        # Pin the latest index; a changed system vocabulary starts a background rebuild
+        index = vocabulary_index.pin()
         
-        # If dictionary is empty, try to download and process vocabulary
-        if not dictionary:
-            download_vocs()
-            dictionary = load_all_vocs()
+        # If the vocabulary is empty, have the job workers download and process it
+        if not index:
+            jobs.enqueue('download_vocabulary', priority=10, unique_key='download_vocabulary')
             
     except Exception as e:
-        # Handle or log the exception as needed
-        print(f"Error during vocabulary initialization: {e}")
+        logger.exception("Error during vocabulary initialization")
         raise e
 
+def release_vocabulary(exception=None):
+    """Called after every request: unpin the request's vocabulary index"""
+    vocabulary_index.unpin()
+
 @quiz_bp.route('/api/levels', methods=['GET'])
 def get_levels():
     """
     Return the list of levels found in vocabularies.
     """
-    # Get all vocabulary words grouped by level from the database
-    vocab_dict = SystemVocabulary.get_all_words()
+    levels = vocabulary_index.current().levels
     
-    if not vocab_dict:
+    if not levels:
         return jsonify({'error': 'Vocabulary not initialized.'}), 500
-        
-    levels = sorted(vocab_dict.keys())
-    print(levels)
-    return jsonify({'levels': levels})
+    
+    return jsonify({'levels': list(levels)})
 
 @quiz_bp.route('/api/question/<level>', methods=['GET'])
 def get_question(level):
     """
-    Returns a random English word from the specified level
+    Returns an English word from the specified level
     along with multiple-choice translation options (1 correct + 3 incorrect).
+    Logged-in users get the next word from their spaced-repetition queue;
+    anonymous users get a random word.
     """
-    # Get level words from the database
-    words_in_level = SystemVocabulary.get_words_by_level(level)
+    # Draw a few random level words from the database
+    words_in_level = sample_level_words(level)
     
     # Validate level
-    if not words_in_level:
-        # Fallback to dictionary if needed for backward compatibility
-        if level not in dictionary:
-            return jsonify({'error': 'Invalid level'}), 400
-        words_in_level = dictionary[level]
+    if words_in_level is None:
+        return jsonify({'error': 'Invalid level'}), 400
     
     if len(words_in_level) < 4:
         return jsonify({'error': 'Not enough words in this level to generate options.'}), 400
     
-    # Pick a random word
-    word = remove_symbols(random.choice(words_in_level))
+    # Pick the next due word for logged-in users, otherwise a random word
+    word = None
+    session_data = get_optional_user()
+    if session_data:
+        word = ReviewSchedule.pick_word(
+            session_data['user_id'],
+            level,
+            lambda: random.choice(words_in_level)
+        )
+    if not word:
+        word = words_in_level[0]
+    
+    try:
+        options = build_question_options(word, words_in_level)
+    except TranslationPending:
+        return translation_pending_response()
+    except Exception as e:
+        return jsonify({'error': f'Error translating word: {e}'}), 500
+    log_payload(logger, 'question options', {'word': word, 'options': options})
+    
+    return jsonify({
+        'word': word,
+        'options': options
+    })
 
-    # Translate the correct word (cached if possible)
-    correct_translation = translations_cache.get(word)
-    if not correct_translation:
-        try:
-            correct_translation = translate_text(word)
-            translations_cache[word] = correct_translation
-        except Exception as e:
-            return jsonify({'error': f'Error translating word: {e}'}), 500
+@quiz_bp.route('/api/mistakes-question', methods=['GET'])
+@login_required
+def get_mistakes_question():
+    """
+    Returns one of the user's mistake words, picked with probability weighted
+    by how often it was missed, along with multiple-choice translation options.
+    Optional query param 'level' limits the words to one level (default 'all').
+    """
+    user_id = request.current_user['user_id']
+    level = request.args.get('level', 'all')
     
-    # Prepare 3 random wrong translations
-    wrong_words = [w for w in words_in_level if w != word]
-    random.shuffle(wrong_words)
-    wrong_words = list(map(remove_symbols, wrong_words[:3]))
-
-    # Translate wrong words
-    wrong_translations = []
-    for w in wrong_words:
-        tr = translations_cache.get(w)
-        if not tr:
-            try:
-                tr = translate_text(w)
-                translations_cache[w] = tr
-            except Exception as e:
-                return jsonify({'error': f'Error translating word: {e}'}), 500
-        wrong_translations.append(tr)
+    picked = mistake_sampler.sample_mistake(user_id, level)
+    if not picked:
+        return jsonify({'error': 'No mistakes recorded for this level yet.'}), 404
+    word, word_level = picked
     
-    # Combine correct + wrong, then shuffle
-    options = wrong_translations + [correct_translation]
-    random.shuffle(options)
-    print(options)
+    words_in_level = sample_level_words(word_level) or []
+    if len(words_in_level) < 4:
+        return jsonify({'error': 'Not enough words in this level to generate options.'}), 400
+    
+    try:
+        options = build_question_options(word, words_in_level)
+    except TranslationPending:
+        return translation_pending_response()
+    except Exception as e:
+        return jsonify({'error': f'Error translating word: {e}'}), 500
     
     return jsonify({
         'word': word,
+        'level': word_level,
         'options': options
     })
 
@@ -122,69 +221,89 @@ def get_vocabulary_question():
     Returns a random English word from the user's vocabulary library
     along with multiple-choice translation options (1 correct + 3 incorrect).
     """
-    user_id = request.current_user['user_id']
-    
-    conn = Database.get_connection()
-    cursor = conn.cursor()
-    
     try:
-        # Get all words from user's vocabulary library
-        cursor.execute('SELECT word, translation FROM vocabulary_library WHERE user_id = ?', (user_id,))
-        user_words = cursor.fetchall()
+        library = current_library()
         
-        if len(user_words) < 4:
+        if len(library) < 4:
             return jsonify({'error': 'You need at least 4 words in your vocabulary library to start a quiz.'}), 400
         
         # Pick a random word
-        selected_word = random.choice(user_words)
-        word = remove_symbols(selected_word['word'])
-        correct_translation = selected_word['translation']
-        
-        # Get 3 random wrong translations from other words in user's library
-        other_words = [w for w in user_words if w['word'] != selected_word['word']]
-        random.shuffle(other_words)
-        wrong_translations = [w['translation'] for w in other_words[:3]]
-        
-        # If user doesn't have enough words, supplement with system vocabulary translations
-        if len(wrong_translations) < 3:
-            # Get additional wrong answers from system vocabulary
-            cursor.execute('SELECT word FROM system_vocabulary ORDER BY RANDOM() LIMIT ?', (3 - len(wrong_translations),))
-            system_words = cursor.fetchall()
-            
-            for sys_word in system_words:
-                sys_word_clean = remove_symbols(sys_word['word'])
-                if sys_word_clean != word:
-                    # Get translation for system word
-                    tr = translations_cache.get(sys_word_clean)
-                    if not tr:
-                        try:
-                            tr = translate_text(sys_word_clean)
-                            translations_cache[sys_word_clean] = tr
-                        except Exception as e:
-                            continue
-                    if tr not in wrong_translations and tr != correct_translation:
-                        wrong_translations.append(tr)
-                        if len(wrong_translations) >= 3:
-                            break
-        
-        # Ensure we have exactly 3 wrong translations
-        wrong_translations = wrong_translations[:3]
-        
-        # Combine correct + wrong, then shuffle
-        options = wrong_translations + [correct_translation]
-        random.shuffle(options)
+        selected_word, correct_translation = library.random_word()
+        word = remove_symbols(selected_word)
+        options = build_library_question_options(selected_word, correct_translation, library)
         
         return jsonify({
             'word': word,
             'options': options
         })
-        
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        print(f"Error generating vocabulary question: {e}")
+        logger.exception("Error generating vocabulary question")
         return jsonify({'error': str(e)}), 500
-        
-    finally:
-        conn.close()
+
+@quiz_bp.route('/api/audio/<word>', methods=['GET'])
+def get_audio(word):
+    """
+    Serve the pronunciation of a system vocabulary word as WAV, rendering it
+    on first request. Words users add to their libraries are not rendered:
+    anyone can add any string there, which would make this an open TTS service.
+    Supports Range requests and ETag revalidation; the ETag is the audio's content hash.
+    """
+    if not AUDIO_WORD_PATTERN.match(word) or not vocabulary_index.current().contains(word):
+        return jsonify({'error': 'Word not found in vocabulary.'}), 404
+    
+    try:
+        path, digest = texToSpeech.render_word(word)
+    except Exception as e:
+        logger.exception("Error rendering audio", extra={'word': word})
+        return jsonify({'error': 'Audio is not available right now.'}), 503
+    
+    return send_file(path, mimetype='audio/wav', conditional=True, etag=digest, max_age=AUDIO_MAX_AGE)
+
+@quiz_bp.route('/api/bundles', methods=['GET'])
+def get_bundle_manifest():
+    """
+    List the offline bundle of every level with its content-hashed URL.
+    Clients revalidate this small manifest and re-download only bundles whose hash changed.
+    """
+    manifest = bundles.read_manifest()
+    if not manifest:
+        return jsonify({'error': 'Offline bundles are not available yet.'}), 404
+    
+    levels = {
+        level: {**entry, 'url': f'/api/bundles/{level}/{entry["hash"]}'}
+        for level, entry in manifest['levels'].items()
+    }
+    response = jsonify({'format': manifest['format'], 'built_at': manifest['built_at'], 'levels': levels})
+    response.cache_control.no_cache = True
+    response.set_etag(f'{manifest["format"]}-{manifest["built_at"]}')
+    return response.make_conditional(request)
+
+@quiz_bp.route('/api/bundles/<level>/<digest>', methods=['GET'])
+def get_bundle(level, digest):
+    """
+    Serve one level's offline bundle: {format, level, words: [{word, translation, audio}]}.
+    The stored gzip file is sent as is to clients that accept gzip.
+    Answers given offline are graded and recorded through /api/answers/batch.
+    """
+    path = bundles.bundle_path(level, digest)
+    if not path:
+        return jsonify({'error': 'Bundle not found.'}), 404
+    
+    if 'gzip' in request.accept_encodings:
+        response = send_file(path, mimetype='application/json', conditional=True, etag=digest, max_age=BUNDLE_MAX_AGE)
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        with open(path, 'rb') as file:
+            response = Response(gzip.decompress(file.read()), mimetype='application/json')
+        response.set_etag(digest)
+        response.cache_control.public = True
+        response.cache_control.max_age = BUNDLE_MAX_AGE
+    response.cache_control.immutable = True
+    response.vary.add('Accept-Encoding')
+    return response
 
 @quiz_bp.route('/api/check-answer', methods=['POST'])
 def check_answer():
@@ -207,74 +326,371 @@ def check_answer():
         return jsonify({'error': '"word" and "selected" must be strings.'}), 400
     
     # Verify that the word exists in the dictionary
-    if not any(word in words for words in dictionary.values()):
+    if not vocabulary_index.current().contains(word):
         return jsonify({'error': 'Word not found in vocabulary.'}), 400
     
-    correct_translation = translations_cache.get(word)
-    if not correct_translation:
+    try:
+        correct_translation = get_translation(word)
+    except TranslationPending:
+        return translation_pending_response()
+    except Exception as e:
+        return jsonify({'error': f'Error translating word: {e}'}), 500
+    
+    correct = (selected.strip().lower() == correct_translation.strip().lower())
+    
+    # Track user progress if authenticated
+    session_data = get_optional_user()
+    if session_data and level:
+        progress = UserProgress.record_answer(session_data['user_id'], level, word, correct)
+        mistake_sampler.record_answer(
+            session_data['user_id'], level, word,
+            progress['correct_count'], progress['incorrect_count']
+        )
+    
+    return jsonify({
+        'correct': correct,
+        'correctTranslation': correct_translation
+    })
+
+@quiz_bp.route('/api/answers/batch', methods=['POST'])
+@login_required
+def check_answers_batch():
+    """
+    Grade and record many answers at once, e.g. from a client that quizzed offline.
+    Body: { "answers": [{ "event_id": "...", "level": "...", "word": "...", "selected": "..." }] }
+    event_id is the client's unique id for the answer: uploading it again is
+    harmless and returns status 'duplicate'. All valid answers are recorded in
+    one transaction, with the server's time. Answers to words that have no
+    stored translation yet are not recorded and get status 'pending'.
+    Returns one result per answer:
+    { event_id, status: 'recorded' | 'duplicate' | 'invalid' | 'pending', correct, correctTranslation, error }.
+    """
+    user_id = request.current_user['user_id']
+    data = request.get_json(silent=True) or {}
+    items = data.get('answers')
+    
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': '"answers" must be a non-empty list.'}), 400
+    if len(items) > MAX_BATCH_ANSWERS:
+        return jsonify({'error': f'At most {MAX_BATCH_ANSWERS} answers can be uploaded at once.'}), 400
+    
+    results = []
+    graded = []
+    index = vocabulary_index.current()
+    for item in items:
+        item = item if isinstance(item, dict) else {}
+        event_id, level, word, selected = (item.get(key) for key in ('event_id', 'level', 'word', 'selected'))
+        result = {'event_id': event_id}
+        results.append(result)
+        
+        if not isinstance(event_id, str) or not 0 < len(event_id) <= MAX_EVENT_ID_LENGTH:
+            result.update(status='invalid', error=f'"event_id" must be a string of 1 to {MAX_EVENT_ID_LENGTH} characters.')
+            continue
+        if not all(isinstance(value, str) and value for value in (level, word, selected)):
+            result.update(status='invalid', error='"level", "word" and "selected" must be non-empty strings.')
+            continue
+        if not index.contains(word, level):
+            result.update(status='invalid', error='Word not found in this level.')
+            continue
+        
+        try:
+            correct_translation = get_translation(word)
+        except TranslationPending:
+            result.update(status='pending', error='Translation not ready yet, upload this answer again later.')
+            continue
+        except Exception as e:
+            result.update(status='invalid', error=f'Error translating word: {e}')
+            continue
+        
+        correct = (selected.strip().lower() == correct_translation.strip().lower())
+        result.update(correct=correct, correctTranslation=correct_translation)
+        graded.append({'event_id': event_id, 'level': level, 'word': word, 'is_correct': correct})
+    
+    recorded = UserProgress.record_answers_batch(user_id, graded) if graded else None
+    if recorded:
+        for (level, word), progress in recorded['progress'].items():
+            mistake_sampler.record_answer(user_id, level, word, progress['correct_count'], progress['incorrect_count'])
+        
+        # Duplicates report the answer recorded first, earlier or in this batch
+        first_answers = dict(recorded['duplicates'])
+        new_events = set(recorded['recorded'])
+        for result in results:
+            if 'status' in result:
+                continue
+            if result['event_id'] in new_events:
+                result['status'] = 'recorded'
+                new_events.discard(result['event_id'])
+                first_answers[result['event_id']] = result['correct']
+            else:
+                result['status'] = 'duplicate'
+                result['correct'] = first_answers[result['event_id']]
+    
+    return jsonify({
+        'results': results,
+        'recorded': len(recorded['recorded']) if recorded else 0
+    })
+
+def session_question(session, word):
+    """Build the question for a word of a quiz session: {word, level, options}"""
+    if session['source'] == 'library':
+        library = current_library()
+        translation = library.translation_of(word) or get_translation(word)
+        options = build_library_question_options(word, translation, library)
+    else:
+        words_in_level = sample_level_words(session['level']) or []
+        options = build_question_options(word, words_in_level)
+    return {'word': word, 'level': session['level'], 'options': options}
+
+@quiz_bp.route('/api/quiz-sessions', methods=['POST'])
+@login_required
+def create_quiz_session():
+    """
+    Start a quiz session. Body: { "source": "level" | "library", "level": "...", "length": 20 }
+    ("level" is required for the level source). The word order is fixed now:
+    for a level, the user's due words come first, then random unseen words.
+    Returns the session and its first question; answers go to
+    /api/quiz-sessions/<id>/answer, which returns each next question.
+    """
+    user_id = request.current_user['user_id']
+    data = request.get_json() or {}
+    source = data.get('source', 'level')
+    level = data.get('level')
+    length = data.get('length', DEFAULT_QUIZ_SESSION_LENGTH)
+    
+    if source not in QUIZ_SESSION_SOURCES:
+        return jsonify({'error': f'"source" must be one of: {", ".join(QUIZ_SESSION_SOURCES)}.'}), 400
+    if not isinstance(length, int) or isinstance(length, bool) or not 1 <= length <= QuizSession.MAX_LENGTH:
+        return jsonify({'error': f'"length" must be an integer from 1 to {QuizSession.MAX_LENGTH}.'}), 400
+    
+    if source == 'library':
+        level = None
+        library = current_library()
+        if len(library) < 4:
+            return jsonify({'error': 'You need at least 4 words in your vocabulary library to start a quiz.'}), 400
+        order = random.sample(library.words, min(length, len(library)))
+    else:
+        if not isinstance(level, str):
+            return jsonify({'error': '"level" is required for the level source.'}), 400
+        due_words = ReviewSchedule.get_due_words(user_id, level, length)
+        
+        # Over-draw by the due words, which may come up again in the sample
+        words_in_level = sample_level_words(level, length + len(due_words)) or []
+        if len(words_in_level) < 4:
+            return jsonify({'error': 'Invalid level or not enough words in this level.'}), 400
+        
+        due = set(due_words)
+        fresh = [w for w in words_in_level if w not in due]
+        order = due_words + fresh[:length - len(due_words)]
+    
+    session_id = QuizSession.create(user_id, source, level, order)
+    session = {'id': session_id, 'source': source, 'level': level}
+    try:
+        question = session_question(session, order[0])
+    except TranslationPending:
+        return translation_pending_response()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Error translating word: {e}'}), 500
+    
+    return jsonify({
+        'session_id': session_id,
+        'source': source,
+        'level': level,
+        'length': len(order),
+        'position': 0,
+        'question': question
+    }), 201
+
+@quiz_bp.route('/api/quiz-sessions/<int:session_id>', methods=['GET'])
+@login_required
+def get_quiz_session(session_id):
+    """Get a quiz session's progress and current question, e.g. to resume it"""
+    user_id = request.current_user['user_id']
+    session = QuizSession.get(user_id, session_id)
+    if not session:
+        return jsonify({'error': 'Quiz session not found.'}), 404
+    
+    question = None
+    if not session['finished']:
         try:
-            correct_translation = translate_text(word)
-            translations_cache[word] = correct_translation
+            question = session_question(session, session['word'])
+        except TranslationPending:
+            return translation_pending_response()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': f'Error translating word: {e}'}), 500
     
+    return jsonify({
+        'session_id': session_id,
+        'source': session['source'],
+        'level': session['level'],
+        'length': session['length'],
+        'position': session['position'],
+        'correct_count': session['correct_count'],
+        'finished': session['finished'],
+        'question': question
+    })
+
+@quiz_bp.route('/api/quiz-sessions/<int:session_id>/answer', methods=['POST'])
+@login_required
+def answer_quiz_session(session_id):
+    """
+    Answer the current question of a quiz session. Body: { "selected": "..." }
+    Grades the answer, records progress and returns the result together with
+    the next question ('next' is null once the session is finished).
+    Answers in a library session only update the word's review record in the
+    library: progress, mistakes and the answer_events log are keyed by a
+    system vocabulary word and level, which library words don't have, just
+    as /api/check-answer records nothing without a level.
+    """
+    user_id = request.current_user['user_id']
+    data = request.get_json() or {}
+    selected = data.get('selected')
+    if not isinstance(selected, str) or not selected:
+        return jsonify({'error': '"selected" must be a non-empty string.'}), 400
+    
+    session = QuizSession.get(user_id, session_id)
+    if not session:
+        return jsonify({'error': 'Quiz session not found.'}), 404
+    if session['finished']:
+        return jsonify({'error': 'This quiz session is already finished.'}), 409
+    word = session['word']
+    
+    try:
+        correct_translation = session['translation'] or get_translation(word)
+    except TranslationPending:
+        return translation_pending_response()
+    except Exception as e:
+        return jsonify({'error': f'Error translating word: {e}'}), 500
     correct = (selected.strip().lower() == correct_translation.strip().lower())
     
-    # Track user progress if authenticated
-    session_token = request.headers.get('Authorization')
-    if session_token and session_token.startswith('Bearer '):
-        session_token = session_token[7:]
-        from app.models import Session
-        session_data = Session.validate_session(session_token)
-        if session_data and level:
-            UserProgress.record_answer(session_data['user_id'], level, word, correct)
+    # Moving the session on first makes a resubmitted answer a no-op
+    if not QuizSession.advance(session_id, session['position'], correct):
+        return jsonify({'error': 'This question has already been answered.'}), 409
     
+    if session['source'] == 'library':
+        # Library words have no level, so there is no progress row to record against
+        VocabularyLibrary.record_review(user_id, word)
+    else:
+        progress = UserProgress.record_answer(user_id, session['level'], word, correct)
+        mistake_sampler.record_answer(
+            user_id, session['level'], word,
+            progress['correct_count'], progress['incorrect_count']
+        )
+    
+    next_question = None
+    if session['next_word']:
+        try:
+            next_question = session_question(session, session['next_word'])
+        except Exception as e:
+            # The client can fetch it again from GET /api/quiz-sessions/<id>
+            logger.exception("Error building next quiz session question", extra={'session_id': session_id})
+    
+    position = session['position'] + 1
     return jsonify({
         'correct': correct,
-        'correctTranslation': correct_translation
+        'correctTranslation': correct_translation,
+        'position': position,
+        'length': session['length'],
+        'correct_count': session['correct_count'] + (1 if correct else 0),
+        'finished': position >= session['length'],
+        'next': next_question
     })
 
 @quiz_bp.route('/api/user/stats', methods=['GET'])
 @login_required
+@user_etag
 def get_user_stats():
     """Get user's learning statistics"""
     user_id = request.current_user['user_id']
     stats = UserProgress.get_user_stats(user_id)
     return jsonify(stats)
 
+@quiz_bp.route('/api/user/stats/history', methods=['GET'])
+@login_required
+def get_user_stats_history():
+    """
+    Get the user's daily answer history from the rollup table.
+    Query params 'from' and 'to' are YYYY-MM-DD (UTC) and default to the last 30 days.
+    """
+    user_id = request.current_user['user_id']
+    
+    try:
+        today = AnswerHistory.date_to_day(datetime.utcnow().strftime('%Y-%m-%d'))
+        to_day = AnswerHistory.date_to_day(request.args['to']) if request.args.get('to') else today
+        from_day = AnswerHistory.date_to_day(request.args['from']) if request.args.get('from') else to_day - 29
+    except ValueError:
+        return jsonify({'error': '"from" and "to" must be dates in YYYY-MM-DD format.'}), 400
+    
+    if from_day > to_day:
+        return jsonify({'error': '"from" must not be after "to".'}), 400
+    
+    if to_day - from_day + 1 > MAX_HISTORY_DAYS:
+        return jsonify({'error': f'Date range cannot exceed {MAX_HISTORY_DAYS} days.'}), 400
+    
+    history = AnswerHistory.get_daily_history(user_id, from_day, to_day)
+    return jsonify({
+        'from': AnswerHistory.day_to_date(from_day),
+        'to': AnswerHistory.day_to_date(to_day),
+        'history': history
+    })
+
 @quiz_bp.route('/api/user/mistakes', methods=['GET'])
 @login_required
+@user_etag
 def get_user_mistakes():
-    """Get user's mistake records"""
+    """
+    Get user's mistake records. Words without a stored translation come back
+    with translation null and are queued for the job workers to translate;
+    such a response is not cached, since it changes once they are done.
+    """
     user_id = request.current_user['user_id']
     level = request.args.get('level', 'all')
     mistakes = UserProgress.get_user_mistakes(user_id, level)
-    return jsonify(mistakes)
+    response = jsonify(mistakes)
+    
+    untranslated = [mistake['word'] for mistake in mistakes['mistakes'] if not mistake['translation']]
+    if untranslated:
+        jobs.enqueue('translate_words', {'words': untranslated}, priority=5, unique_key=f'translate_mistakes:{user_id}')
+        response.cache_control.no_store = True
+    return response
 
 @quiz_bp.route('/api/vocabulary', methods=['GET'])
 @login_required
+@user_etag
 def get_vocabulary():
     """Get user's vocabulary library"""
     try:
-        print(f"[DEBUG] get_vocabulary called")
-        print(f"[DEBUG] request.current_user: {request.current_user}")
-        
         user_id = request.current_user['user_id']
         search_term = request.args.get('search', '')
         level = request.args.get('level', 'all')
         
-        print(f"[DEBUG] user_id: {user_id}, search_term: '{search_term}', level: '{level}'")
-        
         vocabulary = VocabularyLibrary.get_user_vocabulary(user_id, search_term, level)
-        print(f"[DEBUG] vocabulary result: {vocabulary}")
+        log_payload(logger, 'vocabulary result', vocabulary)
         
         return jsonify(vocabulary)
     except Exception as e:
-        print(f"[ERROR] get_vocabulary failed: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("get_vocabulary failed")
         return jsonify({'error': f'Failed to fetch vocabulary: {str(e)}'}), 500
 
+@quiz_bp.route('/api/vocabulary/changes', methods=['GET'])
+@login_required
+def get_vocabulary_changes():
+    """
+    Delta sync of user's vocabulary library: rows added, changed or deleted
+    after ?since=<cursor> (0 or absent for everything), at most ?limit= per call.
+    """
+    user_id = request.current_user['user_id']
+    try:
+        since = max(int(request.args.get('since', 0)), 0)
+        limit = min(max(int(request.args.get('limit', 500)), 1), 1000)
+    except ValueError:
+        return jsonify({'error': 'since and limit must be numbers'}), 400
+    
+    return jsonify(VocabularyLibrary.get_changes(user_id, since, limit))
+
 @quiz_bp.route('/api/vocabulary/suggestions', methods=['GET'])
 @login_required
 def get_vocabulary_suggestions():
@@ -331,7 +747,7 @@ def get_vocabulary_suggestions():
         return jsonify({'suggestions': suggestions})
         
     except Exception as e:
-        print(f"Error fetching vocabulary suggestions: {e}")
+        logger.exception("Error fetching vocabulary suggestions")
         return jsonify({'error': str(e)}), 500
         
     finally:
@@ -356,8 +772,8 @@ def search_system_vocabulary():
         query = '''
             SELECT sv.word, sv.level
             FROM system_vocabulary sv
-            LEFT JOIN vocabulary_library vl ON sv.word = vl.word AND vl.user_id = ?
-            WHERE sv.word LIKE ? AND vl.word IS NULL
+            LEFT JOIN vocabulary_library vl ON vl.user_id = ? AND vl.word_id = sv.word_id
+            WHERE sv.word LIKE ? AND vl.id IS NULL
         '''
         
         params = [user_id, f"%{search_query}%"]
@@ -391,15 +807,8 @@ def search_system_vocabulary():
             word = row['word']
             level = row['level']
             
-            # Get translation from cache or translate
-            translation = translations_cache.get(word)
-            if not translation:
-                try:
-                    translation = translate_text(word)
-                    translations_cache[word] = translation
-                except Exception as e:
-                    print(f"Error translating word {word}: {e}")
-                    translation = ""
+            # Stored translations only; a missing one is queued for the job workers
+            translation = stored_translation(word) or ""
             
             search_results.append({
                 'word': word,
@@ -411,7 +820,7 @@ def search_system_vocabulary():
         return jsonify({'results': search_results})
         
     except Exception as e:
-        print(f"Error searching system vocabulary: {e}")
+        logger.exception("Error searching system vocabulary")
         return jsonify({'error': str(e)}), 500
         
     finally:
@@ -443,10 +852,51 @@ def add_vocabulary():
     )
     
     if success:
+        if not translation:
+            jobs.enqueue('translate_words', {'user_id': user_id, 'words': [word]}, priority=5)
         return jsonify({'message': '單字已成功新增至您的單字庫'})
     else:
         return jsonify({'error': '新增單字失敗'}), 500
 
+@quiz_bp.route('/api/vocabulary/batch', methods=['POST'])
+@login_required
+def import_vocabulary():
+    """
+    Add many words to user's vocabulary library at once from a CSV, JSON or
+    NDJSON body. Returns as soon as the words are saved; missing translations
+    are filled in the background and can be followed on the status endpoint.
+    """
+    user_id = request.current_user['user_id']
+    
+    try:
+        rows = vocabulary_import.parse_import(request.get_data(as_text=True), request.content_type)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if not rows:
+        return jsonify({'error': '請提供單字資料'}), 400
+    
+    result = VocabularyLibrary.add_words_batch(user_id, rows)
+    if not result:
+        return jsonify({'error': '匯入單字失敗'}), 500
+    
+    if result['pending_translations']:
+        jobs.enqueue('resolve_import', {'import_id': result['import_id']}, priority=5)
+    
+    status = VocabularyImport.get_status(user_id, result['import_id'])
+    return jsonify(status), 202
+
+@quiz_bp.route('/api/vocabulary/batch/<int:import_id>', methods=['GET'])
+@login_required
+def get_vocabulary_import(import_id):
+    """Get the progress of a bulk vocabulary import"""
+    user_id = request.current_user['user_id']
+    
+    status = VocabularyImport.get_status(user_id, import_id)
+    if not status:
+        return jsonify({'error': '找不到匯入紀錄'}), 404
+    return jsonify(status)
+
 @quiz_bp.route('/api/vocabulary/<word>', methods=['DELETE'])
 @login_required
 def remove_vocabulary(word):
@@ -491,3 +941,83 @@ def record_vocabulary_review(word):
         return jsonify({'message': '單字複習記錄已更新'})
     else:
         return jsonify({'error': '更新複習記錄失敗'}), 404
+
+@quiz_bp.route('/api/admin/audio/<level>', methods=['POST'])
+@admin_required
+def prerender_level_audio(level):
+    """Queue a job that renders the audio of every word in a level"""
+    if level not in vocabulary_index.current():
+        return jsonify({'error': f'Level "{level}" not found.'}), 404
+    
+    job_id = jobs.enqueue('render_level_audio', {'level': level}, unique_key=f'render_level_audio:{level}')
+    return jsonify({'job_id': job_id}), 202
+
+@quiz_bp.route('/api/admin/bundles', methods=['POST'])
+@admin_required
+def rebuild_bundles():
+    """Queue a job that translates every word and rebuilds the offline bundles"""
+    job_id = jobs.enqueue('build_bundles', priority=1, unique_key='build_bundles')
+    return jsonify({'job_id': job_id}), 202
+
+@quiz_bp.route('/api/admin/vocabulary/reload', methods=['POST'])
+@admin_required
+def reload_vocabulary():
+    """
+    Queue a job that ingests the vocabulary into the database: the local PDFs,
+    or with {"download": true} the latest published word list. An ingest that
+    changes the word list bumps the system vocabulary version; every web worker
+    then rebuilds its index in the background and swaps it in, without a
+    restart. {"force": true} re-ingests sources that look unchanged.
+    Progress is visible in /api/admin/jobs and /api/admin/metrics.
+    """
+    data = request.get_json(silent=True) or {}
+    if data.get('download'):
+        job_id = jobs.enqueue('download_vocabulary', priority=10, unique_key='download_vocabulary')
+    else:
+        job_id = jobs.enqueue(
+            'ingest_vocabulary', {'force': bool(data.get('force'))}, priority=10, unique_key='ingest_vocabulary'
+        )
+    return jsonify({'job_id': job_id, 'vocabulary_version': vocabulary_index.current().version}), 202
+
+@quiz_bp.route('/api/admin/metrics', methods=['GET'])
+@admin_required
+def get_metrics():
+    """
+    Vocabulary versions: the database's, the one this worker serves, and the
+    one every web worker reported in the last few minutes, so a worker lagging
+    behind after a reload stands out.
+    """
+    index = vocabulary_index.current()
+    conn = Database.get_connection()
+    database_version = SystemVocabulary.get_version(conn.cursor())
+    conn.close()
+    
+    return jsonify({
+        'vocabulary': {
+            'database_version': database_version,
+            'worker': {
+                'worker_id': vocabulary_index.worker_id(),
+                'vocabulary_version': index.version,
+                'loaded_at': int(index.loaded_at),
+                'words': len(index),
+                'levels': len(index.levels),
+            },
+            'workers': WorkerHeartbeat.list_active(),
+        }
+    })
+
+@quiz_bp.route('/api/admin/jobs', methods=['GET'])
+@admin_required
+def list_jobs():
+    """
+    List background jobs, newest first, with counts per status.
+    Optional filters: ?status=queued|running|succeeded|failed, ?type=<job type>, ?limit=
+    """
+    status = request.args.get('status')
+    job_type = request.args.get('type')
+    try:
+        limit = min(max(int(request.args.get('limit', 50)), 1), 500)
+    except ValueError:
+        return jsonify({'error': 'limit must be a number'}), 400
+    
+    return jsonify(JobQueue.list_jobs(status, job_type, limit))
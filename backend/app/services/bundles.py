@@ -0,0 +1,118 @@
+# backend/app/services/bundles.py
+
+import os
+import re
+import json
+import gzip
+import time
+import hashlib
+from ..models import SystemVocabulary, Lexicon
+
+BUNDLE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'temp', 'bundles')
+MANIFEST_PATH = os.path.join(BUNDLE_DIR, 'manifest.json')
+
+# Bump when the bundle layout changes; it is part of every bundle's hash
+BUNDLE_FORMAT_VERSION = 1
+HASH_LENGTH = 16
+HASH_PATTERN = re.compile(r'^[0-9a-f]{%d}$' % HASH_LENGTH)
+
+# Superseded bundles stay downloadable this long, for clients holding an older manifest
+SUPERSEDED_BUNDLE_TTL = 24 * 3600
+
+_manifest = None
+_manifest_mtime = None
+
+def bundle_filename(level, digest):
+    return f'{level}.{digest}.json.gz'
+
+def level_words(level):
+    """The words of a level as questions show them: their canonical forms"""
+    return SystemVocabulary.get_words_by_level(level, canonical=True)
+
+def build_level_bundle(level, translations, include_audio=True):
+    """
+    Write the bundle of one level and return its manifest entry. The bundle
+    is canonical JSON, gzipped without a timestamp, named by the hash of its
+    content, so the same words and translations always give the same file.
+    Words without a translation are left out.
+    """
+    entries = []
+    for word in level_words(level):
+        translation = translations.get(word)
+        if not translation:
+            continue
+        entry = {'word': word, 'translation': translation}
+        if include_audio:
+            entry['audio'] = f'/api/audio/{word}'
+        entries.append(entry)
+    
+    content = json.dumps(
+        {'format': BUNDLE_FORMAT_VERSION, 'level': level, 'words': entries},
+        ensure_ascii=False, sort_keys=True, separators=(',', ':')
+    ).encode('utf-8')
+    digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+    
+    path = os.path.join(BUNDLE_DIR, bundle_filename(level, digest))
+    if not os.path.exists(path):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as file:
+            file.write(gzip.compress(content, mtime=0))
+        os.replace(tmp_path, path)
+    
+    return {
+        'hash': digest,
+        'word_count': len(entries),
+        'size': os.path.getsize(path),
+    }
+
+def build_bundles(levels=None, include_audio=True):
+    """
+    Build the bundles of the given levels (default: all) from the stored
+    translations and publish them in the manifest. Superseded bundles are
+    deleted once older than SUPERSEDED_BUNDLE_TTL. Returns the manifest.
+    """
+    os.makedirs(BUNDLE_DIR, exist_ok=True)
+    translations = Lexicon.get_translations()
+    all_levels = sorted(SystemVocabulary.get_all_words())
+    
+    manifest = dict(read_manifest() or {'levels': {}})
+    manifest['levels'] = {level: entry for level, entry in manifest['levels'].items() if level in all_levels}
+    for level in levels or all_levels:
+        manifest['levels'][level] = build_level_bundle(level, translations, include_audio)
+    manifest['format'] = BUNDLE_FORMAT_VERSION
+    manifest['built_at'] = int(time.time())
+    
+    tmp_path = MANIFEST_PATH + '.tmp'
+    with open(tmp_path, 'w') as file:
+        json.dump(manifest, file, sort_keys=True)
+    os.replace(tmp_path, MANIFEST_PATH)
+    
+    live = {bundle_filename(level, entry['hash']) for level, entry in manifest['levels'].items()}
+    cutoff = time.time() - SUPERSEDED_BUNDLE_TTL
+    for name in os.listdir(BUNDLE_DIR):
+        path = os.path.join(BUNDLE_DIR, name)
+        if name.endswith('.json.gz') and name not in live and os.path.getmtime(path) < cutoff:
+            os.remove(path)
+    
+    return manifest
+
+def read_manifest():
+    """Return the bundle manifest, re-reading it only when the file changes"""
+    global _manifest, _manifest_mtime
+    try:
+        mtime = os.path.getmtime(MANIFEST_PATH)
+    except OSError:
+        return None
+    
+    if _manifest is None or mtime != _manifest_mtime:
+        with open(MANIFEST_PATH) as file:
+            _manifest, _manifest_mtime = json.load(file), mtime
+    return _manifest
+
+def bundle_path(level, digest):
+    """Path of the bundle of a level with the given hash, or None if there is none"""
+    manifest = read_manifest()
+    if not manifest or level not in manifest['levels'] or not HASH_PATTERN.match(digest):
+        return None
+    path = os.path.join(BUNDLE_DIR, bundle_filename(level, digest))
+    return path if os.path.exists(path) else None
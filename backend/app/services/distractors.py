@@ -0,0 +1,224 @@
+# backend/app/services/distractors.py
+
+import os
+import random
+import logging
+import time
+import zlib
+from ..models import SystemVocabulary, Lexicon
+from . import vocabulary_index
+
+# numpy is imported where it is used: importing the app must not load it, and
+# create_app loads the index (see get_index), so preloading gunicorn masters share it
+
+INDEX_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'temp', 'distractors.npz')
+
+# Feature layout: hashed word trigrams | hashed translation bigrams | length buckets | level one-hot
+WORD_NGRAM = 3
+TRANSLATION_NGRAM = 2
+NGRAM_DIMS = 128
+MAX_LENGTH_BUCKET = 20
+
+# Relative importance of each feature block in the cosine similarity
+WORD_WEIGHT = 1.0
+TRANSLATION_WEIGHT = 0.8
+LENGTH_WEIGHT = 0.5
+LEVEL_WEIGHT = 0.4
+
+# Distractors are drawn at random from this many most similar words,
+# so the same word doesn't always get the same options
+CANDIDATE_POOL = 12
+
+logger = logging.getLogger(__name__)
+
+# Seconds a process waits before asking the job workers again for a missing index
+REBUILD_REQUEST_INTERVAL = 60
+
+_index = None
+_index_mtime = None
+_rebuild_requested_at = None
+
+def _ngram_vector(text, n):
+    """Hash the character n-grams of text into a fixed-size, L2-normalised vector"""
+    import numpy as np
+    vector = np.zeros(NGRAM_DIMS, dtype=np.float32)
+    if not text:
+        return vector
+    padded = f' {text.lower()} '
+    for i in range(max(len(padded) - n + 1, 1)):
+        vector[zlib.crc32(padded[i:i + n].encode('utf-8')) % NGRAM_DIMS] += 1
+    return vector / np.linalg.norm(vector)
+
+def _length_vector(word):
+    """Soft one-hot of the word length, so neighbouring lengths are similar"""
+    import numpy as np
+    vector = np.zeros(MAX_LENGTH_BUCKET, dtype=np.float32)
+    bucket = min(len(word), MAX_LENGTH_BUCKET) - 1
+    vector[bucket] = 1.0
+    if bucket > 0:
+        vector[bucket - 1] = 0.5
+    if bucket < MAX_LENGTH_BUCKET - 1:
+        vector[bucket + 1] = 0.5
+    return vector / np.linalg.norm(vector)
+
+class DistractorIndex:
+    """
+    Feature matrix over every system word with one row per (word, level).
+    Rows are unit length, so one matrix-vector product gives the cosine
+    similarity of a word against the whole vocabulary.
+    """
+    
+    def __init__(self, matrix, words, groups):
+        self.matrix = matrix  # float32, shape (rows, features)
+        self.words = words  # cleaned word per row
+        self.groups = groups  # int32 id shared by rows of the same word
+        self.row_of = {}
+        for row, word in enumerate(words.tolist()):
+            self.row_of.setdefault(word, row)
+    
+    @classmethod
+    def build(cls, word_levels, translations):
+        """Build the index from (word, level) pairs and a word -> translation mapping"""
+        import numpy as np
+        levels = sorted({level for _, level in word_levels})
+        level_column = {level: i for i, level in enumerate(levels)}
+        feature_count = 2 * NGRAM_DIMS + MAX_LENGTH_BUCKET + len(levels)
+        
+        matrix = np.zeros((len(word_levels), feature_count), dtype=np.float32)
+        group_of = {}
+        groups = np.zeros(len(word_levels), dtype=np.int32)
+        
+        for row, (word, level) in enumerate(word_levels):
+            offset = 0
+            matrix[row, offset:offset + NGRAM_DIMS] = WORD_WEIGHT * _ngram_vector(word, WORD_NGRAM)
+            offset += NGRAM_DIMS
+            matrix[row, offset:offset + NGRAM_DIMS] = TRANSLATION_WEIGHT * _ngram_vector(
+                translations.get(word), TRANSLATION_NGRAM
+            )
+            offset += NGRAM_DIMS
+            matrix[row, offset:offset + MAX_LENGTH_BUCKET] = LENGTH_WEIGHT * _length_vector(word)
+            offset += MAX_LENGTH_BUCKET
+            matrix[row, offset + level_column[level]] = LEVEL_WEIGHT
+            groups[row] = group_of.setdefault(word, len(group_of))
+        
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms > 0, norms, 1)
+        
+        words = np.array([word for word, _ in word_levels], dtype=np.str_)
+        return cls(matrix, words, groups)
+    
+    def save(self, path):
+        import numpy as np
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Per-process name: workers that find the index missing may all build it at once
+        tmp_path = f'{path}.{os.getpid()}.tmp.npz'
+        np.savez(tmp_path, matrix=self.matrix, words=self.words, groups=self.groups)
+        os.replace(tmp_path, path)
+    
+    @classmethod
+    def load(cls, path):
+        import numpy as np
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['matrix'], data['words'], data['groups'])
+    
+    def similar_words(self, word, count=CANDIDATE_POOL):
+        """
+        Return up to count other words ordered by similarity to word,
+        or None if the word is not in the index.
+        """
+        import numpy as np
+        row = self.row_of.get(word)
+        if row is None:
+            return None
+        
+        similarity = self.matrix @ self.matrix[row]
+        similarity[self.groups == self.groups[row]] = -np.inf
+        
+        # Over-fetch: the same word can occupy several rows (one per level)
+        pool = min(count * 2, len(similarity) - 1)
+        if pool <= 0:
+            return []
+        top = np.argpartition(-similarity, pool - 1)[:pool]
+        top = top[np.argsort(-similarity[top])]
+        
+        result = []
+        for candidate in self.words[top].tolist():
+            if candidate not in result:
+                result.append(candidate)
+            if len(result) == count:
+                break
+        return result
+
+def build_index():
+    """
+    Build the distractor index from the system vocabulary and the stored
+    translations, and save it next to the vocabulary PDF. Called at ingest time
+    and by the rebuild_distractors job once translations arrive.
+    """
+    global _index, _index_mtime
+    translations = Lexicon.get_translations()
+    word_levels = []
+    for level, words in SystemVocabulary.get_all_words(canonical=True).items():
+        word_levels.extend((word, level) for word in words)
+    
+    if not word_levels:
+        return None
+    
+    index = DistractorIndex.build(word_levels, translations)
+    index.save(INDEX_PATH)
+    _index, _index_mtime = index, os.path.getmtime(INDEX_PATH)
+    return index
+
+def get_index():
+    """
+    Return the distractor index, reloading it if another process rebuilt the
+    file. If there is no file yet, have the job workers build it and return
+    None, so the request falls back to random distractors meanwhile.
+    """
+    global _index, _index_mtime, _rebuild_requested_at
+    try:
+        mtime = os.path.getmtime(INDEX_PATH)
+    except OSError:
+        if _rebuild_requested_at is None or time.monotonic() - _rebuild_requested_at >= REBUILD_REQUEST_INTERVAL:
+            from .jobs import enqueue_distractor_rebuild
+            _rebuild_requested_at = time.monotonic()
+            enqueue_distractor_rebuild()
+        return None
+    
+    if _index is None or mtime != _index_mtime:
+        _index, _index_mtime = DistractorIndex.load(INDEX_PATH), mtime
+    return _index
+
+def pick_distractors(word, correct_translation, count=3):
+    """
+    Pick count wrong translations for word from its most similar words,
+    skipping any that repeat the correct translation or each other. Only
+    words with a translation in the vocabulary snapshot are candidates: the
+    translator is never called here. Returns None, so the caller falls back
+    to random wrong answers, if the word is unknown to the index, too few
+    candidates are translated, or anything goes wrong.
+    """
+    try:
+        index = get_index()
+        candidates = index.similar_words(word) if index else None
+        if candidates is None:
+            return None
+        
+        snapshot = vocabulary_index.current()
+        random.shuffle(candidates)
+        seen = {correct_translation.strip().lower()}
+        translations = []
+        for candidate in candidates:
+            translation = snapshot.translation(candidate)
+            if not translation:
+                continue
+            key = translation.strip().lower()
+            if key in seen:
+                continue
+            seen.add(key)
+            translations.append(translation)
+            if len(translations) == count:
+                return translations
+    except Exception:
+        logger.exception("Error picking distractors for '%s'", word)
+    return None
@@ -0,0 +1,212 @@
+# backend/app/services/jobs.py
+
+import os
+import logging
+import signal
+import socket
+import threading
+import time
+import traceback
+import multiprocessing
+from ..models import JobQueue
+
+# Seconds between queue polls when a worker finds nothing to do
+POLL_INTERVAL = 1.0
+# How often the supervisor deletes old succeeded jobs, and how old they must be
+PURGE_INTERVAL = 3600
+PURGE_AFTER = 7 * 24 * 3600
+# How often the supervisor queues the answer history rollup (see rollup_stats.py)
+ROLLUP_INTERVAL = 3600
+
+HANDLERS = {}  # job type -> function(payload)
+
+logger = logging.getLogger(__name__)
+
+def handler(job_type):
+    """Register a function as the handler of a job type"""
+    def register(function):
+        HANDLERS[job_type] = function
+        return function
+    return register
+
+def enqueue(job_type, payload=None, **options):
+    """
+    Queue a job for the worker pool and return its id. This is all the web
+    workers do with slow work; options are passed on to JobQueue.enqueue.
+    """
+    if job_type not in HANDLERS:
+        raise ValueError(f"Unknown job type: {job_type}")
+    return JobQueue.enqueue(job_type, payload, **options)
+
+def enqueue_distractor_rebuild():
+    """Queue a rebuild of the distractor index, unless one is already queued or running"""
+    return enqueue('rebuild_distractors', priority=2, unique_key='rebuild_distractors')
+
+# Handlers import their services lazily so the web process doesn't load them
+
+@handler('resolve_import')
+def _resolve_import(payload):
+    from .vocabulary_import import resolve_import
+    resolve_import(payload['import_id'])
+
+@handler('translate_words')
+def _translate_words(payload):
+    from .translation import translate_batch
+    from ..models import VocabularyLibrary
+    translations, failed = translate_batch(payload['words'])
+    if payload.get('user_id'):
+        VocabularyLibrary.fill_translations(payload['user_id'], translations)
+    if translations:
+        enqueue_distractor_rebuild()
+    if failed:
+        raise RuntimeError(f"Could not translate: {', '.join(failed)}")
+
+@handler('download_vocabulary')
+def _download_vocabulary(payload):
+    from .vocabulary import download_vocs
+    if not download_vocs():
+        raise RuntimeError("Vocabulary download or ingest failed")
+
+@handler('ingest_vocabulary')
+def _ingest_vocabulary(payload):
+    from .vocabulary import ingest_vocabulary
+    if ingest_vocabulary(payload.get('sources'), force=payload.get('force', False)) is None:
+        raise RuntimeError("Vocabulary ingest failed")
+
+@handler('rebuild_distractors')
+def _rebuild_distractors(payload):
+    from .distractors import build_index
+    build_index()
+
+@handler('render_level_audio')
+def _render_level_audio(payload):
+    from .texToSpeech import prerender_words
+    from ..models import SystemVocabulary
+    result = prerender_words(SystemVocabulary.get_words_by_level(payload['level'], canonical=True))
+    if result['failed']:
+        raise RuntimeError(f"{result['failed']} words failed to render")
+
+@handler('build_bundles')
+def _build_bundles(payload):
+    from .bundles import build_bundles, level_words
+    from .translation import translate_batch
+    from .vocabulary_index import write_snapshot
+    from ..models import SystemVocabulary
+    # Pre-translate every word so the bundles are complete, and hand the new
+    # translations to the web workers through a fresh vocabulary snapshot
+    levels = payload.get('levels') or sorted(SystemVocabulary.get_all_words())
+    words = [word for level in levels for word in level_words(level)]
+    _, failed = translate_batch(words)
+    write_snapshot()
+    # The distractor index compares translations too, so it needs rebuilding with them
+    enqueue_distractor_rebuild()
+    build_bundles(payload.get('levels'))
+    if failed:
+        raise RuntimeError(f"{len(failed)} words could not be translated and were left out")
+
+@handler('rollup_stats')
+def _rollup_stats(payload):
+    from ..models import AnswerHistory, VocabularyLibrary, QuizSession
+    retention_days = payload.get('retention_days', AnswerHistory.RETENTION_DAYS)
+    AnswerHistory.rollup(retention_days)
+    VocabularyLibrary.prune_tombstones(retention_days)
+    QuizSession.purge_stale()
+
+def _keep_lease(job_id, worker_id, lease_seconds, done):
+    """Extend the job's lease every third of its length until done is set"""
+    while not done.wait(lease_seconds / 3):
+        if not JobQueue.extend_lease(job_id, worker_id, lease_seconds):
+            return
+
+def run_job(job, worker_id, lease_seconds=JobQueue.DEFAULT_LEASE):
+    """Run one claimed job, holding its lease meanwhile, and record the outcome"""
+    done = threading.Event()
+    heartbeat = threading.Thread(
+        target=_keep_lease, args=(job['id'], worker_id, lease_seconds, done), daemon=True
+    )
+    heartbeat.start()
+    try:
+        function = HANDLERS.get(job['job_type'])
+        if function is None:
+            raise RuntimeError(f"No handler for job type {job['job_type']}")
+        function(job['payload'])
+    except Exception as e:
+        status = JobQueue.fail(job['id'], worker_id, f"{e}\n{traceback.format_exc()}")
+        logger.warning(
+            "Job %s (%s) failed on attempt %s: %s -> %s", job['id'], job['job_type'], job['attempts'], e, status
+        )
+        return False
+    finally:
+        done.set()
+    JobQueue.complete(job['id'], worker_id)
+    return True
+
+def run_worker(worker_id=None, burst=False, lease_seconds=JobQueue.DEFAULT_LEASE, stop=None):
+    """
+    Claim and run jobs until stopped. With burst set, return as soon as
+    the queue has nothing runnable. Returns the number of jobs run.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    stop = stop or threading.Event()
+    processed = 0
+    while not stop.is_set():
+        job = JobQueue.claim(worker_id, lease_seconds)
+        if job is None:
+            if burst:
+                break
+            stop.wait(POLL_INTERVAL)
+            continue
+        run_job(job, worker_id, lease_seconds)
+        processed += 1
+    return processed
+
+def _worker_process(stop):
+    # The supervisor handles Ctrl+C and SIGTERM and tells workers through stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    run_worker(stop=stop)
+
+def run_pool(processes):
+    """
+    Run a pool of worker processes, restarting any that die, until SIGINT or
+    SIGTERM. Workers finish their current job before exiting. Old succeeded
+    jobs are purged and the rollup_stats job is queued periodically.
+    """
+    stop = multiprocessing.Event()
+    stopping = []
+    
+    # Only flag the stop here: setting the event from a signal handler can
+    # deadlock with the main loop, which is not waiting on it for that reason
+    def request_stop(signum, frame):
+        stopping.append(signum)
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+    
+    # Not daemonic: jobs such as the PDF ingest start process pools of their own
+    workers = []
+    for _ in range(processes):
+        worker = multiprocessing.Process(target=_worker_process, args=(stop,))
+        worker.start()
+        workers.append(worker)
+    
+    last_purge = None
+    last_rollup = None
+    while not stopping:
+        for i, worker in enumerate(workers):
+            if not worker.is_alive():
+                logger.error("Job worker %s exited with code %s, restarting", worker.pid, worker.exitcode)
+                workers[i] = multiprocessing.Process(target=_worker_process, args=(stop,))
+                workers[i].start()
+        
+        if last_purge is None or time.monotonic() - last_purge > PURGE_INTERVAL:
+            JobQueue.purge_finished(PURGE_AFTER)
+            last_purge = time.monotonic()
+        if last_rollup is None or time.monotonic() - last_rollup > ROLLUP_INTERVAL:
+            # Several supervisors share the queue; the unique key keeps one rollup pending
+            enqueue('rollup_stats', unique_key='rollup_stats')
+            last_rollup = time.monotonic()
+        time.sleep(POLL_INTERVAL)
+    
+    stop.set()
+    for worker in workers:
+        worker.join()
@@ -0,0 +1,106 @@
+# backend/app/services/library_sampler.py
+
+import random
+import threading
+import time
+from collections import OrderedDict
+from ..models import VocabularyLibrary, SystemVocabulary, Lexicon
+
+MAX_CACHED_LIBRARIES = 1024
+# The pool of system vocabulary translations used to pad small libraries is
+# rebuilt after this many seconds, picking up newly translated words.
+SYSTEM_POOL_TTL = 3600
+# Random draws tried per wrong answer before giving up on a source
+DRAW_ATTEMPTS = 8
+
+_libraries = OrderedDict()  # user_id -> LibraryWords
+_lock = threading.Lock()
+_system_pool = None  # (built_at, [translation])
+
+class LibraryWords:
+    """
+    A user's translated library words as parallel lists, so a question is a
+    few random index picks however large the library is. Tagged with the
+    user's library_version, which every change to the library bumps.
+    """
+    
+    def __init__(self, version, rows):
+        self.version = version
+        self.words = [row['word'] for row in rows]
+        self.translations = [row['translation'] for row in rows]
+        self.position = {word: i for i, word in enumerate(self.words)}
+    
+    def __len__(self):
+        return len(self.words)
+    
+    def random_word(self, rng=random):
+        """Return a random (word, translation) pair"""
+        i = rng.randrange(len(self.words))
+        return self.words[i], self.translations[i]
+    
+    def translation_of(self, word):
+        i = self.position.get(word)
+        return self.translations[i] if i is not None else None
+    
+    def wrong_translations(self, word, correct_translation, count=3, rng=random):
+        """
+        Draw count translations other than correct_translation, from random
+        library words first and then from the system vocabulary pool.
+        Raises ValueError if fewer than count distinct ones turn up, rather
+        than returning a short list.
+        """
+        seen = {correct_translation.strip().lower()}
+        wrong = []
+        
+        def draw(pool):
+            for _ in range(DRAW_ATTEMPTS * count):
+                if len(wrong) == count:
+                    return
+                translation = pool[rng.randrange(len(pool))]
+                key = translation.strip().lower()
+                if key not in seen:
+                    seen.add(key)
+                    wrong.append(translation)
+        
+        if len(self.words) > 1:
+            draw(self.translations)
+        if len(wrong) < count:
+            pool = _get_system_pool()
+            if pool:
+                draw(pool)
+        if len(wrong) < count:
+            raise ValueError('Not enough words to generate options.')
+        return wrong
+
+def _get_system_pool():
+    """Translations of the system vocabulary, loaded once per SYSTEM_POOL_TTL"""
+    global _system_pool
+    cached = _system_pool
+    if cached and time.monotonic() - cached[0] < SYSTEM_POOL_TTL:
+        return cached[1]
+    
+    translations = Lexicon.get_translations()
+    words = {word for level_words in SystemVocabulary.get_all_words(canonical=True).values() for word in level_words}
+    pool = list(dict.fromkeys(translations[word] for word in words if word in translations))
+    _system_pool = (time.monotonic(), pool)
+    return pool
+
+def get_library(user_id, version):
+    """
+    Return the cached word list of a user's library, reloading it when the
+    cached copy is older than version (the user's current library_version).
+    """
+    with _lock:
+        cached = _libraries.get(user_id)
+        if cached and cached.version == version:
+            _libraries.move_to_end(user_id)
+            return cached
+    
+    library = LibraryWords(version, VocabularyLibrary.get_quiz_words(user_id))
+    
+    with _lock:
+        _libraries[user_id] = library
+        _libraries.move_to_end(user_id)
+        while len(_libraries) > MAX_CACHED_LIBRARIES:
+            _libraries.popitem(last=False)
+    return library
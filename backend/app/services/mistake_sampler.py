@@ -0,0 +1,140 @@
+# backend/app/services/mistake_sampler.py
+
+import random
+import threading
+import time
+from collections import OrderedDict
+from ..models import UserProgress
+
+# Cached samplers are rebuilt from the database after this many seconds, so
+# answers recorded by other gunicorn workers are picked up eventually.
+SAMPLER_TTL = 300
+MAX_CACHED_SAMPLERS = 1024
+
+_samplers = OrderedDict()  # (user_id, level) -> (built_at, MistakeSampler)
+_lock = threading.Lock()
+
+def mistake_weight(correct_count, incorrect_count):
+    """
+    Sampling weight of a word: words missed often and rarely answered
+    correctly come up more. Words never missed are not sampled.
+    """
+    if incorrect_count <= 0:
+        return 0.0
+    return incorrect_count / (correct_count + 1)
+
+class FenwickTree:
+    """
+    Binary indexed tree over non-negative weights.
+    Updates, appends and weighted sampling are all O(log n).
+    """
+    
+    def __init__(self, weights=()):
+        self.weights = []
+        self.tree = [0.0]  # 1-indexed
+        for weight in weights:
+            self.append(weight)
+    
+    def __len__(self):
+        return len(self.weights)
+    
+    def prefix_sum(self, count):
+        """Sum of the first `count` weights"""
+        total = 0.0
+        while count > 0:
+            total += self.tree[count]
+            count -= count & -count
+        return total
+    
+    def total(self):
+        return self.prefix_sum(len(self.weights))
+    
+    def append(self, weight):
+        """Add a new weight at the end"""
+        self.weights.append(weight)
+        i = len(self.weights)
+        lowbit = i & -i
+        self.tree.append(weight + self.prefix_sum(i - 1) - self.prefix_sum(i - lowbit))
+    
+    def update(self, index, weight):
+        """Set the weight at a 0-based index"""
+        delta = weight - self.weights[index]
+        self.weights[index] = weight
+        i = index + 1
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+    
+    def find(self, target):
+        """Return the 0-based index whose cumulative weight range contains target"""
+        position = 0
+        step = 1 << (len(self.tree) - 1).bit_length()
+        while step:
+            next_position = position + step
+            if next_position < len(self.tree) and self.tree[next_position] <= target:
+                position = next_position
+                target -= self.tree[next_position]
+            step >>= 1
+        return min(position, len(self.weights) - 1)
+
+class MistakeSampler:
+    """Weighted sampler over one user's mistake words for one level (or 'all')"""
+    
+    def __init__(self, rows):
+        self.entries = []  # (word, level) per tree slot
+        self.index = {}  # (word, level) -> tree slot
+        self.tree = FenwickTree()
+        for row in rows:
+            self.set(row['word'], row['level'], row['correct_count'], row['incorrect_count'])
+    
+    def set(self, word, level, correct_count, incorrect_count):
+        key = (word, level)
+        weight = mistake_weight(correct_count, incorrect_count)
+        slot = self.index.get(key)
+        if slot is not None:
+            self.tree.update(slot, weight)
+        elif weight > 0:
+            self.index[key] = len(self.entries)
+            self.entries.append(key)
+            self.tree.append(weight)
+    
+    def sample(self, rng=random):
+        """Return a (word, level) pair, or None when there are no mistakes"""
+        total = self.tree.total()
+        if total <= 0:
+            return None
+        return self.entries[self.tree.find(rng.random() * total)]
+
+def _get_sampler(user_id, level):
+    key = (user_id, level)
+    with _lock:
+        cached = _samplers.get(key)
+        if cached and time.monotonic() - cached[0] < SAMPLER_TTL:
+            _samplers.move_to_end(key)
+            return cached[1]
+    
+    sampler = MistakeSampler(UserProgress.get_mistake_weights(user_id, level))
+    
+    with _lock:
+        _samplers[key] = (time.monotonic(), sampler)
+        _samplers.move_to_end(key)
+        while len(_samplers) > MAX_CACHED_SAMPLERS:
+            _samplers.popitem(last=False)
+    return sampler
+
+def sample_mistake(user_id, level='all'):
+    """
+    Pick one of the user's mistake words, weighted by how often it was missed.
+    Returns a (word, level) pair, or None if the user has no mistakes.
+    """
+    sampler = _get_sampler(user_id, level or 'all')
+    with _lock:
+        return sampler.sample()
+
+def record_answer(user_id, level, word, correct_count, incorrect_count):
+    """Apply a freshly recorded answer to any cached samplers for the user"""
+    with _lock:
+        for key in ((user_id, level), (user_id, 'all')):
+            cached = _samplers.get(key)
+            if cached:
+                cached[1].set(word, level, correct_count, incorrect_count)
@@ -1,14 +1,130 @@
 # backend/app/services/text_to_speech.py
 
-import pyttsx3
+import os
+import logging
+import fcntl
+import hashlib
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+AUDIO_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'temp', 'audio')
+
+SPEECH_RATE = 150  # words per minute
+SPEECH_VOLUME = 0.9
+# Part of every audio file's content hash: bump it to re-render all audio
+VOICE_VERSION = 1
+
+# Words rendered per task when pre-rendering a level
+PRERENDER_CHUNK_SIZE = 25
+
+logger = logging.getLogger(__name__)
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def _espeak_binary():
+    return shutil.which('espeak-ng') or shutil.which('espeak')
+
+def _get_engine():
+    """pyttsx3 engines are slow to create, so each process keeps one"""
+    global _engine
+    if _engine is None:
+        import pyttsx3
+        _engine = pyttsx3.init()
+        _engine.setProperty('rate', SPEECH_RATE)
+        _engine.setProperty('volume', SPEECH_VOLUME)
+    return _engine
 
 def read_word(text):
     """
-    Converts the text to speech (using pyttsx3) and saves or streams the output.
+    Converts the text to speech (using pyttsx3) and plays it on the server.
     """
-    engine = pyttsx3.init()
-    engine.setProperty('rate', 150)
-    engine.setProperty('volume', 0.9)
+    with _engine_lock:
+        engine = _get_engine()
+        engine.say(text)
+        engine.runAndWait()
+
+def audio_digest(word):
+    """Content hash of a word's audio: the word plus everything that affects its rendering"""
+    renderer = 'espeak' if _espeak_binary() else 'pyttsx3'
+    key = f'{VOICE_VERSION}|{renderer}|{SPEECH_RATE}|{SPEECH_VOLUME}|{word}'
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+def audio_path(digest):
+    return os.path.join(AUDIO_DIR, digest[:2], digest + '.wav')
+
+def _render(word, path):
+    """Render word to a WAV file at path with espeak, or pyttsx3 if espeak isn't installed"""
+    espeak = _espeak_binary()
+    if espeak:
+        subprocess.run(
+            [espeak, '-s', str(SPEECH_RATE), '-a', str(int(SPEECH_VOLUME * 100)), '-w', path, '--', word],
+            check=True, capture_output=True, timeout=30
+        )
+        return
+    
+    with _engine_lock:
+        engine = _get_engine()
+        engine.save_to_file(word, path)
+        engine.runAndWait()
+
+def render_word(word):
+    """
+    Return (path, digest) of the cached audio for word, rendering it first
+    if needed. Rendering is single-flight: a lock file per digest makes
+    concurrent requests, in any worker process, wait for one render.
+    """
+    digest = audio_digest(word)
+    path = audio_path(digest)
+    if os.path.exists(path):
+        return path, digest
+    
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.lock', 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            # Another request may have rendered it while we waited for the lock
+            if not os.path.exists(path):
+                tmp_path = f'{path}.{os.getpid()}.tmp.wav'
+                try:
+                    _render(word, tmp_path)
+                    if not os.path.getsize(tmp_path):
+                        raise RuntimeError(f"Empty audio rendered for '{word}'")
+                    os.replace(tmp_path, path)
+                finally:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    return path, digest
+
+def _render_chunk(words):
+    """Render a chunk of words in a pool process, returning the number that failed"""
+    failed = 0
+    for word in words:
+        try:
+            render_word(word)
+        except Exception as e:
+            logger.warning("Error rendering audio for '%s': %s", word, e)
+            failed += 1
+    return failed
+
+def prerender_words(words, max_workers=None):
+    """
+    Render the audio of many words across a process pool, skipping words
+    already cached. Returns a summary dict.
+    """
+    words = list(dict.fromkeys(words))
+    pending = [word for word in words if not os.path.exists(audio_path(audio_digest(word)))]
+    if not pending:
+        return {'rendered': 0, 'cached': len(words), 'failed': 0}
+    
+    chunks = [pending[i:i + PRERENDER_CHUNK_SIZE] for i in range(0, len(pending), PRERENDER_CHUNK_SIZE)]
+    workers = min(max_workers or os.cpu_count() or 1, len(chunks))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        failed = sum(pool.map(_render_chunk, chunks))
     
-    engine.say(text)
-    engine.runAndWait()
+    return {'rendered': len(pending) - failed, 'cached': len(words) - len(pending), 'failed': failed}
@@ -1,13 +1,106 @@
 import re
-from deep_translator import GoogleTranslator
+import logging
+from ..models import Lexicon, Database
+from . import vocabulary_index, jobs
+
+# In-memory translation cache shared by the routes: word -> translation
+translations_cache = {}
+
+logger = logging.getLogger(__name__)
+
+# Words sent to the translator per call by translate_batch
+BATCH_CHUNK_SIZE = 50
 
 def translate_text(text, dest='zh-TW'):
     """
     Translates text to Traditional Chinese using deep-translator
     """
+    # Imported here so web workers serving cached translations never load it
+    from deep_translator import GoogleTranslator
     try:
         translator = GoogleTranslator(target=dest)
         translation = translator.translate(text)
         return translation
     except Exception as e:
-        raise Exception(f"Translation error: {str(e)}")
\ No newline at end of file
+        raise Exception(f"Translation error: {str(e)}")
+
+class TranslationPending(Exception):
+    """A word has no stored translation yet; a translate_words job was queued for it"""
+
+def stored_translation(word):
+    """
+    Get the stored translation of a word for a web request: from the shared
+    vocabulary snapshot, the in-memory cache or the database, never from the
+    translator, which only the job workers call. On a miss a translate_words
+    job is queued for the word and None is returned. The cache only holds
+    words the snapshot lacks, so it stays small.
+    """
+    translation = vocabulary_index.current().translation(word) or translations_cache.get(word)
+    if translation:
+        return translation
+    
+    translation = Lexicon.get_translation(word)
+    if not translation:
+        jobs.enqueue('translate_words', {'words': [word]}, priority=5, unique_key=f'translate_word:{word}')
+        return None
+    
+    translations_cache[word] = translation
+    return translation
+
+def get_translation(word):
+    """Like stored_translation, but raises TranslationPending if the word has no translation yet"""
+    translation = stored_translation(word)
+    if not translation:
+        raise TranslationPending(f"'{word}' has not been translated yet")
+    return translation
+
+def translate_batch(words, dest='zh-TW', chunk_size=BATCH_CHUNK_SIZE):
+    """
+    Translate many words with as few translator calls as possible.
+    Known translations come from the in-memory cache and the database; the
+    rest are sent newline-joined, chunk_size words per call, falling back to
+    one call per word if a chunk doesn't come back line for line.
+    Returns (translations, failed): a word -> translation mapping and the
+    list of words that could not be translated. New translations are stored.
+    """
+    translations = {}
+    missing = []
+    for word in dict.fromkeys(words):
+        if word in translations_cache:
+            translations[word] = translations_cache[word]
+        else:
+            missing.append(word)
+    
+    if missing:
+        conn = Database.get_connection()
+        stored = Lexicon.lookup_translations(conn.cursor(), missing)
+        conn.close()
+        translations.update(stored)
+        missing = [word for word in missing if word not in stored]
+    
+    translated = {}
+    failed = []
+    for start in range(0, len(missing), chunk_size):
+        chunk = missing[start:start + chunk_size]
+        lines = None
+        try:
+            lines = translate_text('\n'.join(chunk), dest).split('\n')
+        except Exception as e:
+            logger.warning("Batch translation failed, translating one by one: %s", e)
+        
+        if lines is not None and len(lines) == len(chunk) and all(line.strip() for line in lines):
+            translated.update(zip(chunk, (line.strip() for line in lines)))
+            continue
+        
+        for word in chunk:
+            try:
+                translated[word] = translate_text(word, dest)
+            except Exception as e:
+                logger.warning("Error translating '%s': %s", word, e)
+                failed.append(word)
+    
+    if translated:
+        Lexicon.set_translations(translated)
+    translations.update(translated)
+    translations_cache.update(translations)
+    return translations, failed
@@ -1,37 +1,297 @@
 # backend/app/services/vocabulary.py
 
 import os
-import requests
+import logging
+import re
+import hashlib
+import json
 from collections import defaultdict
-from PyPDF2 import PdfReader
-from ..models import SystemVocabulary, Database
+from concurrent.futures import ProcessPoolExecutor
+from ..models import SystemVocabulary, Database, Lexicon
+
+# requests and PyPDF2 are imported where they are used: only downloads and
+# ingests need them, not the web workers that import remove_symbols
 
 PDF_URL = "https://www.ceec.edu.tw/SourceUse/ce37/5.pdf"
 PDF_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'temp', 'vocs.pdf')
 
-def create_pdf():
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# app_meta key holding the content hash of the last ingested vocabulary sources
+SOURCE_HASH_KEY = 'vocabulary_source_hash'
+
+logger = logging.getLogger(__name__)
+
+def remove_symbols(s):
+    """Strip leading and trailing non-word characters from a vocabulary entry (see Lexicon.canonical)"""
+    return Lexicon.canonical(s)
+
+def _download_meta_path(path):
+    return path + '.meta.json'
+
+def _read_download_meta(path):
+    """Read the validators (ETag, Last-Modified, checksum) saved with a download"""
+    try:
+        with open(_download_meta_path(path)) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+def _write_download_meta(path, meta):
+    tmp_path = _download_meta_path(path) + '.tmp'
+    with open(tmp_path, 'w') as file:
+        json.dump(meta, file)
+    os.replace(tmp_path, _download_meta_path(path))
+
+def _parse_content_range(value):
+    """(first byte, complete size) from a Content-Range header, either of which may be None"""
+    match = re.match(r'^bytes\s+(?:(\d+)-\d+|\*)/(\d+|\*)$', (value or '').strip())
+    if not match:
+        return None, None
+    first, total = match.groups()
+    return (int(first) if first else None), (int(total) if total != '*' else None)
+
+def _validators(response, meta):
+    """(ETag, Last-Modified) of the downloaded file, from the response or the validator it was resumed with"""
+    etag = response.headers.get('ETag')
+    last_modified = response.headers.get('Last-Modified')
+    validator = meta.get('partial_validator')
+    if not etag and not last_modified and validator:
+        if validator.startswith(('"', 'W/')):
+            etag = validator
+        else:
+            last_modified = validator
+    return etag, last_modified
+
+def create_pdf(url=PDF_URL, path=PDF_PATH, expected_sha256=None, timeout=30):
     """
     Download the PDF from a remote URL and save it locally.
-    Returns True if successful, False otherwise.
+    The response is streamed to a .part file in chunks. An interrupted
+    download is resumed with a Range request; a .part the server says is
+    already complete (416) is finished as is, and one it can't resume from
+    is dropped and downloaded again. An unchanged remote file is not
+    downloaded again (ETag / If-Modified-Since). The finished file is
+    checked against expected_sha256 (or VOCABULARY_PDF_SHA256) if given,
+    then renamed into place atomically.
+    Returns True if successful (including when the file is unchanged), False otherwise.
     """
+    import requests
+    
+    part_path = path + '.part'
+    expected_sha256 = expected_sha256 or os.environ.get('VOCABULARY_PDF_SHA256')
+    
     try:
         # Create temp directory if it doesn't exist
-        os.makedirs(os.path.dirname(PDF_PATH), exist_ok=True)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
         
-        response = requests.get(PDF_URL, timeout=30)
-        response.raise_for_status()  # Raise exception for bad status codes
+        meta = _read_download_meta(path)
+        resume_from = os.path.getsize(part_path) if os.path.exists(part_path) else 0
         
-        with open(PDF_PATH, "wb") as file:
-            file.write(response.content)
+        while True:
+            # Byte offsets only line up if the server doesn't re-encode the body
+            headers = {'Accept-Encoding': 'identity'}
+            if resume_from and meta.get('partial_validator'):
+                # Resume, but only if the remote file is still the one we started on
+                headers['Range'] = f'bytes={resume_from}-'
+                headers['If-Range'] = meta['partial_validator']
+            elif os.path.exists(path) and os.path.getsize(path) > 0:
+                if meta.get('etag'):
+                    headers['If-None-Match'] = meta['etag']
+                if meta.get('last_modified'):
+                    headers['If-Modified-Since'] = meta['last_modified']
             
-        # Verify file was written and has content
-        if os.path.exists(PDF_PATH) and os.path.getsize(PDF_PATH) > 0:
-            return True
-        return False
+            with requests.get(url, headers=headers, stream=True, timeout=timeout) as response:
+                if response.status_code == 304:
+                    return True
+                
+                restart = False
+                if 'Range' in headers and response.status_code == 416:
+                    # Nothing left to send: either the .part is already complete
+                    # (the process stopped before renaming it) or it is not this file
+                    _, expected_size = _parse_content_range(response.headers.get('Content-Range'))
+                    restart = expected_size != resume_from
+                    etag, last_modified = _validators(response, meta)
+                elif 'Range' in headers and response.status_code == 206:
+                    first, expected_size = _parse_content_range(response.headers.get('Content-Range'))
+                    restart = first != resume_from
+                else:
+                    response.raise_for_status()  # Raise exception for bad status codes
+                    expected_size = int(response.headers.get('Content-Length') or 0)
+                
+                if restart:
+                    logger.warning("Cannot resume the PDF download from byte %s, starting over", resume_from)
+                    os.remove(part_path)
+                    resume_from = 0
+                    meta.pop('partial_validator', None)
+                    continue
+                
+                if response.status_code != 416:
+                    etag = response.headers.get('ETag')
+                    last_modified = response.headers.get('Last-Modified')
+                    
+                    # Remember how to resume this download if the stream breaks
+                    meta['partial_validator'] = etag or last_modified
+                    _write_download_meta(path, meta)
+                    
+                    with open(part_path, 'ab' if 'Range' in headers and response.status_code == 206 else 'wb') as file:
+                        for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                            if chunk:
+                                file.write(chunk)
+            break
+        
+        size = os.path.getsize(part_path)
+        if size == 0 or (expected_size and size != expected_size):
+            logger.error("Downloaded PDF is incomplete (%s of %s bytes)", size, expected_size)
+            return False
+        
+        checksum = file_sha256(part_path)
+        if expected_sha256 and checksum != expected_sha256.lower():
+            logger.error("Downloaded PDF checksum mismatch: expected %s, got %s", expected_sha256, checksum)
+            os.remove(part_path)
+            return False
+        
+        os.replace(part_path, path)
+        _write_download_meta(path, {'etag': etag, 'last_modified': last_modified, 'sha256': checksum})
+        return True
     except Exception as e:
-        print(f"Error downloading PDF: {e}")
+        logger.exception("Error downloading PDF")
         return False
 
+def file_sha256(path):
+    """Hash a file in chunks without loading it into memory"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def collect_pdf_paths(sources):
+    """
+    Expand a list of PDF files and directories into a sorted list of PDF paths.
+    Directories contribute every *.pdf file directly inside them.
+    """
+    paths = []
+    for source in sources:
+        if os.path.isdir(source):
+            paths.extend(
+                os.path.join(source, name)
+                for name in sorted(os.listdir(source))
+                if name.lower().endswith('.pdf')
+            )
+        else:
+            paths.append(source)
+    return paths
+
+def _extract_pages(pdf_path, page_numbers):
+    """Extract the text of some pages of a PDF (runs inside a worker process)"""
+    from PyPDF2 import PdfReader
+    with open(pdf_path, 'rb') as file:
+        reader = PdfReader(file)
+        return [reader.pages[i].extract_text() for i in page_numbers]
+
+def extract_page_texts(pdf_path, max_workers=None):
+    """
+    Extract the text of every vocabulary page (all pages after the cover)
+    of a PDF, spreading the pages over a process pool. Returns the texts in
+    page order, or None if the PDF has no vocabulary pages.
+    """
+    from PyPDF2 import PdfReader
+    with open(pdf_path, 'rb') as file:
+        page_count = len(PdfReader(file).pages)
+    if page_count < 2:
+        return None
+    
+    page_numbers = list(range(1, page_count))
+    workers = min(max_workers or os.cpu_count() or 1, len(page_numbers))
+    if workers <= 1:
+        return _extract_pages(pdf_path, page_numbers)
+    
+    # Interleave the pages so every worker gets a similar mix of page sizes
+    chunks = [page_numbers[i::workers] for i in range(workers)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_extract_pages, [pdf_path] * workers, chunks))
+    
+    texts = [None] * len(page_numbers)
+    for chunk, chunk_texts in zip(chunks, results):
+        for page_number, text in zip(chunk, chunk_texts):
+            texts[page_number - 1] = text
+    return texts
+
+def parse_vocabulary(page_texts):
+    """
+    Yield (word, level) pairs from vocabulary page texts. The first line of
+    each page is its level header; each following line starts with a word.
+    """
+    for page_text in page_texts:
+        texts = [line.strip() for line in (page_text or '').split('\n')]
+        if not texts:
+            continue
+        
+        level = texts[0].replace(' ', '')
+        
+        # Extract vocabulary lines
+        for line in texts[1:]:
+            voc = ''.join([i for i in line.split(' ')[0] if not i.isdigit()])
+            if voc and 'LEVEL' not in voc:
+                yield voc, level
+
+def ingest_vocabulary(sources=None, force=False, max_workers=None):
+    """
+    Ingest one or more vocabulary PDFs (files or directories of PDFs) into
+    the system vocabulary. Sources whose content hash matches the last
+    successful ingest are skipped unless force is set. Only the difference
+    to the current table is written, in a single transaction.
+    Returns a summary dict, or None on failure.
+    """
+    paths = collect_pdf_paths(sources or [PDF_PATH])
+    if not paths:
+        logger.error("No vocabulary PDFs found")
+        return None
+    
+    source_hash = hashlib.sha256(
+        ''.join(file_sha256(path) for path in paths).encode()
+    ).hexdigest()
+    
+    conn = Database.get_connection()
+    last_hash = Database.get_meta(conn.cursor(), SOURCE_HASH_KEY)
+    conn.close()
+    
+    if source_hash == last_hash and not force:
+        return {'skipped': True, 'sources': paths}
+    
+    word_level_pairs = []
+    for path in paths:
+        page_texts = extract_page_texts(path, max_workers)
+        if page_texts is None:
+            logger.error("PDF has insufficient pages: %s", path)
+            continue
+        word_level_pairs.extend(parse_vocabulary(page_texts))
+    
+    if not word_level_pairs:
+        logger.error("No vocabulary words were extracted from the PDF")
+        return None
+    
+    changes = SystemVocabulary.apply_diff(word_level_pairs)
+    if changes is None:
+        return None
+    
+    conn = Database.get_connection()
+    Database.set_meta(conn.cursor(), SOURCE_HASH_KEY, source_hash)
+    conn.commit()
+    conn.close()
+    
+    # Precompute the distractor feature matrix and the vocabulary snapshot for
+    # the new word list, and have the job workers translate and bundle it for offline use
+    if any(changes.values()):
+        from .distractors import build_index
+        from .vocabulary_index import write_snapshot
+        from .jobs import enqueue
+        build_index()
+        write_snapshot()
+        enqueue('build_bundles', priority=1, unique_key='build_bundles')
+    
+    return {'skipped': False, 'sources': paths, **changes}
+
 def extract_vocabulary_from_pdf(pdf_path=PDF_PATH):
     """
     Extract vocabulary from the PDF and save it directly to the database.
@@ -41,81 +301,39 @@ def extract_vocabulary_from_pdf(pdf_path=PDF_PATH):
         # Create temp directory if it doesn't exist
         os.makedirs(os.path.dirname(pdf_path), exist_ok=True)
         
-        word_level_pairs = []
-        
         # Ensure the PDF exists and has content
         if not os.path.exists(pdf_path) or os.path.getsize(pdf_path) == 0:
             success = create_pdf()
             if not success:
-                print("Failed to download or create PDF")
+                logger.error("Failed to download or create PDF")
                 return False
             
             # Double check after download
             if not os.path.exists(pdf_path) or os.path.getsize(pdf_path) == 0:
-                print("PDF file still doesn't exist or is empty after download attempt")
-                return False
-        
-        with open(pdf_path, 'rb') as file:
-            reader = PdfReader(file)
-            if not reader.pages or len(reader.pages) < 2:
-                print("PDF has insufficient pages")
+                logger.error("PDF file still doesn't exist or is empty after download attempt")
                 return False
-                
-            for page in reader.pages[1:]:
-                texts = page.extract_text().split('\n')
-                texts = list(map(lambda x: x.strip(), texts))
-                
-                if not texts:
-                    continue
-                    
-                level = texts[0].replace(' ', '')
-                
-                # Extract vocabulary lines
-                vocs = [
-                    ''.join([i for i in x.split(' ')[0] if not i.isdigit()])
-                    for x in texts[1:]
-                ]
-                vocs = [i for i in vocs if 'LEVEL' not in i and i != '']
-                
-                for voc in vocs:
-                    word_level_pairs.append((voc, level))
         
-        if not word_level_pairs:
-            print("No vocabulary words were extracted from the PDF")
-            return False
-            
-        # Save all words to the database at once
-        success = SystemVocabulary.add_multiple_words(word_level_pairs)
-        return success
+        return ingest_vocabulary([pdf_path]) is not None
         
     except Exception as e:
-        print(f"Error extracting vocabulary from PDF: {e}")
+        logger.exception("Error extracting vocabulary from PDF")
         return False
 
 def download_vocs():
     """
     Orchestrates the download of the PDF and extraction of vocabularies into the database.
+    The download is skipped if the remote PDF is unchanged, and so is the
+    ingest if the local PDF is unchanged.
     """
-    create_pdf()
+    if not create_pdf() and not os.path.exists(PDF_PATH):
+        return False
     return extract_vocabulary_from_pdf()
 
 def load_all_vocs():
     """
     Read vocabularies from the database into a dictionary:
         dictionary[level] -> list of words
+    An empty database gives an empty dictionary; filling it is the job
+    of the download_vocabulary background job.
     """
-    # First check if any vocabulary exists in the database
-    conn = Database.get_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT COUNT(*) as count FROM system_vocabulary')
-    count = cursor.fetchone()['count']
-    conn.close()
-    
-    # If database is empty, try to load from PDF
-    if count == 0:
-        # Make sure the database is initialized
-        Database.init_db()
-        download_vocs()
-    
-    # Return all words from database
     return SystemVocabulary.get_all_words()
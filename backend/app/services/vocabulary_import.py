@@ -0,0 +1,112 @@
+# backend/app/services/vocabulary_import.py
+
+import csv
+import io
+import json
+from ..models import VocabularyImport
+from .translation import translate_batch, BATCH_CHUNK_SIZE
+
+# Largest number of rows accepted by a single bulk import
+MAX_IMPORT_ROWS = 5000
+MAX_WORD_LENGTH = 100
+
+FIELDS = ('word', 'translation', 'level', 'notes')
+
+CSV_TYPES = {'text/csv', 'application/csv'}
+NDJSON_TYPES = {'application/x-ndjson', 'application/ndjson', 'application/jsonl', 'application/x-jsonlines'}
+JSON_TYPES = {'application/json'}
+
+def _normalize_row(item, position):
+    """Turn a parsed record (a dict or a bare word) into a clean row dict"""
+    if isinstance(item, str):
+        item = {'word': item}
+    if not isinstance(item, dict):
+        raise ValueError(f'第 {position} 筆資料格式錯誤')
+    
+    row = {}
+    for field in FIELDS:
+        value = item.get(field)
+        if value is None:
+            continue
+        if not isinstance(value, str):
+            raise ValueError(f'第 {position} 筆資料的 {field} 必須是文字')
+        value = value.strip()
+        if value:
+            row[field] = value
+    
+    if 'word' not in row:
+        raise ValueError(f'第 {position} 筆資料缺少單字')
+    if len(row['word']) > MAX_WORD_LENGTH:
+        raise ValueError(f'第 {position} 筆資料的單字過長')
+    return row
+
+def _parse_csv(text):
+    reader = csv.reader(io.StringIO(text))
+    records = [record for record in reader if any(cell.strip() for cell in record)]
+    if not records:
+        return []
+    
+    # Use the first line as a header if it names a word column,
+    # otherwise read the columns positionally as word, translation, level, notes
+    header = [cell.strip().lower() for cell in records[0]]
+    if 'word' in header:
+        return [dict(zip(header, record)) for record in records[1:]]
+    return [dict(zip(FIELDS, record)) for record in records]
+
+def _parse_ndjson(text):
+    items = []
+    for number, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            items.append(json.loads(line))
+        except json.JSONDecodeError:
+            raise ValueError(f'第 {number} 行不是有效的 JSON')
+    return items
+
+def _parse_json(text):
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        raise ValueError('無效的 JSON 資料')
+    if isinstance(data, dict):
+        data = data.get('words')
+    if not isinstance(data, list):
+        raise ValueError('JSON 資料必須是單字陣列或包含 words 陣列的物件')
+    return data
+
+def parse_import(text, content_type):
+    """
+    Parse a bulk import body into row dicts, choosing the format from the
+    request's content type (CSV, NDJSON or JSON). Rows repeating a word are
+    merged, later rows winning. Raises ValueError with a user-facing message.
+    """
+    mimetype = (content_type or '').split(';')[0].strip().lower()
+    if mimetype in CSV_TYPES:
+        items = _parse_csv(text)
+    elif mimetype in NDJSON_TYPES:
+        items = _parse_ndjson(text)
+    elif mimetype in JSON_TYPES:
+        items = _parse_json(text)
+    else:
+        raise ValueError('不支援的格式，請使用 CSV、JSON 或 NDJSON')
+    
+    if len(items) > MAX_IMPORT_ROWS:
+        raise ValueError(f'一次最多只能匯入 {MAX_IMPORT_ROWS} 個單字')
+    
+    rows = {}
+    for position, item in enumerate(items, start=1):
+        row = _normalize_row(item, position)
+        rows[row['word']] = {**rows.get(row['word'], {}), **row}
+    return list(rows.values())
+
+def resolve_import(import_id):
+    """
+    Translate the pending words of an import, chunk by chunk, saving each
+    chunk as it completes so the status endpoint shows progress.
+    """
+    words = VocabularyImport.get_pending_words(import_id)
+    for start in range(0, len(words), BATCH_CHUNK_SIZE):
+        chunk = words[start:start + BATCH_CHUNK_SIZE]
+        translations, failed = translate_batch(chunk)
+        VocabularyImport.resolve(import_id, translations, failed)
@@ -0,0 +1,376 @@
+# backend/app/services/vocabulary_index.py
+
+import os
+import sys
+import mmap
+import fcntl
+import random
+import struct
+import logging
+import socket
+import threading
+import time
+from contextvars import ContextVar
+from array import array
+from itertools import accumulate
+from ..models import Database, SystemVocabulary, Lexicon, WorkerHeartbeat
+
+SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'temp', 'vocabulary.snapshot')
+
+# Seconds between checks of the snapshot file and the system vocabulary version by a web worker
+CHECK_INTERVAL = 5.0
+# Seconds between a web worker's reports of the version it serves (see WorkerHeartbeat)
+HEARTBEAT_INTERVAL = 60.0
+
+# Snapshot layout: header, section table, then the sections, each 8-byte aligned.
+# Offset tables are native uint32 arrays, so the header records the byte order.
+MAGIC = b'VOCSNAP\0'
+FORMAT_VERSION = 2
+HEADER = struct.Struct('<8sHHQI')  # magic, format, little-endian flag, vocabulary version, section count
+SECTION = struct.Struct('<QQ')  # offset, length
+SECTIONS = (
+    'level_offsets', 'level_data', 'level_starts',
+    'word_offsets', 'word_data',
+    'key_offsets', 'key_data',
+    'value_offsets', 'value_data',
+)
+
+logger = logging.getLogger(__name__)
+
+class PackedStrings:
+    """
+    An immutable sequence of strings stored as UTF-8 bytes in a buffer (bytes,
+    or the mmap of a snapshot file) and a uint32 table of offsets into it.
+    Reading a string decodes a fresh copy; nothing per string is kept alive,
+    so the pages holding the strings are shared by every worker.
+    """
+    __slots__ = ('data', 'base', 'offsets')
+    
+    def __init__(self, data, base, offsets):
+        self.data = data
+        self.base = base
+        self.offsets = offsets
+    
+    @staticmethod
+    def pack(strings):
+        """Encode strings into (offsets, data) bytes for a snapshot"""
+        encoded = [string.encode('utf-8') for string in strings]
+        offsets = array('I', accumulate(map(len, encoded), initial=0))
+        return offsets.tobytes(), b''.join(encoded)
+    
+    def __len__(self):
+        return len(self.offsets) - 1
+    
+    def __getitem__(self, i):
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.raw(i).decode('utf-8')
+    
+    def raw(self, i):
+        return self.data[self.base + self.offsets[i]:self.base + self.offsets[i + 1]]
+    
+    def find(self, string, lo=0, hi=None):
+        """Index of string in the sorted slice [lo, hi), or -1"""
+        key = string.encode('utf-8')
+        hi = len(self) if hi is None else hi
+        end = hi
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.raw(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < end and self.raw(lo) == key else -1
+
+class VocabularyIndex:
+    """
+    Read-only index of the system vocabulary and the stored translations of
+    its words, read zero-copy from a snapshot buffer and tagged with the
+    SystemVocabulary version it was built from. Words are the canonical
+    forms (see Lexicon.canonical), stored level by level and sorted within
+    each level, so
+    membership is a binary search and sampling a level is random index picks.
+    Translations are looked up by binary search over the sorted words.
+    """
+    
+    def __init__(self, buffer, source=None):
+        self.source = source  # (inode, mtime, size) of the snapshot file, if mapped from one
+        self.loaded_at = time.time()
+        view = memoryview(buffer)
+        if len(view) < HEADER.size + SECTION.size * len(SECTIONS):
+            raise ValueError("Truncated vocabulary snapshot")
+        magic, format_version, little_endian, self.version, count = HEADER.unpack_from(view)
+        if magic != MAGIC or format_version != FORMAT_VERSION or count != len(SECTIONS):
+            raise ValueError("Not a vocabulary snapshot of this format")
+        if bool(little_endian) != (sys.byteorder == 'little'):
+            raise ValueError("Vocabulary snapshot written on a machine of the other byte order")
+        
+        sections = {}
+        for i, name in enumerate(SECTIONS):
+            offset, length = SECTION.unpack_from(view, HEADER.size + i * SECTION.size)
+            if offset + length > len(view):
+                raise ValueError("Truncated vocabulary snapshot")
+            sections[name] = (offset, length)
+        
+        def offsets(name):
+            offset, length = sections[name]
+            return view[offset:offset + length].cast('I')
+        
+        def strings(name):
+            return PackedStrings(buffer, sections[name + '_data'][0], offsets(name + '_offsets'))
+        
+        levels = strings('level')
+        starts = offsets('level_starts')
+        self.levels = tuple(levels[i] for i in range(len(levels)))
+        self.level_ranges = {level: (starts[i], starts[i + 1]) for i, level in enumerate(self.levels)}
+        self.words = strings('word')
+        self.translation_keys = strings('key')
+        self.translation_values = strings('value')
+    
+    @staticmethod
+    def serialize(version, words_by_level, translations):
+        """The snapshot of a vocabulary as bytes"""
+        levels = sorted(words_by_level)
+        words = []
+        starts = [0]
+        for level in levels:
+            words.extend(sorted(set(words_by_level[level])))
+            starts.append(len(words))
+        keys = sorted(translations)
+        
+        parts = {}
+        parts['level_offsets'], parts['level_data'] = PackedStrings.pack(levels)
+        parts['level_starts'] = array('I', starts).tobytes()
+        parts['word_offsets'], parts['word_data'] = PackedStrings.pack(words)
+        parts['key_offsets'], parts['key_data'] = PackedStrings.pack(keys)
+        parts['value_offsets'], parts['value_data'] = PackedStrings.pack(translations[key] for key in keys)
+        
+        table = []
+        body = bytearray()
+        position = HEADER.size + SECTION.size * len(SECTIONS)
+        for name in SECTIONS:
+            padding = -(position + len(body)) % 8
+            body += b'\0' * padding
+            table.append(SECTION.pack(position + len(body), len(parts[name])))
+            body += parts[name]
+        
+        header = HEADER.pack(MAGIC, FORMAT_VERSION, sys.byteorder == 'little', version, len(SECTIONS))
+        return header + b''.join(table) + bytes(body)
+    
+    @classmethod
+    def open(cls, path):
+        """Map a snapshot file read-only. The mapping lives as long as the index does."""
+        with open(path, 'rb') as file:
+            stat = os.fstat(file.fileno())
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(mapped, source=(stat.st_ino, stat.st_mtime_ns, stat.st_size))
+    
+    def __len__(self):
+        return len(self.words)
+    
+    def __contains__(self, level):
+        return level in self.level_ranges
+    
+    def level_words(self, level):
+        start, end = self.level_ranges.get(level, (0, 0))
+        return [self.words[i] for i in range(start, end)]
+    
+    def sample(self, level, count, rng=random):
+        """Up to count distinct random words of a level, or None if the level is unknown"""
+        if level not in self.level_ranges:
+            return None
+        start, end = self.level_ranges[level]
+        return [self.words[i] for i in rng.sample(range(start, end), min(count, end - start))]
+    
+    def contains(self, word, level=None):
+        """Whether word is in the given level, or in any level"""
+        levels = self.levels if level is None else (level,) if level in self.level_ranges else ()
+        return any(self.words.find(word, *self.level_ranges[name]) >= 0 for name in levels)
+    
+    def translation(self, word):
+        i = self.translation_keys.find(word)
+        return self.translation_values[i] if i >= 0 else None
+
+def read_vocabulary():
+    """(version, canonical words by level, translations of those words) from the database"""
+    conn = Database.get_connection()
+    # Read the version first: a change landing meanwhile only causes another rebuild
+    version = SystemVocabulary.get_version(conn.cursor())
+    conn.close()
+    
+    words_by_level = SystemVocabulary.get_all_words(canonical=True)
+    system_words = {word for words in words_by_level.values() for word in words}
+    translations = {
+        word: translation for word, translation in Lexicon.get_translations().items() if word in system_words
+    }
+    return version, words_by_level, translations
+
+def write_snapshot(path=None):
+    """
+    Write the snapshot of the current system vocabulary and translations and
+    rename it into place, so readers see either the old file or the new one.
+    Called after ingests and translation runs; returns the version written.
+    """
+    path = path or SNAPSHOT_PATH
+    version, words_by_level, translations = read_vocabulary()
+    content = VocabularyIndex.serialize(version, words_by_level, translations)
+    
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as file:
+        file.write(content)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+    return version
+
+def _snapshot_source(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+def _open_snapshot(path):
+    try:
+        return VocabularyIndex.open(path)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.info("Vocabulary snapshot %s unusable: %s", path, e)
+        return None
+
+def _write_if_stale(path, version):
+    """
+    Rewrite the snapshot unless it already holds version (or a newer one),
+    and return it mapped. A lock file makes the rewrite single-flight: when
+    the database version moves, one worker process rewrites the file and the
+    others wait, then map what it wrote, rather than each rewriting it in
+    turn and setting off another round of reloads.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.lock', 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            # Another process may have rewritten it while we waited for the lock
+            index = _open_snapshot(path)
+            if index is None or index.version < version:
+                write_snapshot(path)
+                index = _open_snapshot(path)
+            return index
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def _database_version():
+    conn = Database.get_connection()
+    version = SystemVocabulary.get_version(conn.cursor())
+    conn.close()
+    return version
+
+_index = VocabularyIndex(VocabularyIndex.serialize(0, {}, {}))
+_checked_at = 0.0
+_heartbeat_at = 0.0
+_reloading = False
+_lock = threading.Lock()
+# The index a request started with: requests keep it even if a reload lands meanwhile
+_pinned = ContextVar('vocabulary_index', default=None)
+
+def _reset_after_fork():
+    global _lock, _reloading
+    _lock = threading.Lock()
+    _reloading = False
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def current():
+    """The index pinned to the current request, or else the latest one; never modified"""
+    index = _pinned.get()
+    return index if index is not None else _index
+
+def pin():
+    """Pin the latest index to the current request (see refresh) and return it"""
+    index = refresh()
+    _pinned.set(index)
+    return index
+
+def unpin():
+    _pinned.set(None)
+
+def load(path=None):
+    """
+    Map the vocabulary snapshot and install it, first rewriting it if it is
+    missing or older than the database (see _write_if_stale). Called by
+    create_app, so with gunicorn's preload the workers inherit the mapping;
+    without it they map the same file, and the kernel shares its pages
+    between them either way.
+    """
+    global _index, _checked_at
+    path = path or SNAPSHOT_PATH
+    version = _database_version()
+    
+    index = _open_snapshot(path)
+    if index is None or index.version < version:
+        try:
+            index = _write_if_stale(path, version)
+        except OSError as e:
+            logger.warning("Could not write the vocabulary snapshot, keeping it in memory: %s", e)
+            index = None
+        if index is None:
+            index = VocabularyIndex(VocabularyIndex.serialize(*read_vocabulary()))
+    
+    # A single reference swap: requests see the old index or the new one, never a mix
+    _index = index
+    _checked_at = time.monotonic()
+    return _index
+
+def _reload(path):
+    global _reloading
+    try:
+        old_version = _index.version
+        index = load(path)
+        logger.info("Vocabulary index reloaded", extra={
+            'old_version': old_version, 'vocabulary_version': index.version, 'words': len(index)
+        })
+        _record_heartbeat(index)
+    except Exception:
+        logger.exception("Vocabulary index reload failed")
+    finally:
+        _reloading = False
+
+def _record_heartbeat(index):
+    global _heartbeat_at
+    _heartbeat_at = time.monotonic()
+    try:
+        WorkerHeartbeat.record(worker_id(), index.version, index.loaded_at)
+    except Exception:
+        logger.exception("Could not record the vocabulary heartbeat")
+
+def refresh(path=None, check_interval=CHECK_INTERVAL):
+    """
+    At most once per check_interval, look for a replaced snapshot file or a
+    newer system vocabulary version, and if there is one rebuild the index
+    in a background thread that swaps it in when done. Heartbeats are
+    written from a background thread too. Returns the latest index without
+    waiting for either.
+    """
+    global _checked_at, _reloading, _heartbeat_at
+    if _reloading or time.monotonic() - _checked_at < check_interval or not _lock.acquire(blocking=False):
+        return _index
+    try:
+        _checked_at = time.monotonic()
+        path = path or SNAPSHOT_PATH
+        source = _snapshot_source(path)
+        if (source is not None and source != _index.source) or _database_version() != _index.version:
+            _reloading = True
+            threading.Thread(target=_reload, args=(path,), name='vocabulary-reload', daemon=True).start()
+        elif time.monotonic() - _heartbeat_at >= HEARTBEAT_INTERVAL:
+            _heartbeat_at = time.monotonic()
+            threading.Thread(target=_record_heartbeat, args=(_index,), name='vocabulary-heartbeat', daemon=True).start()
+    except Exception:
+        logger.exception("Vocabulary version check failed")
+    finally:
+        _lock.release()
+    return _index
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+JSON serialisation and compression report for a large vocabulary library
+
+Builds a throwaway database with one user holding a synthetic library of
+translated words, loads it the way /api/vocabulary does, then prints the
+CPU time of turning it into a response with Flask's default json provider
+and with the orjson provider, and the bytes on the wire uncompressed, with
+gzip and with brotli (when installed) together with the compression time.
+
+Usage: python benchmarks/json_compression_report.py [library_words]
+"""
+
+import os
+import sys
+import random
+import tempfile
+import time
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import app.models as models
+from app import compression
+from app.json_provider import OrjsonProvider, orjson
+
+DEFAULT_WORDS = 5000
+LEVELS = ['LEVEL1', 'LEVEL2', 'LEVEL3', 'LEVEL4', 'LEVEL5', 'LEVEL6']
+REPEATS = 20
+
+def build(path, words):
+    models.DATABASE_PATH = path
+    models.Database.init_db()
+    code = models.User.create_activation_codes(1)[0]
+    user = models.User.create_user(code, 'bench', 'bench@example.com', 'secret1')
+    
+    rng = random.Random(42)
+    rows = [{
+        'word': f'word{i}',
+        # Chinese translations, like the real ones, so ASCII escaping shows up in the size
+        'translation': ''.join(chr(rng.randrange(0x4e00, 0x9fa5)) for _ in range(rng.randrange(2, 6))),
+        'level': LEVELS[i % len(LEVELS)],
+        'notes': 'remember this one' if i % 10 == 0 else None,
+    } for i in range(words)]
+    models.VocabularyLibrary.add_words_batch(user['id'], rows, added_from='benchmark')
+    return user['id']
+
+def time_call(function):
+    function()
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        result = function()
+    return (time.perf_counter() - start) / REPEATS * 1000, result
+
+def main():
+    words = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_WORDS
+    workdir = tempfile.mkdtemp(prefix='json_report_')
+    
+    print(f"Building a library of {words:,} words in {workdir}...")
+    user_id = build(os.path.join(workdir, 'json.db'), words)
+    vocabulary = models.VocabularyLibrary.get_user_vocabulary(user_id)
+    
+    app = Flask(__name__)
+    providers = {'json (Flask default)': DefaultJSONProvider(app)}
+    if orjson is not None:
+        providers['orjson'] = OrjsonProvider(app)
+    else:
+        print("orjson is not installed; only the default provider is measured")
+    
+    print("=" * 64)
+    print(f"{'provider':<28} {'serialise (ms)':>16} {'bytes':>16}")
+    print("-" * 64)
+    bodies = {}
+    with app.app_context():
+        for name, provider in providers.items():
+            elapsed, response = time_call(lambda: provider.response(vocabulary))
+            bodies[name] = response.get_data()
+            print(f"{name:<28} {elapsed:>16.2f} {len(bodies[name]):>16,}")
+    print("=" * 64)
+    
+    encodings = ['gzip'] + (['br'] if compression.brotli is not None else [])
+    if compression.brotli is None:
+        print("brotli is not installed; only gzip is measured")
+    print(f"{'provider / encoding':<28} {'compress (ms)':>16} {'bytes':>16}")
+    print("-" * 64)
+    for name, body in bodies.items():
+        for encoding in encodings:
+            elapsed, compressed = time_call(lambda: compression._compress(body, encoding))
+            print(f"{name + ' / ' + encoding:<28} {elapsed:>16.2f} {len(compressed):>16,}")
+    print("=" * 64)
+
+if __name__ == "__main__":
+    main()
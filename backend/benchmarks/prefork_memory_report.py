@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Pre-fork memory report: gunicorn-style workers with and without preload
+
+Builds a throwaway database with a synthetic translated system vocabulary,
+then runs two small process trees the way gunicorn does. With preload the
+master imports the app and runs create_app, freezes the collector and forks
+the workers; without it every forked worker imports and creates the app
+itself. Each worker serves a first request (timed from the fork) and then
+a round of question requests, after which the report reads every process's
+proportional (PSS) and private (USS) memory from /proc. Linux only.
+
+Usage: python benchmarks/prefork_memory_report.py [words] [workers]
+"""
+
+import os
+import sys
+import gc
+import json
+import random
+import subprocess
+import tempfile
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, BACKEND_DIR)
+
+DEFAULT_WORDS = 7000
+DEFAULT_WORKERS = 4
+LEVELS = ['LEVEL1', 'LEVEL2', 'LEVEL3', 'LEVEL4', 'LEVEL5', 'LEVEL6']
+# Requests each worker serves after its first one, before memory is read
+WARM_REQUESTS = 200
+
+def build(path, words):
+    import app.models as models
+    models.DATABASE_PATH = path
+    models.Database.init_db()
+    rng = random.Random(42)
+    pairs = [(f'word{i}', LEVELS[i % len(LEVELS)]) for i in range(words)]
+    models.SystemVocabulary.add_multiple_words(pairs)
+    models.Lexicon.set_translations({
+        word: ''.join(chr(rng.randrange(0x4e00, 0x9fa5)) for _ in range(rng.randrange(2, 6)))
+        for word, _ in pairs
+    })
+
+def memory(pid):
+    """(PSS, USS) of a process in KiB"""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as file:
+        for line in file:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                values[parts[0].rstrip(':')] = int(parts[1])
+    return values['Pss'], values['Private_Clean'] + values['Private_Dirty']
+
+def create_app(path):
+    import app.models as models
+    from app.services import distractors, vocabulary_index
+    # Keep every file the app writes next to the throwaway database
+    models.DATABASE_PATH = path
+    distractors.INDEX_PATH = os.path.join(os.path.dirname(path), 'distractors.npz')
+    vocabulary_index.SNAPSHOT_PATH = os.path.join(os.path.dirname(path), 'vocabulary.snapshot')
+    from app import create_app
+    return create_app()
+
+def serve(app, forked_at, results):
+    """Worker body: time the first request, warm up, report, wait to be measured"""
+    client = app.test_client()
+    response = client.get('/api/question/LEVEL1')
+    first_request = time.perf_counter() - forked_at
+    assert response.status_code == 200, (response.status_code, response.get_data(as_text=True))
+    for i in range(WARM_REQUESTS):
+        client.get(f'/api/question/{LEVELS[i % len(LEVELS)]}')
+    os.write(results, (json.dumps({'pid': os.getpid(), 'first_request': first_request}) + '\n').encode())
+    time.sleep(3600)
+
+def master(path, workers, preload):
+    """Fork the workers, collect their reports and memory, print JSON"""
+    app = None
+    if preload:
+        app = create_app(path)
+        gc.freeze()
+    read_end, write_end = os.pipe()
+    pids = []
+    for _ in range(workers):
+        forked_at = time.perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_end)
+            try:
+                serve(app or create_app(path), forked_at, write_end)
+            except BaseException as e:
+                os.write(write_end, (json.dumps({'pid': os.getpid(), 'error': repr(e)}) + '\n').encode())
+            os._exit(1)
+        pids.append(pid)
+    os.close(write_end)
+    
+    reports = []
+    try:
+        with os.fdopen(read_end) as results:
+            for line in results:
+                reports.append(json.loads(line))
+                if len(reports) == workers:
+                    break
+        for report in reports:
+            if 'error' in report:
+                raise RuntimeError(f"Worker {report['pid']} failed: {report['error']}")
+            report['pss'], report['uss'] = memory(report['pid'])
+        master_pss, master_uss = memory(os.getpid())
+    finally:
+        for pid in pids:
+            os.kill(pid, 9)
+            os.waitpid(pid, 0)
+    print(json.dumps({'master_pss': master_pss, 'master_uss': master_uss, 'workers': reports}))
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--master':
+        master(sys.argv[2], int(sys.argv[3]), sys.argv[4] == 'preload')
+        return
+    
+    words = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_WORDS
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_WORKERS
+    workdir = tempfile.mkdtemp(prefix='prefork_report_')
+    path = os.path.join(workdir, 'prefork.db')
+    print(f"Building a vocabulary of {words:,} translated words in {workdir}...")
+    build(path, words)
+    
+    env = dict(os.environ, LOG_LEVEL='WARNING')
+    print("=" * 72)
+    print(f"{'mode':<10} {'worker PSS':>12} {'worker USS':>12} {'total PSS':>12} {'first request':>20}")
+    print(f"{'':<10} {'(MiB)':>12} {'(MiB)':>12} {'(MiB)':>12} {'(ms, mean / max)':>20}")
+    print("-" * 72)
+    for mode in ('lazy', 'preload'):
+        # Each mode runs in a fresh interpreter so neither inherits the other's imports
+        output = subprocess.run(
+            [sys.executable, __file__, '--master', path, str(workers), mode],
+            env=env, cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        reports = result['workers']
+        pss = sum(report['pss'] for report in reports) / len(reports) / 1024
+        uss = sum(report['uss'] for report in reports) / len(reports) / 1024
+        total = (result['master_pss'] + sum(report['pss'] for report in reports)) / 1024
+        first = [report['first_request'] * 1000 for report in reports]
+        print(f"{mode:<10} {pss:>12.1f} {uss:>12.1f} {total:>12.1f} {sum(first) / len(first):>11.1f} / {max(first):>6.1f}")
+    print("=" * 72)
+
+if __name__ == "__main__":
+    main()
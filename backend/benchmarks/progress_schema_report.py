@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Before/after report for interning user_progress words and levels
+
+Builds two throwaway databases with the same synthetic progress data, one
+with the legacy TEXT word/level columns and one with the current integer
+id schema, then prints the database file size and timings of the queries
+the app runs against user_progress.
+
+Usage: python benchmarks/progress_schema_report.py [progress_rows]
+"""
+
+import os
+import sys
+import random
+import sqlite3
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import app.models as models
+
+DEFAULT_ROWS = 10_000_000
+WORDS = 7000
+LEVELS = ['LEVEL1', 'LEVEL2', 'LEVEL3', 'LEVEL4', 'LEVEL5', 'LEVEL6']
+WORDS_PER_USER = 5000
+QUERY_REPEATS = 50
+
+LEGACY_SCHEMA = [
+    '''
+    CREATE TABLE user_progress (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        level TEXT NOT NULL,
+        word TEXT NOT NULL,
+        correct_count INTEGER DEFAULT 0,
+        incorrect_count INTEGER DEFAULT 0,
+        last_practiced TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(user_id, level, word)
+    )
+    ''',
+    '''
+    CREATE TABLE system_vocabulary (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        word TEXT NOT NULL,
+        level TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(word, level)
+    )
+    ''',
+    '''
+    CREATE TABLE vocabulary_library (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        word TEXT NOT NULL,
+        translation TEXT,
+        UNIQUE(user_id, word)
+    )
+    ''',
+]
+
+LEGACY_QUERIES = {
+    'stats': '''
+        SELECT level, COUNT(*), SUM(correct_count), SUM(incorrect_count)
+        FROM user_progress WHERE user_id = ? GROUP BY level
+    ''',
+    'mistakes': '''
+        SELECT word, level, incorrect_count FROM user_progress
+        WHERE user_id = ? AND incorrect_count > 0
+        ORDER BY incorrect_count DESC, last_practiced DESC
+    ''',
+    'search': '''
+        SELECT sv.word, sv.level FROM system_vocabulary sv
+        LEFT JOIN vocabulary_library vl ON sv.word = vl.word AND vl.user_id = ?
+        WHERE sv.word LIKE '%ab%' AND vl.word IS NULL
+    ''',
+}
+
+INTERNED_QUERIES = {
+    'stats': '''
+        SELECT l.name, s.words, s.correct, s.incorrect FROM (
+            SELECT level_id, COUNT(*) AS words, SUM(correct_count) AS correct, SUM(incorrect_count) AS incorrect
+            FROM user_progress WHERE user_id = ? GROUP BY level_id
+        ) s JOIN levels l ON l.id = s.level_id
+    ''',
+    'mistakes': '''
+        SELECT w.word, l.name, up.incorrect_count FROM user_progress up
+        JOIN words w ON w.id = up.word_id
+        JOIN levels l ON l.id = up.level_id
+        WHERE up.user_id = ? AND up.incorrect_count > 0
+        ORDER BY up.incorrect_count DESC, up.last_practiced DESC
+    ''',
+    'search': '''
+        SELECT sv.word, sv.level FROM system_vocabulary sv
+        LEFT JOIN vocabulary_library vl ON vl.user_id = ? AND vl.word_id = sv.word_id
+        WHERE sv.word LIKE '%ab%' AND vl.id IS NULL
+    ''',
+}
+
+def make_vocabulary():
+    """Generate a deterministic synthetic word list spread over the levels"""
+    rng = random.Random(42)
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    words = set()
+    while len(words) < WORDS:
+        words.add(''.join(rng.choice(letters) for _ in range(rng.randint(3, 12))))
+    return [(word, LEVELS[i % len(LEVELS)]) for i, word in enumerate(sorted(words))]
+
+def progress_rows(vocabulary, rows):
+    """Yield (user_id, vocabulary index, correct, incorrect) tuples"""
+    rng = random.Random(7)
+    per_user = min(WORDS_PER_USER, len(vocabulary))
+    user_id = 0
+    produced = 0
+    while produced < rows:
+        user_id += 1
+        for index in rng.sample(range(len(vocabulary)), per_user):
+            if produced >= rows:
+                return
+            yield user_id, index, rng.randint(0, 5), rng.randint(0, 3)
+            produced += 1
+
+def build_legacy(path, vocabulary, rows):
+    conn = sqlite3.connect(path)
+    for ddl in LEGACY_SCHEMA:
+        conn.execute(ddl)
+    conn.executemany('INSERT INTO system_vocabulary (word, level) VALUES (?, ?)', vocabulary)
+    conn.executemany(
+        'INSERT INTO vocabulary_library (user_id, word, translation) VALUES (1, ?, ?)',
+        [(word, word) for word, _ in vocabulary[::10]]
+    )
+    conn.executemany(
+        'INSERT INTO user_progress (user_id, level, word, correct_count, incorrect_count) VALUES (?, ?, ?, ?, ?)',
+        ((user_id, vocabulary[i][1], vocabulary[i][0], c, w) for user_id, i, c, w in progress_rows(vocabulary, rows))
+    )
+    conn.commit()
+    conn.execute('VACUUM')
+    conn.close()
+
+def build_interned(path, vocabulary, rows):
+    models.DATABASE_PATH = path
+    models.Database.init_db()
+    models.SystemVocabulary.add_multiple_words(vocabulary)
+    
+    conn = models.Database.get_connection()
+    cursor = conn.cursor()
+    word_ids = models.Lexicon.intern_words(cursor, [word for word, _ in vocabulary])
+    level_ids = {level: models.Lexicon.intern_level(cursor, level) for level in LEVELS}
+    cursor.executemany(
+        'INSERT INTO vocabulary_library (user_id, word, word_id, translation) VALUES (1, ?, ?, ?)',
+        [(word, word_ids[word], word) for word, _ in vocabulary[::10]]
+    )
+    cursor.executemany(
+        'INSERT INTO user_progress (user_id, level_id, word_id, correct_count, incorrect_count) VALUES (?, ?, ?, ?, ?)',
+        ((user_id, level_ids[vocabulary[i][1]], word_ids[vocabulary[i][0]], c, w)
+         for user_id, i, c, w in progress_rows(vocabulary, rows))
+    )
+    conn.commit()
+    conn.execute('VACUUM')
+    conn.close()
+
+def time_queries(path, queries):
+    conn = sqlite3.connect(path)
+    timings = {}
+    for name, sql in queries.items():
+        conn.execute(sql, (1,)).fetchall()  # Warm the page cache
+        start = time.perf_counter()
+        for i in range(QUERY_REPEATS):
+            conn.execute(sql, (1 + i % 10,)).fetchall()
+        timings[name] = (time.perf_counter() - start) / QUERY_REPEATS * 1000
+    conn.close()
+    return timings
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS
+    vocabulary = make_vocabulary()
+    workdir = tempfile.mkdtemp(prefix='progress_report_')
+    legacy_path = os.path.join(workdir, 'legacy.db')
+    interned_path = os.path.join(workdir, 'interned.db')
+    
+    print(f"Building databases with {rows:,} progress rows in {workdir}...")
+    start = time.perf_counter()
+    build_legacy(legacy_path, vocabulary, rows)
+    print(f"  legacy schema built in {time.perf_counter() - start:.1f}s")
+    start = time.perf_counter()
+    build_interned(interned_path, vocabulary, rows)
+    print(f"  interned schema built in {time.perf_counter() - start:.1f}s")
+    
+    legacy_size = os.path.getsize(legacy_path)
+    interned_size = os.path.getsize(interned_path)
+    legacy_times = time_queries(legacy_path, LEGACY_QUERIES)
+    interned_times = time_queries(interned_path, INTERNED_QUERIES)
+    
+    print("=" * 60)
+    print(f"{'':<20} {'before (TEXT)':>18} {'after (ids)':>18}")
+    print("-" * 60)
+    print(f"{'file size (MB)':<20} {legacy_size / 1e6:>18.1f} {interned_size / 1e6:>18.1f}")
+    for name in LEGACY_QUERIES:
+        print(f"{name + ' query (ms)':<20} {legacy_times[name]:>18.3f} {interned_times[name]:>18.3f}")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Random row sampling report: ORDER BY RANDOM() vs RandomRows
+
+Builds a throwaway database with a large synthetic system vocabulary spread
+over interleaved levels, deletes a share of the rows to leave rowid gaps,
+then times drawing a few random words with ORDER BY RANDOM() LIMIT n and
+with RandomRows.sample, for the whole table and for one level. Also prints
+how evenly RandomRows spreads its draws over a small level.
+
+Usage: python benchmarks/random_sampling_report.py [rows]
+"""
+
+import os
+import sys
+import random
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import app.models as models
+
+DEFAULT_ROWS = 1_000_000
+LEVELS = ['LEVEL1', 'LEVEL2', 'LEVEL3', 'LEVEL4', 'LEVEL5', 'LEVEL6']
+# Share of rows deleted afterwards, leaving gaps in the rowid range
+DELETED_SHARE = 0.2
+SAMPLE_SIZE = 4
+QUERY_REPEATS = 50
+# Draws used to check that every row of a small level is equally likely
+UNIFORMITY_LEVEL_ROWS = 50
+UNIFORMITY_DRAWS = 20_000
+
+def build(path, rows):
+    models.DATABASE_PATH = path
+    models.Database.init_db()
+    
+    conn = models.Database.get_connection()
+    cursor = conn.cursor()
+    level_ids = {level: models.Lexicon.intern_level(cursor, level) for level in LEVELS + ['SMALL']}
+    cursor.executemany(
+        'INSERT INTO system_vocabulary (word, level, level_id) VALUES (?, ?, ?)',
+        ((f'word{i}', LEVELS[i % len(LEVELS)], level_ids[LEVELS[i % len(LEVELS)]]) for i in range(rows))
+    )
+    rng = random.Random(42)
+    cursor.executemany(
+        'DELETE FROM system_vocabulary WHERE id = ?',
+        ((rowid,) for rowid in rng.sample(range(1, rows + 1), int(rows * DELETED_SHARE)))
+    )
+    # A small level whose rows sit far apart in the rowid range
+    cursor.executemany(
+        'INSERT INTO system_vocabulary (id, word, level, level_id) VALUES (?, ?, ?, ?)',
+        ((rows + 1 + i * 1000, f'small{i}', 'SMALL', level_ids['SMALL']) for i in range(UNIFORMITY_LEVEL_ROWS))
+    )
+    conn.commit()
+    conn.execute('ANALYZE')
+    conn.close()
+    return level_ids
+
+def time_call(function):
+    function()  # Warm the page cache
+    start = time.perf_counter()
+    for _ in range(QUERY_REPEATS):
+        function()
+    return (time.perf_counter() - start) / QUERY_REPEATS * 1000
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS
+    workdir = tempfile.mkdtemp(prefix='sampling_report_')
+    path = os.path.join(workdir, 'sampling.db')
+    
+    print(f"Building a database with {rows:,} vocabulary rows in {workdir}...")
+    start = time.perf_counter()
+    level_ids = build(path, rows)
+    print(f"  built in {time.perf_counter() - start:.1f}s")
+    
+    conn = models.Database.get_connection()
+    cursor = conn.cursor()
+    level_id = level_ids['LEVEL3']
+    
+    cases = {
+        'whole table': (
+            lambda: cursor.execute(
+                'SELECT word FROM system_vocabulary ORDER BY RANDOM() LIMIT ?', (SAMPLE_SIZE,)
+            ).fetchall(),
+            lambda: models.RandomRows.sample(cursor, 'system_vocabulary', 'word', SAMPLE_SIZE),
+        ),
+        'one level': (
+            lambda: cursor.execute(
+                'SELECT word FROM system_vocabulary WHERE level_id = ? ORDER BY RANDOM() LIMIT ?',
+                (level_id, SAMPLE_SIZE)
+            ).fetchall(),
+            lambda: models.RandomRows.sample(cursor, 'system_vocabulary', 'word', SAMPLE_SIZE, level_id=level_id),
+        ),
+        'sparse level': (
+            lambda: cursor.execute(
+                'SELECT word FROM system_vocabulary WHERE level_id = ? ORDER BY RANDOM() LIMIT ?',
+                (level_ids['SMALL'], SAMPLE_SIZE)
+            ).fetchall(),
+            lambda: models.RandomRows.sample(
+                cursor, 'system_vocabulary', 'word', SAMPLE_SIZE, level_id=level_ids['SMALL']
+            ),
+        ),
+    }
+    
+    print("=" * 60)
+    print(f"{f'draw {SAMPLE_SIZE} rows (ms)':<22} {'ORDER BY RANDOM()':>18} {'RandomRows':>18}")
+    print("-" * 60)
+    for name, (order_by_random, random_rows) in cases.items():
+        print(f"{name:<22} {time_call(order_by_random):>18.3f} {time_call(random_rows):>18.3f}")
+    print("=" * 60)
+    
+    counts = Counter()
+    for _ in range(UNIFORMITY_DRAWS // SAMPLE_SIZE):
+        rows_drawn = models.RandomRows.sample(
+            cursor, 'system_vocabulary', 'word', SAMPLE_SIZE, level_id=level_ids['SMALL']
+        )
+        counts.update(row['word'] for row in rows_drawn)
+    expected = UNIFORMITY_DRAWS / UNIFORMITY_LEVEL_ROWS
+    print(f"Sparse level uniformity over {UNIFORMITY_DRAWS:,} draws: expected {expected:.0f} per word, "
+          f"got {min(counts.values())}..{max(counts.values())} across {len(counts)} words")
+    conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+# gunicorn.conf.py
+
+import gc
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 4))
+
+# Preload: the master imports the app and runs create_app once (building the
+# vocabulary index) and forks workers that share those pages copy-on-write.
+# GUNICORN_PRELOAD=0 goes back to every worker loading the app itself.
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') != '0'
+
+def pre_fork(server, worker):
+    # Move everything allocated so far out of the collector's reach, so
+    # garbage collections in the workers don't write to the shared pages
+    gc.freeze()
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Vocabulary ingestion script
+Run this script to load vocabulary PDFs into the system vocabulary.
+Accepts PDF files and directories of PDFs; defaults to the downloaded word list.
+Sources that haven't changed since the last ingest are skipped (use --force).
+"""
+
+import sys
+import os
+
+# Add the app directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+
+from app.models import Database
+from app.services.vocabulary import ingest_vocabulary
+
+def main():
+    force = '--force' in sys.argv[1:]
+    sources = [arg for arg in sys.argv[1:] if arg != '--force']
+    
+    Database.init_db()
+    
+    print("Ingesting vocabulary...")
+    result = ingest_vocabulary(sources or None, force=force)
+    
+    if result is None:
+        print("✗ Vocabulary ingestion failed")
+        sys.exit(1)
+    
+    print(f"Sources: {', '.join(result['sources'])}")
+    if result['skipped']:
+        print("✓ Sources unchanged since the last ingest, nothing to do")
+    else:
+        print(f"✓ Inserted {result['inserted']}, deleted {result['deleted']}, moved {result['moved']} words")
+
+if __name__ == "__main__":
+    main()
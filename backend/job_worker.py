@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Background job worker
+Run this script alongside the web server to process queued background jobs
+(translations, bulk imports, vocabulary downloads and ingests). The pool
+also queues the hourly answer history rollup (see rollup_stats.py).
+Usage: python job_worker.py [--workers N] [--burst]
+  --workers N  number of worker processes (default 2)
+  --burst      process what is queued in this process, then exit
+"""
+
+import sys
+import os
+
+# Add the app directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+
+from app.models import Database
+from app.logging_setup import configure_logging
+from app.services.jobs import run_pool, run_worker
+
+def main():
+    args = sys.argv[1:]
+    workers = 2
+    if '--workers' in args:
+        workers = int(args[args.index('--workers') + 1])
+    
+    configure_logging()
+    Database.init_db()
+    
+    if '--burst' in args:
+        processed = run_worker(burst=True)
+        print(f"✓ Processed {processed} jobs")
+        return
+    
+    print(f"Starting {workers} job workers...")
+    run_pool(workers)
+    print("✓ Job workers stopped")
+
+if __name__ == "__main__":
+    main()
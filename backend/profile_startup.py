@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Startup profiler
+Run this script to see what importing the app and running create_app() costs:
+the total time, the slowest imports (from python -X importtime) and whether
+any dependency that should load lazily was imported anyway.
+Usage: python profile_startup.py [--top N] [--budget MS] [--database PATH]
+  --top N          import entries to list, slowest first (default 25)
+  --budget MS      exit with status 1 if startup takes longer than MS milliseconds
+                   or a lazy dependency was imported
+  --database PATH  database create_app opens (default: a fresh temporary one)
+"""
+
+import os
+import sys
+import json
+import subprocess
+import tempfile
+
+# Only ingestion, translation and text-to-speech use these; create_app must not import them
+LAZY_MODULES = ['requests', 'PyPDF2', 'deep_translator', 'pyttsx3']
+
+# Runs in a fresh interpreter with -X importtime, which reports on stderr
+PROBE = '''
+import sys, time, json
+start = time.perf_counter()
+import app.models as models
+models.DATABASE_PATH = sys.argv[1]
+from app import create_app
+imported = time.perf_counter()
+create_app()
+finished = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'create_app_ms': (finished - imported) * 1000,
+    'modules': sorted(sys.modules),
+}))
+'''
+
+def parse_importtime(stderr):
+    """Parse -X importtime lines into (self_us, cumulative_us, depth, module) tuples"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((int(self_us), int(cumulative_us), depth, name.strip()))
+    return entries
+
+def option(args, name, default):
+    return args[args.index(name) + 1] if name in args else default
+
+def main():
+    args = sys.argv[1:]
+    top = int(option(args, '--top', 25))
+    budget = option(args, '--budget', None)
+    database = option(args, '--database', None) or os.path.join(tempfile.mkdtemp(prefix='startup_'), 'startup.db')
+    
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', PROBE, database],
+        cwd=backend_dir, capture_output=True, text=True, env=dict(os.environ, LOG_LEVEL='WARNING')
+    )
+    if process.returncode != 0:
+        print(process.stderr[-2000:])
+        print("✗ create_app() failed")
+        sys.exit(1)
+    
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    entries = parse_importtime(process.stderr)
+    total_ms = result['import_ms'] + result['create_app_ms']
+    
+    print(f"Imports: {result['import_ms']:.0f} ms, create_app(): {result['create_app_ms']:.0f} ms, "
+          f"total: {total_ms:.0f} ms ({len(result['modules'])} modules loaded)")
+    print()
+    print(f"{'cumulative (ms)':>16} {'self (ms)':>10}  module")
+    for self_us, cumulative_us, depth, name in sorted(entries, key=lambda entry: -entry[1])[:top]:
+        print(f"{cumulative_us / 1000:>16.1f} {self_us / 1000:>10.1f}  {'  ' * depth}{name}")
+    print()
+    
+    loaded = [name for name in LAZY_MODULES if name in result['modules']]
+    if loaded:
+        print(f"✗ Imported at startup but only needed lazily: {', '.join(loaded)}")
+    else:
+        print(f"✓ None of {', '.join(LAZY_MODULES)} imported at startup")
+    
+    if budget is not None:
+        over = total_ms > float(budget)
+        print(f"{'✗' if over else '✓'} Startup took {total_ms:.0f} ms, budget {float(budget):.0f} ms")
+        if over or loaded:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
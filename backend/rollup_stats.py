@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Answer history rollup job
+Run this script periodically (e.g. hourly from cron) to compact the raw
+answer_events log into per-user daily stats and prune old raw events,
+old vocabulary library tombstones and stale quiz sessions. The job worker
+pool also queues this as the rollup_stats job every hour.
+"""
+
+import sys
+import os
+
+# Add the app directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+
+from app.models import Database, AnswerHistory, VocabularyLibrary, QuizSession
+
+def main():
+    retention_days = AnswerHistory.RETENTION_DAYS
+    if len(sys.argv) > 1 and sys.argv[1].isdigit():
+        retention_days = int(sys.argv[1])
+    
+    Database.init_db()
+    
+    print(f"Rolling up answer events (keeping {retention_days} days of raw events)...")
+    result = AnswerHistory.rollup(retention_days)
+    print(f"✓ Updated {result['rows_rolled_up']} daily rows")
+    print(f"✓ Pruned {result['events_pruned']} raw events")
+    
+    tombstones = VocabularyLibrary.prune_tombstones(retention_days)
+    print(f"✓ Pruned {tombstones} vocabulary library tombstones")
+    
+    sessions = QuizSession.purge_stale()
+    print(f"✓ Deleted {sessions} stale quiz sessions")
+
+if __name__ == "__main__":
+    main()
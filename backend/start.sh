@@ -1,2 +1,5 @@
 #!/bin/bash
-gunicorn run:app --workers=4 --bind=0.0.0.0:$PORT
\ No newline at end of file
+# Background job workers run beside the web server; web workers only enqueue
+python job_worker.py --workers 2 &
+# Workers, bind address and preloading are set in gunicorn.conf.py
+gunicorn run:app --config gunicorn.conf.py
@@ -0,0 +1,8 @@
+# backend/tests/conftest.py
+
+import os
+import sys
+
+# Import the app package from the backend directory whichever directory pytest runs from
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
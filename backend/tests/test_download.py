@@ -0,0 +1,145 @@
+# backend/tests/test_download.py
+#
+# create_pdf against a local stand-in for the vocabulary PDF server
+
+import hashlib
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.services.vocabulary import create_pdf, _read_download_meta, _write_download_meta
+
+BODY = bytes(range(256)) * 1024  # 256 KiB, several download chunks
+ETAG = '"vocs-v1"'
+
+class StandInServer(ThreadingHTTPServer):
+    """Serves BODY with an ETag and byte ranges; the test sets the quirks"""
+    daemon_threads = True
+    
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StandInHandler)
+        self.requests = []  # headers of every request received
+        self.cut_after = None  # close the connection after this many body bytes
+        self.wrong_range_start = None  # answer a Range request from this byte instead
+
+class StandInHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+    
+    def do_GET(self):
+        server = self.server
+        server.requests.append(dict(self.headers))
+        
+        if self.headers.get('If-None-Match') == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+        
+        start = 0
+        match = re.match(r'bytes=(\d+)-$', self.headers.get('Range', ''))
+        if match and self.headers.get('If-Range') == ETAG:
+            start = int(match.group(1))
+            if start >= len(BODY):
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{len(BODY)}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            if server.wrong_range_start is not None:
+                start = server.wrong_range_start
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{len(BODY) - 1}/{len(BODY)}')
+        else:
+            self.send_response(200)
+        
+        body = BODY[start:]
+        self.send_header('ETag', ETAG)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if server.cut_after is not None:
+            body = body[:server.cut_after]
+            server.cut_after = None
+        self.wfile.write(body)
+        self.close_connection = True
+
+@pytest.fixture
+def server():
+    server = StandInServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def target(tmp_path):
+    return str(tmp_path / 'vocs.pdf')
+
+def url(server):
+    return f'http://127.0.0.1:{server.server_address[1]}/vocs.pdf'
+
+def read(path):
+    with open(path, 'rb') as file:
+        return file.read()
+
+def test_download_then_not_modified(server, target):
+    assert create_pdf(url(server), target)
+    assert read(target) == BODY
+    assert _read_download_meta(target)['etag'] == ETAG
+    
+    assert create_pdf(url(server), target)
+    assert server.requests[-1]['If-None-Match'] == ETAG
+    assert read(target) == BODY
+
+def test_interrupted_download_resumes(server, target):
+    server.cut_after = 100 * 1024
+    assert not create_pdf(url(server), target)
+    assert not os.path.exists(target)
+    resume_from = os.path.getsize(target + '.part')
+    assert 0 < resume_from <= 100 * 1024
+    
+    assert create_pdf(url(server), target)
+    assert server.requests[-1]['Range'] == f'bytes={resume_from}-'
+    assert read(target) == BODY
+    assert not os.path.exists(target + '.part')
+
+def test_complete_part_file_is_finished_after_416(server, target):
+    # The process stopped after writing the last chunk but before renaming the .part
+    assert create_pdf(url(server), target)
+    os.replace(target, target + '.part')
+    _write_download_meta(target, {'partial_validator': ETAG})
+    
+    assert create_pdf(url(server), target)
+    assert server.requests[-1]['Range'] == f'bytes={len(BODY)}-'
+    assert read(target) == BODY
+    assert _read_download_meta(target)['etag'] == ETAG
+
+def test_oversized_part_file_is_dropped_after_416(server, target):
+    server.cut_after = 10
+    assert not create_pdf(url(server), target)
+    with open(target + '.part', 'wb') as file:
+        file.write(b'x' * (len(BODY) + 5))
+    
+    assert create_pdf(url(server), target)
+    assert 'Range' not in server.requests[-1]
+    assert read(target) == BODY
+
+def test_misaligned_206_restarts(server, target):
+    server.cut_after = 50 * 1024
+    assert not create_pdf(url(server), target)
+    
+    server.wrong_range_start = 0
+    assert create_pdf(url(server), target)
+    assert 'Range' not in server.requests[-1]
+    assert read(target) == BODY
+
+def test_checksum_mismatch_is_rejected(server, target):
+    assert not create_pdf(url(server), target, expected_sha256='0' * 64)
+    assert not os.path.exists(target)
+    assert not os.path.exists(target + '.part')
+    
+    assert create_pdf(url(server), target, expected_sha256=hashlib.sha256(BODY).hexdigest())
+    assert read(target) == BODY
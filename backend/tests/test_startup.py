@@ -0,0 +1,35 @@
+# backend/tests/test_startup.py
+#
+# Import-time regression checks. Each runs in a fresh interpreter, since this
+# one has already imported whatever the other tests needed.
+
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Only ingestion, translation, text-to-speech and the distractor index use these
+LAZY_IMPORTS = ['deep_translator', 'numpy', 'PyPDF2', 'requests', 'pyttsx3']
+# Milliseconds profile_startup.py allows for importing the app and running create_app();
+# generous, so only a real regression (not a slow machine) fails it
+STARTUP_BUDGET_MS = 3000
+
+def run(args):
+    return subprocess.run(
+        [sys.executable] + args, cwd=BACKEND_DIR, capture_output=True, text=True,
+        env=dict(os.environ, LOG_LEVEL='WARNING')
+    )
+
+def test_import_app_leaves_heavy_dependencies_unloaded():
+    process = run(['-c', f'import sys, json, app; print(json.dumps([m for m in {LAZY_IMPORTS!r} if m in sys.modules]))'])
+    assert process.returncode == 0, process.stderr
+    assert json.loads(process.stdout.strip().splitlines()[-1]) == []
+
+def test_startup_within_budget(tmp_path):
+    process = run([
+        'profile_startup.py', '--top', '5', '--budget', str(STARTUP_BUDGET_MS),
+        '--database', str(tmp_path / 'startup.db'),
+    ])
+    assert process.returncode == 0, process.stdout + process.stderr
@@ -1,7 +1,7 @@
 // frontend/src/App.jsx
 
 import React, { useState } from 'react';
-import { BrowserRouter as Router, Routes, Route, Navigate } from 'react-router-dom';
+import { BrowserRouter as Router, Routes, Route, Navigate, useLocation, useNavigate } from 'react-router-dom';
 import { AuthProvider } from './context/AuthContext';
 import { MistakesProvider } from './context/MistakesContext';
 import { StatsProvider } from './context/StatsContext';
@@ -133,6 +133,27 @@ function MainApp() {
   );
 }
 
+// Review quiz launched from the mistakes page; draws only the user's missed words
+function MistakesQuiz() {
+  const location = useLocation();
+  const navigate = useNavigate();
+  const { level = 'all', mode = { type: 'endless' } } = location.state || {};
+
+  return (
+    <div style={{ display: 'flex', flexDirection: 'column', minHeight: '100vh' }}>
+      <div style={{ flex: 1 }}>
+        <Quiz
+          level={level}
+          mode={mode}
+          source="mistakes"
+          onBack={() => navigate('/mistakes')}
+        />
+      </div>
+      <Footer />
+    </div>
+  );
+}
+
 function App() {
   return (
     <AuthProvider>
@@ -143,6 +164,7 @@ function App() {
               <Route path="/" element={<MainApp />} />
               <Route path="/stats" element={<UserStats />} />
               <Route path="/mistakes" element={<MistakesList standalone={true} />} />
+              <Route path="/mistakes-quiz" element={<MistakesQuiz />} />
               <Route path="/vocabulary" element={<Vocabulary />} />
               <Route path="/vocabulary-quiz" element={<VocabularyQuiz />} />
               <Route path="*" element={<Navigate to="/" replace />} />
@@ -73,8 +73,8 @@ export default function MistakesList({ standalone = false }) {
   // Navigate to quiz with selected level and mode
   const startQuizWithMode = (mode, count) => {
     setShowQuizModal(false);
-    // Navigate to quiz with the selected level and mode
-    navigate('/quiz', { state: { level: quizLevel, mode: { type: mode, count } } });
+    // Navigate to the mistakes review quiz with the selected level and mode
+    navigate('/mistakes-quiz', { state: { level: quizLevel, mode: { type: mode, count } } });
   };
   
   const addToVocabulary = async (word, translation, level) => {
@@ -350,7 +350,7 @@ export default function MistakesList({ standalone = false }) {
                   {mistakes.map((mistake, idx) => (
                     <tr key={idx}>
                       <td className="word-cell">{mistake.word}</td>
-                      <td className="translation-cell">{mistake.translation}</td>
+                      <td className="translation-cell">{mistake.translation || '翻譯中…'}</td>
                       <td>
                         <Badge className={`level-badge ${getLevelBadgeClass(mistake.level)}`}>{mistake.level}</Badge>
                       </td>
@@ -419,6 +419,7 @@ export default function MistakesList({ standalone = false }) {
             onChange={(e) => setQuizLevel(e.target.value)}
           >
             <option value="">請選擇難度...</option>
+            <option value="all">所有難度</option>
             <option value="LEVEL1">Level 1</option>
             <option value="LEVEL2">Level 2</option>
             <option value="LEVEL3">Level 3</option>
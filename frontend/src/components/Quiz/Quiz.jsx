@@ -1,7 +1,14 @@
 // frontend/src/components/Quiz/Quiz.jsx
 
 import React, { useEffect, useState, useRef, useContext } from 'react';
-import { getQuestion, checkAnswer } from '../../services/quizService';
+import {
+  getQuestion,
+  getMistakesQuestion,
+  checkAnswer,
+  getAudioUrl,
+  startQuizSession,
+  answerQuizSession
+} from '../../services/quizService';
 import {
   Container,
   Row,
@@ -19,14 +26,20 @@ import './Quiz.css';
 import { FontAwesomeIcon } from '@fortawesome/react-fontawesome';
 import { faVolumeHigh } from '@fortawesome/free-solid-svg-icons';
 
+// Questions per server session in endless mode; a new session starts when one runs out
+const ENDLESS_SESSION_LENGTH = 50;
+
 /**
  * Props:
- *  - level: string (e.g. "LEVEL1")
+ *  - level: string (e.g. "LEVEL1", or "all" for the mistakes source)
  *  - mode: { type: 'endless' } or { type: 'fixed', count: number }
+ *  - source: 'level' (random/due words of the level) or 'mistakes' (user's missed words)
  *  - onBack: function
  */
-export default function Quiz({ level, mode = { type: 'endless' }, onBack }) {
+export default function Quiz({ level, mode = { type: 'endless' }, source = 'level', onBack }) {
   const [word, setWord] = useState('');
+  // Level of the current word; differs from `level` when reviewing mistakes across all levels
+  const [wordLevel, setWordLevel] = useState(level);
   const [options, setOptions] = useState([]);
   const [loading, setLoading] = useState(false);
 
@@ -41,6 +54,11 @@ export default function Quiz({ level, mode = { type: 'endless' }, onBack }) {
 
   const timerRef = useRef(null);
 
+  // Logged-in level quizzes run as a server-side quiz session: each answer
+  // returns the next question, which is kept here until it is shown
+  const sessionIdRef = useRef(null);
+  const nextQuestionRef = useRef(null);
+
   // ============= NEW OR CHANGED =============
   // Track # answered + # correct in this *quiz session*
   const [questionsAnswered, setQuestionsAnswered] = useState(0);
@@ -49,11 +67,19 @@ export default function Quiz({ level, mode = { type: 'endless' }, onBack }) {
 
   const { addMistake } = useContext(MistakesContext);
   const { recordAnswer, getCorrectionRate, getGlobalAverageTime, getAttempted } = useContext(StatsContext);
-  const { getAuthHeaders } = useAuth();
+  const { getAuthHeaders, isAuthenticated } = useAuth();
+  const useSession = isAuthenticated && source === 'level';
   const globalAvg = getGlobalAverageTime().toFixed(2);
 
   function speakWord() {
     if (!word) return;
+    // Play the server-rendered recording, falling back to the browser's speech synthesis
+    const audio = new Audio(getAudioUrl(word));
+    audio.play().catch(() => speakWithSynthesis());
+  }
+
+  function speakWithSynthesis() {
+    if (!window.speechSynthesis) return;
     const utterance = new SpeechSynthesisUtterance(word);
     utterance.lang = 'en-US';
     const voices = window.speechSynthesis.getVoices();
@@ -98,8 +124,23 @@ export default function Quiz({ level, mode = { type: 'endless' }, onBack }) {
   async function fetchNewQuestion() {
     setLoading(true);
     try {
-      const data = await getQuestion(level, getAuthHeaders());
+      let data;
+      if (useSession) {
+        data = nextQuestionRef.current;
+        nextQuestionRef.current = null;
+        if (!data) {
+          const length = mode.type === 'fixed' ? mode.count : ENDLESS_SESSION_LENGTH;
+          const session = await startQuizSession('level', level, length, getAuthHeaders());
+          sessionIdRef.current = session.session_id;
+          data = session.question;
+        }
+      } else {
+        data = source === 'mistakes'
+          ? await getMistakesQuestion(level, getAuthHeaders())
+          : await getQuestion(level, getAuthHeaders());
+      }
       setWord(removeSymbols(data.word));
+      setWordLevel(data.level || level);
       setOptions(data.options);
       setQuestionStart(Date.now());
     } catch (err) {
@@ -113,7 +154,17 @@ export default function Quiz({ level, mode = { type: 'endless' }, onBack }) {
   async function handleOptionClick(option) {
     setLoading(true);
     try {
-      const result = await checkAnswer(word, option, level, getAuthHeaders());
+      let result;
+      if (useSession && sessionIdRef.current) {
+        result = await answerQuizSession(sessionIdRef.current, option, getAuthHeaders());
+        nextQuestionRef.current = result.next;
+        if (result.finished || !result.next) {
+          // Start a new session for the next question
+          sessionIdRef.current = null;
+        }
+      } else {
+        result = await checkAnswer(word, option, wordLevel, getAuthHeaders());
+      }
 
       // Time spent
       const now = Date.now();
@@ -126,7 +177,7 @@ export default function Quiz({ level, mode = { type: 'endless' }, onBack }) {
         // NEW: increment local correctCount
         setCorrectCount((prev) => prev + 1);
       } else {
-        addMistake(word, result.correctTranslation, level);
+        addMistake(word, result.correctTranslation, wordLevel);
         setWasCorrect(false);
         showModalMessage(
           'Incorrect',
@@ -135,7 +186,7 @@ export default function Quiz({ level, mode = { type: 'endless' }, onBack }) {
         );
       }
 
-      recordAnswer(word, result.correct, timeSpentSec, level);
+      recordAnswer(word, result.correct, timeSpentSec, wordLevel);
 
       // NEW: increment questions answered
       setQuestionsAnswered((prev) => prev + 1);
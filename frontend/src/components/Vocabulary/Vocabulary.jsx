@@ -1,5 +1,5 @@
 // frontend/src/components/Vocabulary/Vocabulary.jsx
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useMemo, useRef } from 'react';
 import { Container, Row, Col, Card, Button, Table, Form, Alert, Badge, Spinner, Modal } from 'react-bootstrap';
 import { Link, useNavigate } from 'react-router-dom';
 import { useAuth } from '../../context/AuthContext';
@@ -8,8 +8,17 @@ import Header from '../Header/Header';
 import Footer from '../Footer/Footer';
 import './Vocabulary.css';
 
+const IMPORT_CONTENT_TYPES = {
+  csv: 'text/csv',
+  json: 'application/json',
+  ndjson: 'application/x-ndjson',
+};
+const IMPORT_POLL_INTERVAL = 2000;
+
 export default function Vocabulary({ standalone = true }) {
-  const [vocabulary, setVocabulary] = useState([]);
+  // Local mirror of the whole library (word -> row), kept current through delta sync
+  const [library, setLibrary] = useState({});
+  const syncCursor = useRef(0);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
   const [filterLevel, setFilterLevel] = useState('all');
@@ -30,42 +39,73 @@ export default function Vocabulary({ standalone = true }) {
   const [showDeleteModal, setShowDeleteModal] = useState(false);
   const [wordToDelete, setWordToDelete] = useState('');
   
-  const fetchVocabulary = useCallback(async (level = 'all', search = '') => {
+  // Modal state for bulk import
+  const [showImportModal, setShowImportModal] = useState(false);
+  const [importText, setImportText] = useState('');
+  const [importFormat, setImportFormat] = useState('csv');
+  const [importSubmitting, setImportSubmitting] = useState(false);
+  const [importStatus, setImportStatus] = useState(null);
+  
+  // Fetch the library rows changed since the last sync and apply them to the mirror
+  const syncVocabulary = useCallback(async () => {
     if (!isAuthenticated) return;
     
     try {
-      setLoading(true);
+      if (syncCursor.current === 0) setLoading(true);
       setError('');
       
-      let url = buildApiUrl(`${API_ENDPOINTS.VOCABULARY.BASE}?level=${level}`);
-      if (search) {
-        url += `&search=${encodeURIComponent(search)}`;
-      }
-      
-      const fetchOptions = getFetchOptions(getAuthHeaders());
-      console.log('Request headers:', fetchOptions.headers);
-      console.log('Request URL:', url);
-      
-      const response = await fetch(url, fetchOptions);
-      
-      if (response.ok) {
+      let hasMore = true;
+      while (hasMore) {
+        const url = buildApiUrl(`${API_ENDPOINTS.VOCABULARY.CHANGES}?since=${syncCursor.current}`);
+        const response = await fetch(url, getFetchOptions(getAuthHeaders()));
+        
+        if (!response.ok) {
+          const errorData = await response.json().catch(() => ({}));
+          setError(errorData.error || `無法載入單字庫 (HTTP ${response.status})`);
+          return;
+        }
+        
         const data = await response.json();
-        console.log('Vocabulary API response:', data);
-        setVocabulary(data.vocabulary || []);
-      } else {
-        console.error('API Error - Status:', response.status, 'URL:', url);
-        const errorData = await response.json().catch(() => ({}));
-        console.error('Error data:', errorData);
-        setError(errorData.error || `無法載入單字庫 (HTTP ${response.status})`);
+        if (data.reset) {
+          // Deletions we haven't seen were pruned on the server: start over
+          syncCursor.current = 0;
+          setLibrary({});
+          continue;
+        }
+        
+        setLibrary((current) => {
+          const next = { ...current };
+          data.changes.forEach((change) => {
+            if (change.deleted) {
+              delete next[change.word];
+            } else {
+              next[change.word] = change;
+            }
+          });
+          return next;
+        });
+        syncCursor.current = data.cursor;
+        hasMore = data.has_more;
       }
     } catch (error) {
-      console.error('Error fetching vocabulary:', error);
+      console.error('Error syncing vocabulary:', error);
       setError('網路錯誤，請重試。');
     } finally {
       setLoading(false);
     }
   }, [getAuthHeaders, isAuthenticated]);
   
+  // Filter and sort the mirror locally, the way /api/vocabulary does on the server
+  const vocabulary = useMemo(() => {
+    const search = searchTerm.trim().toLowerCase();
+    return Object.values(library)
+      .filter((item) => filterLevel === 'all' || !item.level || item.level === filterLevel)
+      .filter((item) => !search
+        || item.word.toLowerCase().includes(search)
+        || (item.translation || '').toLowerCase().includes(search))
+      .sort((a, b) => (b.created_at || '').localeCompare(a.created_at || '') || b.id - a.id);
+  }, [library, filterLevel, searchTerm]);
+  
   // Function to fetch search suggestions from personal vocabulary
   const fetchSuggestions = useCallback(async (searchQuery) => {
     if (!searchQuery || searchQuery.length < 2 || !isAuthenticated) {
@@ -120,9 +160,9 @@ export default function Vocabulary({ standalone = true }) {
   
   useEffect(() => {
     if (isAuthenticated) {
-      fetchVocabulary(filterLevel, searchTerm);
+      syncVocabulary();
     }
-  }, [isAuthenticated, fetchVocabulary, filterLevel, searchTerm]);
+  }, [isAuthenticated, syncVocabulary]);
   
   // Effect for fetching suggestions as user types
   useEffect(() => {
@@ -138,15 +178,13 @@ export default function Vocabulary({ standalone = true }) {
   
   const handleSearch = (e) => {
     e.preventDefault();
-    // Search both personal vocabulary and system vocabulary
-    fetchVocabulary(filterLevel, searchTerm);
+    // Personal vocabulary is filtered locally; search the system vocabulary
     searchSystemVocabulary(searchTerm);
   };
   
   const handleSuggestionClick = (suggestion) => {
     setSearchTerm(suggestion.word);
     setShowSuggestions(false);
-    fetchVocabulary(filterLevel, suggestion.word);
     searchSystemVocabulary(suggestion.word);
   };
   
@@ -171,7 +209,7 @@ export default function Vocabulary({ standalone = true }) {
       
       if (response.ok) {
         // Refresh the vocabulary list and update search results
-        fetchVocabulary(filterLevel, searchTerm);
+        syncVocabulary();
         searchSystemVocabulary(searchTerm);
         setError('');
       } else {
@@ -184,6 +222,78 @@ export default function Vocabulary({ standalone = true }) {
     }
   };
   
+  // Handle picking a file for bulk import; the format follows the file extension
+  const handleImportFile = (e) => {
+    const file = e.target.files[0];
+    if (!file) return;
+    
+    const extension = file.name.split('.').pop().toLowerCase();
+    if (extension === 'json') setImportFormat('json');
+    else if (extension === 'ndjson' || extension === 'jsonl') setImportFormat('ndjson');
+    else setImportFormat('csv');
+    
+    const reader = new FileReader();
+    reader.onload = () => setImportText(reader.result);
+    reader.readAsText(file);
+  };
+  
+  // Handle submitting a bulk import
+  const handleImport = async () => {
+    if (!importText.trim()) return;
+    
+    try {
+      setImportSubmitting(true);
+      const response = await fetch(buildApiUrl(API_ENDPOINTS.VOCABULARY.BATCH), getFetchOptions(getAuthHeaders(), {
+        method: 'POST',
+        headers: {
+          ...getAuthHeaders(),
+          'Content-Type': IMPORT_CONTENT_TYPES[importFormat],
+        },
+        body: importText
+      }));
+      
+      const data = await response.json().catch(() => ({}));
+      if (response.ok) {
+        setImportStatus(data);
+        setImportText('');
+        setShowImportModal(false);
+        syncVocabulary();
+      } else {
+        setError(data.error || '匯入單字失敗');
+      }
+    } catch (error) {
+      console.error('Error importing words:', error);
+      setError('網路錯誤，請重試。');
+    } finally {
+      setImportSubmitting(false);
+    }
+  };
+  
+  // Poll a running import until its translations are done, then refresh the list
+  useEffect(() => {
+    if (!importStatus || importStatus.status === 'done') return;
+    
+    const pollTimer = setTimeout(async () => {
+      try {
+        const response = await fetch(
+          buildApiUrl(API_ENDPOINTS.VOCABULARY.BATCH_STATUS(importStatus.id)),
+          getFetchOptions(getAuthHeaders())
+        );
+        if (response.ok) {
+          const data = await response.json();
+          setImportStatus(data);
+          if (data.status === 'done') {
+            syncVocabulary();
+          }
+        }
+      } catch (error) {
+        console.error('Error checking import status:', error);
+      }
+    }, IMPORT_POLL_INTERVAL);
+    
+    return () => clearTimeout(pollTimer);
+  }, [importStatus, getAuthHeaders, syncVocabulary]);
+  
   const handleRemoveWordClick = (word) => {
     setWordToDelete(word);
     setShowDeleteModal(true);
@@ -200,7 +310,7 @@ export default function Vocabulary({ standalone = true }) {
       
       if (response.ok) {
         // Refresh the vocabulary list after deletion
-        fetchVocabulary(filterLevel, searchTerm);
+        syncVocabulary();
       } else {
         setError('移除單字失敗');
       }
@@ -226,7 +336,7 @@ export default function Vocabulary({ standalone = true }) {
       
       if (response.ok) {
         setShowNotesModal(false);
-        fetchVocabulary(filterLevel, searchTerm);
+        syncVocabulary();
       } else {
         setError('更新筆記失敗');
       }
@@ -273,6 +383,7 @@ export default function Vocabulary({ standalone = true }) {
       case 'mistakes': return 'added-from-mistakes';
       case 'manual': return 'added-from-manual';
       case 'search': return 'added-from-search';
+      case 'import': return 'added-from-import';
       default: return '';
     }
   };
@@ -283,6 +394,7 @@ export default function Vocabulary({ standalone = true }) {
       case 'mistakes': return '從錯誤單字';
       case 'manual': return '手動新增';
       case 'search': return '從搜尋';
+      case 'import': return '批次匯入';
       default: return addedFrom;
     }
   };
@@ -296,7 +408,7 @@ export default function Vocabulary({ standalone = true }) {
       
       if (response.ok) {
         // Optionally refresh the list to show updated review time
-        fetchVocabulary(filterLevel, searchTerm);
+        syncVocabulary();
       }
     } catch (error) {
       console.error('Error recording review:', error);
@@ -481,6 +593,15 @@ export default function Vocabulary({ standalone = true }) {
                   <i className="bi bi-lightbulb me-2"></i>
                   單字庫測驗
                 </Button>
+                
+                <Button 
+                  variant="outline-success" 
+                  className="ms-3"
+                  onClick={() => setShowImportModal(true)}
+                >
+                  <i className="bi bi-upload me-2"></i>
+                  批次匯入
+                </Button>
               </div>
             </div>
 
@@ -489,6 +610,26 @@ export default function Vocabulary({ standalone = true }) {
                 {error}
               </Alert>
             )}
+            {importStatus && (
+              <Alert
+                variant={importStatus.status === 'done' ? 'success' : 'info'}
+                className="mt-3"
+                onClose={() => setImportStatus(null)}
+                dismissible
+              >
+                {importStatus.status === 'done' ? (
+                  <>
+                    已匯入 {importStatus.total_rows} 個單字
+                    {importStatus.failed_count > 0 && `，${importStatus.failed_count} 個單字無法翻譯`}
+                  </>
+                ) : (
+                  <>
+                    <Spinner animation="border" size="sm" className="me-2" />
+                    已匯入 {importStatus.total_rows} 個單字，正在翻譯剩餘的 {importStatus.pending_translations} 個單字...
+                  </>
+                )}
+              </Alert>
+            )}
             {loading ? (
               <div className="text-center my-4">
                 <Spinner animation="border" />
@@ -552,7 +693,9 @@ export default function Vocabulary({ standalone = true }) {
                       {vocabulary.map((item) => (
                         <tr key={item.id || item.word}>
                           <td className="word-cell">{item.word}</td>
-                          <td className="translation-cell">{item.translation || '-'}</td>
+                          <td className="translation-cell">
+                            {item.translation || (importStatus && importStatus.status !== 'done' ? '翻譯中...' : '-')}
+                          </td>
                           <td className="notes-cell">
                             {item.notes || '-'}
                             <Button
@@ -611,7 +754,7 @@ export default function Vocabulary({ standalone = true }) {
               <Button 
                 variant="outline-primary" 
                 className="refresh-button"
-                onClick={() => fetchVocabulary(filterLevel, searchTerm)}
+                onClick={syncVocabulary}
                 disabled={loading}
               >
                 {loading ? '載入中...' : '重新整理'}
@@ -646,7 +789,48 @@ export default function Vocabulary({ standalone = true }) {
           </Button>
         </Modal.Footer>
       </Modal>
-
+      
+      {/* Modal for bulk import */}
+      <Modal show={showImportModal} onHide={() => setShowImportModal(false)} size="lg">
+        <Modal.Header closeButton>
+          <Modal.Title>批次匯入單字</Modal.Title>
+        </Modal.Header>
+        <Modal.Body>
+          <Form.Group className="mb-3">
+            <Form.Label>格式</Form.Label>
+            <Form.Select value={importFormat} onChange={(e) => setImportFormat(e.target.value)}>
+              <option value="csv">CSV（word,translation,level,notes）</option>
+              <option value="json">JSON</option>
+              <option value="ndjson">NDJSON（每行一個 JSON）</option>
+            </Form.Select>
+          </Form.Group>
+          <Form.Group className="mb-3">
+            <Form.Label>選擇檔案</Form.Label>
+            <Form.Control type="file" accept=".csv,.txt,.json,.ndjson,.jsonl" onChange={handleImportFile} />
+          </Form.Group>
+          <Form.Group>
+            <Form.Control
+              as="textarea"
+              rows={8}
+              value={importText}
+              onChange={(e) => setImportText(e.target.value)}
+              placeholder={'word,translation,level,notes\napple,蘋果,LEVEL1,\nbanana,,,'}
+            />
+            <Form.Text className="text-muted">
+              沒有翻譯的單字會在匯入後自動翻譯
+            </Form.Text>
+          </Form.Group>
+        </Modal.Body>
+        <Modal.Footer>
+          <Button variant="secondary" onClick={() => setShowImportModal(false)}>
+            取消
+          </Button>
+          <Button variant="primary" onClick={handleImport} disabled={importSubmitting || !importText.trim()}>
+            {importSubmitting ? '匯入中...' : '開始匯入'}
+          </Button>
+        </Modal.Footer>
+      </Modal>
+      
       {/* Modal for delete confirmation */}
       <Modal show={showDeleteModal} onHide={() => setShowDeleteModal(false)}>
         <Modal.Header closeButton>
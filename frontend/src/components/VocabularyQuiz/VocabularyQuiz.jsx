@@ -1,7 +1,7 @@
 // frontend/src/components/VocabularyQuiz/VocabularyQuiz.jsx
 
 import React, { useEffect, useState, useRef, useContext, useCallback } from 'react';
-import { getVocabularyQuestion, checkAnswer } from '../../services/quizService';
+import { getVocabularyQuestion, checkAnswer, getAudioUrl } from '../../services/quizService';
 import {
   Container,
   Row,
@@ -51,6 +51,13 @@ export default function VocabularyQuiz({ standalone = true }) {
 
   function speakWord() {
     if (!word) return;
+    // Play the server-rendered recording, falling back to the browser's speech synthesis
+    const audio = new Audio(getAudioUrl(word));
+    audio.play().catch(() => speakWithSynthesis());
+  }
+
+  function speakWithSynthesis() {
+    if (!window.speechSynthesis) return;
     const utterance = new SpeechSynthesisUtterance(word);
     utterance.lang = 'en-US';
     const voices = window.speechSynthesis.getVoices();
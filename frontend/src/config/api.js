@@ -37,12 +37,23 @@ export const API_ENDPOINTS = {
     LEVELS: '/api/levels',
     QUESTION: '/api/question',
     VOCABULARY_QUESTION: '/api/vocabulary-question',
+    MISTAKES_QUESTION: '/api/mistakes-question',
     CHECK_ANSWER: '/api/check-answer',
+    BUNDLES: '/api/bundles',
+    SESSIONS: '/api/quiz-sessions',
+    SESSION_ANSWER: (sessionId) => `/api/quiz-sessions/${sessionId}/answer`,
+    ANSWERS_BATCH: '/api/answers/batch',
+  },
+  
+  // Audio endpoints
+  AUDIO: {
+    WORD: (word) => `/api/audio/${encodeURIComponent(word)}`,
   },
   
   // User endpoints
   USER: {
     STATS: '/api/user/stats',
+    STATS_HISTORY: '/api/user/stats/history',
     MISTAKES: '/api/user/mistakes',
   },
   
@@ -51,6 +62,9 @@ export const API_ENDPOINTS = {
     BASE: '/api/vocabulary',
     SUGGESTIONS: '/api/vocabulary/suggestions',
     SEARCH: '/api/vocabulary/search',
+    CHANGES: '/api/vocabulary/changes',
+    BATCH: '/api/vocabulary/batch',
+    BATCH_STATUS: (importId) => `/api/vocabulary/batch/${importId}`,
     NOTES: (word) => `/api/vocabulary/${encodeURIComponent(word)}/notes`,
     REVIEW: (word) => `/api/vocabulary/${encodeURIComponent(word)}/review`,
     DELETE: (word) => `/api/vocabulary/${encodeURIComponent(word)}`,
@@ -57,6 +57,20 @@ export async function getVocabularyQuestion(authHeaders = {}) {
   return response.json();
 }
 
+/**
+ * Fetch a question from the user's mistake words, weighted towards words missed most
+ * -> returns { word, level, options }. Pass 'all' to draw from every level.
+ */
+export async function getMistakesQuestion(level = 'all', authHeaders = {}) {
+  const url = `${API_ENDPOINTS.QUIZ.MISTAKES_QUESTION}?level=${encodeURIComponent(level || 'all')}`;
+  const response = await fetch(buildApiUrl(url), getFetchOptions(authHeaders));
+  if (!response.ok) {
+    await throwResponseError(response, 'Failed to fetch mistakes question');
+  }
+  // if ok, parse and return
+  return response.json();
+}
+
 /**
  * Check the user's answer -> returns { correct: boolean, correctTranslation: string }.
  */
@@ -76,3 +90,90 @@ export async function checkAnswer(word, selected, level = null, authHeaders = {}
   }
   return response.json();
 }
+
+/**
+ * Start a server-side quiz session (login required) -> returns
+ * { session_id, source, level, length, position, question: { word, level, options } }.
+ * source is 'level' (pass the level) or 'library' (the user's vocabulary library).
+ */
+export async function startQuizSession(source, level, length, authHeaders = {}) {
+  const body = { source, length };
+  if (level) {
+    body.level = level;
+  }
+
+  const response = await fetch(buildApiUrl(API_ENDPOINTS.QUIZ.SESSIONS), getFetchOptions(authHeaders, {
+    method: 'POST',
+    body: JSON.stringify(body)
+  }));
+
+  if (!response.ok) {
+    await throwResponseError(response, 'Failed to start quiz');
+  }
+  return response.json();
+}
+
+/**
+ * Answer the current question of a quiz session -> returns
+ * { correct, correctTranslation, position, length, correct_count, finished, next },
+ * where next is the following question (null once the session is finished).
+ */
+export async function answerQuizSession(sessionId, selected, authHeaders = {}) {
+  const response = await fetch(buildApiUrl(API_ENDPOINTS.QUIZ.SESSION_ANSWER(sessionId)), getFetchOptions(authHeaders, {
+    method: 'POST',
+    body: JSON.stringify({ selected })
+  }));
+
+  if (!response.ok) {
+    await throwResponseError(response, 'Failed to check answer');
+  }
+  return response.json();
+}
+
+/**
+ * URL of the server-rendered pronunciation of a word (WAV).
+ */
+export function getAudioUrl(word) {
+  return buildApiUrl(API_ENDPOINTS.AUDIO.WORD(word));
+}
+
+/**
+ * Fetch the offline bundle of a level -> returns { format, level, words: [{ word, translation, audio }] }.
+ * The bundle URL carries its content hash, so the browser cache serves it until the level changes.
+ * Answers given offline should be uploaded with uploadAnswers so progress is recorded.
+ */
+export async function getLevelBundle(level) {
+  const manifestResponse = await fetch(buildApiUrl(API_ENDPOINTS.QUIZ.BUNDLES));
+  if (!manifestResponse.ok) {
+    await throwResponseError(manifestResponse, 'Failed to fetch offline bundles');
+  }
+  const manifest = await manifestResponse.json();
+  const entry = manifest.levels[level];
+  if (!entry) {
+    throw new Error(`No offline bundle for ${level}`);
+  }
+
+  const response = await fetch(buildApiUrl(entry.url));
+  if (!response.ok) {
+    await throwResponseError(response, 'Failed to fetch offline bundle');
+  }
+  return response.json();
+}
+
+/**
+ * Upload answers given offline, in one request (login required).
+ * answers: [{ event_id, level, word, selected }], where event_id is a unique id
+ * the client keeps per answer so a retried upload is not counted twice
+ * -> returns { recorded, results: [{ event_id, status, correct, correctTranslation, error }] }.
+ */
+export async function uploadAnswers(answers, authHeaders = {}) {
+  const response = await fetch(buildApiUrl(API_ENDPOINTS.QUIZ.ANSWERS_BATCH), getFetchOptions(authHeaders, {
+    method: 'POST',
+    body: JSON.stringify({ answers })
+  }));
+
+  if (!response.ok) {
+    await throwResponseError(response, 'Failed to upload answers');
+  }
+  return response.json();
+}